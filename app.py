@@ -1,580 +1,217 @@
-import streamlit as st
+import cProfile
+import io
+import pstats
+
 import pandas as pd
 import numpy as np
 
-# COSTE TOTAL
-def calcular_coste_total(recepcion_pedidos, necesidades_netas, costo_pedido, costo_mantenimiento):
+from mrp import (
+    INSTRUMENTACION,
+    CacheLRU,
+    Instrumentacion,
+    barrer_parametros,
+    calcular_coste_total,
+    calcular_eoq,
+    calcular_lote_a_lote,
+    calcular_minimo_coste_total,
+    calcular_minimo_coste_unitario,
+    calcular_periodo_constante,
+    calcular_poq,
+    calcular_silver_meal,
+    calcular_wagner_whitin,
+    clave_planificacion,
+    comparar_estrategias,
+    leer_demanda,
+)
+
+# El motor de cálculo está en el paquete mrp; aquí solo queda la interfaz de Streamlit
+
+
+def _leer_demanda_subida(contenido, nombre):
+    # main() la envuelve en st.cache_data: el fichero subido se lee una sola vez aunque el script
+    # se reejecute con cada widget
+    return leer_demanda(io.BytesIO(contenido), "parquet" if nombre.lower().endswith((".parquet", ".pq")) else "csv")
+
+
+def _valores_barrido(texto, tipo=float):
+    # "500, 800; 1000" -> (500.0, 800.0, 1000.0); ValueError si algún valor no es un número
+    valores = tuple(tipo(valor) for valor in texto.replace(";", ",").split(",") if valor.strip())
+    if not valores:
+        raise ValueError("indique al menos un valor")
+    return valores
+
+
+def _calcular_vista(metodo, necesidades_brutas, recepciones_programadas, tiempo_suministro, stock_seguridad,
+                    disponibilidad_inicial, costo_pedido, costo_mantenimiento, periodo_constante=None,
+                    costos_pedido=None, costos_mantenimiento=None, stocks_seguridad=None, tiempos_suministro=None):
     """
-    - recepcion_pedidos: lista Q_t para cada periodo t
-    - necesidades_netas: lista NN_t para cada periodo t
-    - costo_pedido: C_p (€/pedido)
-    - costo_mantenimiento: h (€/unidad·periodo)
+    Cálculo que hay detrás de cada vista de main(); su resultado es lo que se guarda en la caché.
+    Para "Coste Total de Todas" admite también matrices artículos × periodos y devuelve la tabla
+    de comparar_estrategias; para "Barrido de Parámetros", igual, con la tabla de barrer_parametros
+    sobre los ejes costos_pedido, costos_mantenimiento, stocks_seguridad y tiempos_suministro;
+    para el resto devuelve
+    (disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, resultados, costes).
     """
-    inv_acumulado = 0
-    coste_total_posesion = 0
-    coste_total_pedido = 0
-
-    for t in range(len(recepcion_pedidos)):
-        # 1) Cada vez que haces un pedido, sumas C_p
-        if recepcion_pedidos[t] > 0:
-            coste_total_pedido += costo_pedido
-
-        # 2) Actualizas inventario
-        inv_acumulado += recepcion_pedidos[t] - necesidades_netas[t]
-
-        # 3) Si es >0, le aplicas coste de mantenimiento
-        if inv_acumulado > 0:
-            coste_total_posesion += inv_acumulado * costo_mantenimiento
-
-    coste = coste_total_pedido + coste_total_posesion
-    return coste, coste_total_posesion, coste_total_pedido
-
-
-# LOTE A LOTE
-def calcular_lote_a_lote(necesidades_brutas, recepciones_programadas, tiempo_suministro, stock_seguridad, disponibilidad_inicial):
-    periodos = len(necesidades_brutas)
-    disponibilidades = [0] * periodos
-    necesidades_netas = [0] * periodos
-    recepcion_pedidos = [0] * periodos
-    lanzamiento_pedidos = [0] * periodos
-    disponible_adicional = [0] * periodos
-
-    # Disponibilidad inicial
-    disponibilidades[0] = max(disponibilidad_inicial, stock_seguridad)
-
-    for t in range(periodos):
-        if t > 0:
-            disponibilidades[t] = max(
-                stock_seguridad, 
-                recepcion_pedidos[t-1] - necesidades_brutas[t-1] + disponibilidades[t-1] + recepciones_programadas[t-1]
-            )
-        necesidades_netas[t] = max(
-            0, 
-            necesidades_brutas[t] - disponibilidades[t] - recepciones_programadas[t] + stock_seguridad
+    if metodo == "Barrido de Parámetros":
+        return barrer_parametros(
+            necesidades_brutas, recepciones_programadas, {"disponibilidad_inicial": disponibilidad_inicial},
+            costos_pedido, costos_mantenimiento, stocks_seguridad, tiempos_suministro
         )
-        recepcion_pedidos[t] = necesidades_netas[t]
-        lanzamiento_pedidos[t - tiempo_suministro] = recepcion_pedidos[t]
-        if t > 0:
-            disponible_adicional[t] = disponible_adicional[t-1] - necesidades_netas[t] + recepcion_pedidos[t]
-        else:
-            disponible_adicional[t] = disponibilidades[t] - necesidades_netas[t] + recepcion_pedidos[t]
-    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
-
-# EOQ
-def calcular_eoq(necesidades_brutas, costo_pedido, costo_mantenimiento, recepciones_programadas, periodos, tiempo_suministro, stock_seguridad, disponibilidad_inicial):
-    periodos = len(necesidades_brutas)
-    disponibilidades = [0] * periodos
-    necesidades_netas = [0] * periodos
-    recepcion_pedidos = [0] * periodos
-    lanzamiento_pedidos = [0] * periodos
-    disponible_adicional = [0] * periodos
-
-    # Disponibilidad inicial
-    disponibilidades[0] = max(disponibilidad_inicial, stock_seguridad)
-
-    for t in range(periodos):
-        if t > 0:
-            disponibilidades[t] = max(
-                stock_seguridad,
-                recepcion_pedidos[t-1] - necesidades_brutas[t-1] + disponibilidades[t-1] + recepciones_programadas[t-1]
-            )
-        necesidades_netas[t] = max(
-            0,
-            necesidades_brutas[t] - disponibilidades[t] - recepciones_programadas[t] + stock_seguridad
+    if metodo == "Coste Total de Todas":
+        return comparar_estrategias(
+            necesidades_brutas, recepciones_programadas,
+            {
+                "tiempo_suministro": tiempo_suministro,
+                "stock_seguridad": stock_seguridad,
+                "disponibilidad_inicial": disponibilidad_inicial,
+                "costo_pedido": costo_pedido,
+                "costo_mantenimiento": costo_mantenimiento,
+            }
         )
 
-    demanda_total = sum(necesidades_netas)
-    if demanda_total == 0:
-        return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, 0, disponible_adicional
-
-    EOQ = int(np.ceil(np.sqrt((2 * demanda_total * costo_pedido) / (costo_mantenimiento * periodos))))
-    stock = 0
-
-    for t in range(periodos):
-        if stock < necesidades_netas[t]:
-            recepcion_pedidos[t] = EOQ
-            stock += EOQ
-        stock -= necesidades_netas[t]
-        lanzamiento_pedidos[t - tiempo_suministro] = recepcion_pedidos[t]
-        disponible_adicional[t] = stock
-
-    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, EOQ, disponible_adicional
-
-# PERIODO CONSTANTE
-def calcular_periodo_constante(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
-                               stock_seguridad, disponibilidad_inicial, periodo_constante):
-    periodos = len(necesidades_brutas)
-    disponibilidades = [0] * periodos
-    necesidades_netas = [0] * periodos
-    recepcion_pedidos = [0] * periodos
-    lanzamiento_pedidos = [0] * periodos
-    disponible_adicional = [0] * periodos
-
-    # Disponibilidad inicial
-    disponibilidades[0] = max(disponibilidad_inicial, stock_seguridad)
-
-    for t in range(periodos):
-        if t > 0:
-            disponibilidades[t] = max(
-                stock_seguridad, 
-                recepcion_pedidos[t-1] - necesidades_brutas[t-1] + disponibilidades[t-1] + recepciones_programadas[t-1]
+    # Cálculo según método individual
+    resultados = None
+    with INSTRUMENTACION.etapa(f"metodo:{metodo}"):
+        if metodo == "Lote a Lote":
+            disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, _ = calcular_lote_a_lote(
+                necesidades_brutas, recepciones_programadas,
+                tiempo_suministro, stock_seguridad,
+                disponibilidad_inicial
+            )
+        elif metodo in ("EOQ", "POQ"):
+            disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, _ = (
+                calcular_eoq if metodo == "EOQ" else calcular_poq
+            )(
+                necesidades_brutas, recepciones_programadas,
+                tiempo_suministro, stock_seguridad,
+                disponibilidad_inicial, costo_pedido,
+                costo_mantenimiento
+            )
+        elif metodo == "Periodo Constante":
+            disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, _ = calcular_periodo_constante(
+                necesidades_brutas, recepciones_programadas,
+                tiempo_suministro, stock_seguridad,
+                disponibilidad_inicial, periodo_constante
+            )
+        elif metodo == "Wagner-Whitin":
+            disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, _ = calcular_wagner_whitin(
+                necesidades_brutas, recepciones_programadas,
+                tiempo_suministro, stock_seguridad,
+                disponibilidad_inicial, costo_pedido,
+                costo_mantenimiento
             )
-        necesidades_netas[t] = max(
-            0, 
-            necesidades_brutas[t] - disponibilidades[t] - recepciones_programadas[t] + stock_seguridad
-        )
-
-    for t in range(periodos):
-        if t % periodo_constante == 0:
-            valor_periodo = sum(necesidades_netas[t:t+periodo_constante])
-            colocado = False
-        if necesidades_netas[t] > 0 and not colocado:
-            recepcion_pedidos[t] = valor_periodo
-            colocado = True
-        lanzamiento_pedidos[t - tiempo_suministro] = recepcion_pedidos[t]
-        if t > 0:
-            disponible_adicional[t] = recepcion_pedidos[t] - necesidades_netas[t] + disponible_adicional[t-1]
         else:
-            disponible_adicional[t] = disponibilidades[t] - necesidades_netas[t] + recepcion_pedidos[t]
-    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
-
-# MÍNIMO COSTE UNITARIO (detalle con columnas: Periodo, NNi, Q, Coste Posesión, Coste Posesión / u, Cost Emisión / u, Cost Total / u)
-def calcular_minimo_coste_unitario(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
-                                   stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento):
-    periodos = len(necesidades_brutas)
-    disponibilidades = [0] * periodos
-    necesidades_netas = [0] * periodos
-    recepcion_pedidos = [0] * periodos
-    lanzamiento_pedidos = [0] * periodos
-    disponible_adicional = [0] * periodos
-    disponibilidades[0] = max(disponibilidad_inicial, stock_seguridad)
-    for t in range(periodos):
-        if t > 0:
-            disponibilidades[t] = max(
-                stock_seguridad,
-                recepcion_pedidos[t-1] - necesidades_brutas[t-1] + disponibilidades[t-1] + recepciones_programadas[t-1]
+            heuristica = {
+                "Minimo Coste Unitario": calcular_minimo_coste_unitario,
+                "Minimo Coste Total": calcular_minimo_coste_total,
+                "Silver Meal": calcular_silver_meal,
+            }[metodo]
+            resultados = heuristica(
+                necesidades_brutas, recepciones_programadas,
+                tiempo_suministro, stock_seguridad,
+                disponibilidad_inicial, costo_pedido,
+                costo_mantenimiento
             )
-        necesidades_netas[t] = max(
-            0,
-            necesidades_brutas[t] - disponibilidades[t] - recepciones_programadas[t] + stock_seguridad
-        )
-
-    inicio_ciclo = None
-    Q_acumulado = 0
-    costo_posesion_acumulado = 0
-    prev_unit_cost = None
-
-    periodo_tabla = []
-    necesidades_netas_tabla = []
-    Q_list = []
-    cost_pos_list = []
-    cost_pos_por_unidad = []
-    cost_emi_por_unidad = []
-    cost_total_por_unidad = []
-
-    def registrar_fila(periodo, necesidad, Q_val, cost_pos_val, cost_pos_u, cost_emi_u, cost_tot_u):
-        periodo_tabla.append(periodo)
-        necesidades_netas_tabla.append(necesidad)
-        Q_list.append(Q_val)
-        cost_pos_list.append(cost_pos_val)
-        cost_pos_por_unidad.append(cost_pos_u)
-        cost_emi_por_unidad.append(cost_emi_u)
-        cost_total_por_unidad.append(cost_tot_u)
-
-    for t in range(periodos):
-        if necesidades_netas[t] > 0 or inicio_ciclo is not None:
-            if inicio_ciclo is None:
-                inicio_ciclo = t
-                Q_acumulado = necesidades_netas[t]
-                costo_posesion_acumulado = 0
-                unit_cost = (costo_pedido / Q_acumulado) if Q_acumulado else 0
-                prev_unit_cost = unit_cost
-                registrar_fila(
-                    periodo=t+1,
-                    necesidad=necesidades_netas[t],
-                    Q_val=Q_acumulado,
-                    cost_pos_val=costo_posesion_acumulado,
-                    cost_pos_u=0,
-                    cost_emi_u=(costo_pedido / Q_acumulado if Q_acumulado else 0),
-                    cost_tot_u=unit_cost
-                )
-            else:
-                Q_nuevo = Q_acumulado + necesidades_netas[t]
-                costo_adicional = (t - inicio_ciclo) * costo_mantenimiento * necesidades_netas[t]
-                costo_posesion_nuevo = costo_posesion_acumulado + costo_adicional
-                unit_cost_nuevo = ((costo_pedido + costo_posesion_nuevo) / Q_nuevo) if Q_nuevo else 0
-                registrar_fila(
-                    periodo=t+1,
-                    necesidad=necesidades_netas[t],
-                    Q_val=Q_nuevo,
-                    cost_pos_val=costo_posesion_nuevo,
-                    cost_pos_u=(costo_posesion_nuevo / Q_nuevo if Q_nuevo else 0),
-                    cost_emi_u=(costo_pedido / Q_nuevo if Q_nuevo else 0),
-                    cost_tot_u=unit_cost_nuevo
-                )
-                if unit_cost_nuevo > prev_unit_cost:
-                    recepcion_pedidos[inicio_ciclo] = Q_acumulado
-                    lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-                    inicio_ciclo = t
-                    Q_acumulado = necesidades_netas[t]
-                    costo_posesion_acumulado = 0
-                    unit_cost_nuevo = (costo_pedido / Q_acumulado) if Q_acumulado else 0
-                    prev_unit_cost = unit_cost_nuevo
-                    registrar_fila(
-                        periodo=t+1,
-                        necesidad=necesidades_netas[t],
-                        Q_val=Q_acumulado,
-                        cost_pos_val=costo_posesion_acumulado,
-                        cost_pos_u=0,
-                        cost_emi_u=(costo_pedido / Q_acumulado if Q_acumulado else 0),
-                        cost_tot_u=unit_cost_nuevo
-                    )
-                elif unit_cost_nuevo == prev_unit_cost:
-                    if any(n > 0 for n in necesidades_netas[t+1:]):
-                        Q_acumulado = Q_nuevo
-                        costo_posesion_acumulado = costo_posesion_nuevo
-                        prev_unit_cost = unit_cost_nuevo
-                    else:
-                        recepcion_pedidos[inicio_ciclo] = Q_acumulado
-                        lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-                        inicio_ciclo = None
-                        Q_acumulado = 0
-                        costo_posesion_acumulado = 0
-                        prev_unit_cost = None
-                else:
-                    Q_acumulado = Q_nuevo
-                    costo_posesion_acumulado = costo_posesion_nuevo
-                    prev_unit_cost = unit_cost_nuevo
-
-    if inicio_ciclo is not None and Q_acumulado > 0:
-        recepcion_pedidos[inicio_ciclo] = Q_acumulado
-        lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-    
-    return {
-        "disponibilidades": disponibilidades,
-        "necesidades_netas": necesidades_netas,
-        "recepcion_pedidos": recepcion_pedidos,
-        "lanzamiento_pedidos": lanzamiento_pedidos,
-        "disponible_adicional": disponible_adicional,
-        "periodo_tabla": periodo_tabla,
-        "necesidades_netas_tabla": necesidades_netas_tabla,
-        "Q": Q_list,
-        "coste_posesion": cost_pos_list,
-        "coste_posesion_por_unidad": cost_pos_por_unidad,
-        "coste_emision_por_unidad": cost_emi_por_unidad,
-        "coste_total_por_unidad": cost_total_por_unidad
-    }
+            disponibilidades = resultados.disponibilidades
+            necesidades_netas = resultados.necesidades_netas
+            recepcion_pedidos = resultados.recepcion_pedidos
+            lanzamiento_pedidos = resultados.lanzamiento_pedidos
+
+    # --- Cálculo de costes totales individual ---
+    costes = calcular_coste_total(
+        recepcion_pedidos, necesidades_netas,
+        costo_pedido, costo_mantenimiento
+    )
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, resultados, costes
 
-# MINIMO COSTE TOTAL  
-# En esta función el coste de emisión es siempre costo_pedido (no se divide), y la desviación se calcula como |coste_posesion - costo_pedido|
-def calcular_minimo_coste_total(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
-                                stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento):
-    periodos = len(necesidades_brutas)
-    disponibilidades = [0] * periodos
-    necesidades_netas = [0] * periodos
-    recepcion_pedidos = [0] * periodos
-    lanzamiento_pedidos = [0] * periodos
-    disponible_adicional = [0] * periodos
-
-    # Calcular disponibilidades y necesidades netas
-    disponibilidades[0] = max(disponibilidad_inicial, stock_seguridad)
-    for t in range(periodos):
-        if t > 0:
-            disponibilidades[t] = max(
-                stock_seguridad,
-                recepcion_pedidos[t-1] - necesidades_brutas[t-1]
-                + disponibilidades[t-1] + recepciones_programadas[t-1]
-            )
-        necesidades_netas[t] = max(
-            0,
-            necesidades_brutas[t] - disponibilidades[t] - recepciones_programadas[t] + stock_seguridad
-        )
 
-    # Variables para la lógica de acumulación
-    inicio_ciclo = None            
-    Q_acumulado = 0                
-    costo_posesion_acumulado = 0   
-    prev_desviacion = None         
-
-    # Listas para la tabla final
-    periodo_tabla = []
-    necesidades_netas_tabla = []
-    Q_list = []
-    coste_posesion_list = []
-    coste_emision_list = []
-    desviacion_list = []
-
-    # Función para registrar una fila
-    def registrar_fila(periodo, necesidad, Q_val, coste_pos_val):
-
-        coste_emision_val = costo_pedido
-        desviacion_val = abs(coste_pos_val - coste_emision_val)
-
-        periodo_tabla.append(periodo)
-        necesidades_netas_tabla.append(necesidad)
-        Q_list.append(Q_val)
-        coste_posesion_list.append(coste_pos_val)
-        coste_emision_list.append(coste_emision_val)
-        desviacion_list.append(desviacion_val)
-
-        return desviacion_val  # Devolvemos la desviación para compararla afuera
-
-    # Bucle principal
-    for t in range(periodos):
-        # Solo procesamos si hay necesidad en este periodo o si ya se inició un ciclo
-        if necesidades_netas[t] > 0 or inicio_ciclo is not None:
-            if inicio_ciclo is None:
-                # Iniciar ciclo en este periodo
-                inicio_ciclo = t
-                Q_acumulado = necesidades_netas[t]
-                costo_posesion_acumulado = 0
-                # Registramos la fila (desviacion_inicial)
-                desviacion_nueva = registrar_fila(periodo=t+1,
-                                                  necesidad=necesidades_netas[t],
-                                                  Q_val=Q_acumulado,
-                                                  coste_pos_val=costo_posesion_acumulado)
-                prev_desviacion = desviacion_nueva
-            else:
-                # Acumulamos
-                Q_nuevo = Q_acumulado + necesidades_netas[t]
-                # Coste adicional de posesión
-                costo_adicional = (t - inicio_ciclo) * costo_mantenimiento * necesidades_netas[t]
-                costo_posesion_nuevo = costo_posesion_acumulado + costo_adicional
-
-                # Registramos la fila y calculamos la desviación nueva
-                desviacion_nueva = registrar_fila(periodo=t+1,
-                                                  necesidad=necesidades_netas[t],
-                                                  Q_val=Q_nuevo,
-                                                  coste_pos_val=costo_posesion_nuevo)
-
-                # Comparamos la desviación
-                if desviacion_nueva > prev_desviacion:
-                    # El mínimo relativo se produjo en el paso anterior
-                    # Fijamos el pedido en el periodo "inicio_ciclo"
-                    recepcion_pedidos[inicio_ciclo] = Q_acumulado
-                    lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-
-                    # Reiniciamos el ciclo en este periodo
-                    inicio_ciclo = t
-                    Q_acumulado = necesidades_netas[t]
-                    costo_posesion_acumulado = 0
-                    # Registramos la "segunda fila" para el mismo periodo t
-                    desviacion_nueva = registrar_fila(periodo=t+1,
-                                                      necesidad=necesidades_netas[t],
-                                                      Q_val=Q_acumulado,
-                                                      coste_pos_val=costo_posesion_acumulado)
-                    prev_desviacion = desviacion_nueva
-
-                elif desviacion_nueva == prev_desviacion:
-                    # Si es igual, comprobamos si quedan necesidades futuras
-                    if any(n > 0 for n in necesidades_netas[t+1:]):
-                        Q_acumulado = Q_nuevo
-                        costo_posesion_acumulado = costo_posesion_nuevo
-                        prev_desviacion = desviacion_nueva
-                    else:
-                        # No quedan necesidades futuras
-                        recepcion_pedidos[inicio_ciclo] = Q_acumulado
-                        lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-                        inicio_ciclo = None
-                        Q_acumulado = 0
-                        costo_posesion_acumulado = 0
-                        prev_desviacion = None
-                else:
-                    # Si la desviación ha disminuido
-                    Q_acumulado = Q_nuevo
-                    costo_posesion_acumulado = costo_posesion_nuevo
-                    prev_desviacion = desviacion_nueva
-
-    # Si al finalizar el bucle queda un ciclo abierto, se programa el pedido final
-    if inicio_ciclo is not None and Q_acumulado > 0:
-        recepcion_pedidos[inicio_ciclo] = Q_acumulado
-        lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-
-    # Devolvemos todos los vectores
-    return {
-        "disponibilidades": disponibilidades,
-        "necesidades_netas": necesidades_netas,
-        "recepcion_pedidos": recepcion_pedidos,
-        "lanzamiento_pedidos": lanzamiento_pedidos,
-        "disponible_adicional": disponible_adicional,
-        "periodo_tabla": periodo_tabla,
-        "necesidades_netas_tabla": necesidades_netas_tabla,
-        "Q": Q_list,
-        "coste_posesion": coste_posesion_list,
-        "coste_emision": coste_emision_list,
-        "desviacion": desviacion_list
-    }
+def _cache_calculos():
+    # main() la envuelve en st.cache_resource: una única caché por proceso del servidor, compartida
+    # entre sesiones y reejecuciones del script
+    return CacheLRU(max_entradas=256, ttl=3600)
 
 
-def calcular_silver_meal(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
-                         stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento):
-    periodos = len(necesidades_brutas)
-    disponibilidades = [0] * periodos
-    necesidades_netas = [0] * periodos
-    recepcion_pedidos = [0] * periodos
-    lanzamiento_pedidos = [0] * periodos
-    disponible_adicional = [0] * periodos
-
-    # Cálculo de disponibilidades y necesidades netas
-    disponibilidades[0] = max(disponibilidad_inicial, stock_seguridad)
-    for t in range(periodos):
-        if t > 0:
-            disponibilidades[t] = max(
-                stock_seguridad,
-                recepcion_pedidos[t-1] - necesidades_brutas[t-1] 
-                + disponibilidades[t-1] + recepciones_programadas[t-1]
-            )
-        necesidades_netas[t] = max(
-            0,
-            necesidades_brutas[t] - disponibilidades[t] - recepciones_programadas[t] + stock_seguridad
-        )
+def _mostrar_barrido(barrido):
+    # Superficie de coste C_p × h de cada método, una columna por stock de seguridad. El plazo de
+    # suministro no cambia el coste (solo desplaza los lanzamientos), así que no entra en el mapa
+    import altair as alt
+    import streamlit as st
 
-    # Variables para la lógica de Silver-Meal
-    inicio_ciclo = None            # Periodo donde comienza la acumulación
-    Q_acumulado = 0                # Acumulación de necesidades netas
-    costo_posesion_acumulado = 0   # Coste de posesión acumulado
-    contador_periodos = 0          # Número de periodos que llevamos en el ciclo (incluyendo periodos con NN=0 si ya empezó)
-    prev_silver_meal_val = None    # Valor anterior de la fórmula
-
-    # Listas para la tabla final
-    periodo_tabla = []
-    necesidades_netas_tabla = []
-    Q_list = []
-    coste_posesion_list = []
-    coste_emision_list = []
-    silver_meal_list = []  # (coste_posesion + coste_emision) / contador_periodos
-
-    def registrar_fila(periodo, necesidad, Q_val, coste_pos_val, num_periodos):
-        """
-        Añade una fila a las listas de resultados.
-        cost_emision = costo_pedido (fijo).
-        silver_meal_val = (coste_pos_val + costo_pedido) / num_periodos.
-        """
-        coste_emision_val = costo_pedido
-        silver_val = (coste_pos_val + coste_emision_val) / num_periodos
-
-        periodo_tabla.append(periodo)
-        necesidades_netas_tabla.append(necesidad)
-        Q_list.append(Q_val)
-        coste_posesion_list.append(coste_pos_val)
-        coste_emision_list.append(coste_emision_val)
-        silver_meal_list.append(silver_val)
-
-        return silver_val  # devolvemos el valor para comparar afuera
-
-    # Bucle principal
-    for t in range(periodos):
-        # Si no hay necesidades netas y aún no hemos iniciado un ciclo, no hacemos nada
-        if inicio_ciclo is None and necesidades_netas[t] == 0:
-            continue
-
-        if inicio_ciclo is None:
-            # Primer periodo con NN>0: iniciamos el ciclo
-            inicio_ciclo = t
-            Q_acumulado = necesidades_netas[t]
-            costo_posesion_acumulado = 0
-            contador_periodos = 1  # Empezamos contando este periodo
-            silver_val_inicial = registrar_fila(periodo=t+1,
-                                                necesidad=necesidades_netas[t],
-                                                Q_val=Q_acumulado,
-                                                coste_pos_val=costo_posesion_acumulado,
-                                                num_periodos=contador_periodos)
-            prev_silver_meal_val = silver_val_inicial
-        else:
-            # Ya estamos en un ciclo
-            contador_periodos += 1  # Avanzamos un periodo (aunque NN=0, se cuenta)
-            if necesidades_netas[t] > 0:
-                # Acumulamos la NN de este periodo
-                Q_nuevo = Q_acumulado + necesidades_netas[t]
-                # Coste adicional de posesión
-                costo_adicional = (t - inicio_ciclo) * costo_mantenimiento * necesidades_netas[t]
-                costo_posesion_nuevo = costo_posesion_acumulado + costo_adicional
-
-                # Calculamos el nuevo valor de Silver-Meal
-                silver_meal_nuevo = registrar_fila(periodo=t+1,
-                                                   necesidad=necesidades_netas[t],
-                                                   Q_val=Q_nuevo,
-                                                   coste_pos_val=costo_posesion_nuevo,
-                                                   num_periodos=contador_periodos)
-                # Comparamos
-                if silver_meal_nuevo > prev_silver_meal_val:
-                    # El mínimo relativo se produjo en el periodo anterior
-                    recepcion_pedidos[inicio_ciclo] = Q_acumulado
-                    lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-
-                    # Reiniciamos el ciclo en este periodo
-                    inicio_ciclo = t
-                    Q_acumulado = necesidades_netas[t]
-                    costo_posesion_acumulado = 0
-                    contador_periodos = 1  # este periodo se cuenta como el primero del nuevo ciclo
-
-                    # Registramos la "segunda fila" para el mismo t
-                    silver_meal_nuevo2 = registrar_fila(periodo=t+1,
-                                                        necesidad=necesidades_netas[t],
-                                                        Q_val=Q_acumulado,
-                                                        coste_pos_val=costo_posesion_acumulado,
-                                                        num_periodos=contador_periodos)
-                    prev_silver_meal_val = silver_meal_nuevo2
-                elif silver_meal_nuevo == prev_silver_meal_val:
-                    # Si es igual, comprobamos si hay NN futuras
-                    if any(n > 0 for n in necesidades_netas[t+1:]):
-                        Q_acumulado = Q_nuevo
-                        costo_posesion_acumulado = costo_posesion_nuevo
-                        prev_silver_meal_val = silver_meal_nuevo
-                    else:
-                        # No quedan NN futuras
-                        recepcion_pedidos[inicio_ciclo] = Q_acumulado
-                        lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-                        inicio_ciclo = None
-                        Q_acumulado = 0
-                        costo_posesion_acumulado = 0
-                        contador_periodos = 0
-                        prev_silver_meal_val = None
-                else:
-                    # Si ha bajado, seguimos acumulando
-                    Q_acumulado = Q_nuevo
-                    costo_posesion_acumulado = costo_posesion_nuevo
-                    prev_silver_meal_val = silver_meal_nuevo
-            else:
-                # NN[t] == 0, incrementamos contador_periodos, pero NO registramos fila
-                # (según la especificación, ignoramos ese periodo en la tabla).
-                # No se altera Q_acumulado ni coste_posesion_acumulado.
-                # Solo seguimos con la comparación en periodos futuros.
-                pass
-
-    # Si al final queda un ciclo abierto, programamos el pedido final
-    if inicio_ciclo is not None and Q_acumulado > 0:
-        recepcion_pedidos[inicio_ciclo] = Q_acumulado
-        lanzamiento_pedidos[inicio_ciclo - tiempo_suministro] = recepcion_pedidos[inicio_ciclo]
-
-    # Devolvemos resultados
-    return {
-        "disponibilidades": disponibilidades,
-        "necesidades_netas": necesidades_netas,
-        "recepcion_pedidos": recepcion_pedidos,
-        "lanzamiento_pedidos": lanzamiento_pedidos,
-        "disponible_adicional": disponible_adicional,
-        "periodo_tabla": periodo_tabla,
-        "necesidades_netas_tabla": necesidades_netas_tabla,
-        "Q": Q_list,
-        "coste_posesion": coste_posesion_list,
-        "coste_emision": coste_emision_list,
-        "silver_meal_value": silver_meal_list
+    costes = barrido.drop_duplicates(["metodo", "costo_pedido", "costo_mantenimiento", "stock_seguridad"])
+    ejes = {
+        "x": alt.X("costo_pedido:O", title="Coste de pedido (€)"),
+        "y": alt.Y("costo_mantenimiento:O", title="Coste de mantenimiento (€/ud·periodo)", sort="descending"),
+        "column": alt.Column("stock_seguridad:O", title="Stock de seguridad"),
     }
+    ayuda = ["metodo", "costo_pedido", "costo_mantenimiento", "stock_seguridad", alt.Tooltip("coste_total", format=".0f")]
+
+    st.subheader("Superficie de coste")
+    metodos = list(costes["metodo"].unique())
+    pestanas = st.tabs(["Mejor método", *metodos])
+    with pestanas[0]:
+        mejor = costes.loc[costes.groupby(["costo_pedido", "costo_mantenimiento", "stock_seguridad"])["coste_total"].idxmin()]
+        st.altair_chart(
+            alt.Chart(mejor).mark_rect().encode(**ejes, color=alt.Color("metodo:N", title="Método"), tooltip=ayuda)
+        )
+    for pestana, metodo in zip(pestanas[1:], metodos):
+        with pestana:
+            st.altair_chart(
+                alt.Chart(costes[costes["metodo"] == metodo]).mark_rect().encode(
+                    **ejes, color=alt.Color("coste_total:Q", title="Coste total (€)", scale=alt.Scale(scheme="viridis")),
+                    tooltip=ayuda,
+                )
+            )
+    with st.expander("Tabla completa (con las unidades que habría que lanzar antes del periodo 1 según el plazo)"):
+        st.dataframe(barrido, use_container_width=True)
+        st.download_button("Descargar CSV", barrido.to_csv(index=False), file_name="barrido.csv", mime="text/csv")
+
+
+def _mostrar_instrumentacion(instrumentacion, perfil):
+    # Tiempos del último clic en "Calcular" de la sesión y, si se ha pedido, su perfil de cProfile
+    import streamlit as st
+
+    if instrumentacion.activa:
+        with st.expander("Tiempos por etapa"):
+            st.dataframe(instrumentacion.to_dataframe().style.format({"segundos": "{:.4f}", "ms_por_llamada": "{:.3f}"}))
+            contadores = instrumentacion.resumen()["contadores"]
+            if contadores:
+                st.json(contadores)
+            st.download_button(
+                "Descargar JSON", instrumentacion.to_json(),
+                file_name="instrumentacion.json", mime="application/json"
+            )
+    if perfil is not None:
+        salida = io.StringIO()
+        pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(30)
+        with st.expander("Perfil del cálculo (cProfile)"):
+            st.caption("Un resultado servido desde la caché no vuelve a calcularse y apenas aparece en el perfil")
+            st.code(salida.getvalue())
 
 
 # Main de Streamlit
 def main():
+    # Streamlit solo se importa al arrancar la interfaz: el motor de cálculo se puede importar
+    # (CLI, procesos del pool, tests) sin pagarlo. Streamlit identifica sus cachés por el código
+    # de la función, así que crearlas en cada ejecución del script sigue compartiendo el contenido.
+    import streamlit as st
+    leer_demanda_subida = st.cache_data(max_entries=16)(_leer_demanda_subida)
+    cache_calculos = st.cache_resource(_cache_calculos)
+
     st.title("Planificación de las Necesidades de Materiales")
     metodos = [
         "Lote a Lote",
+        "EOQ",
+        "POQ",
         "Periodo Constante",
         "Minimo Coste Unitario",
         "Minimo Coste Total",
         "Silver Meal",
-        "Coste Total de Todas"
+        "Wagner-Whitin",
+        "Coste Total de Todas",
+        "Barrido de Parámetros",
     ]
     metodo = st.selectbox("Seleccione un método", metodos)
+    modo_entrada = st.radio("Entrada de datos", ["Tabla editable", "Fichero CSV/Parquet"], horizontal=True)
 
     # Parámetro extra para método Periodo Constante si se elige individual
     if metodo == "Periodo Constante":
@@ -583,10 +220,11 @@ def main():
             format="%d"
         )
 
-    periodos = st.number_input(
-        "Número de períodos", min_value=1, step=1, value=8,
-        format="%d"
-    )
+    if modo_entrada == "Tabla editable":
+        periodos = st.number_input(
+            "Número de períodos", min_value=1, step=1, value=8,
+            format="%d"
+        )
     tiempo_suministro = st.number_input(
         "Tiempo de suministro", min_value=1, step=1, value=1,
         format="%d"
@@ -611,178 +249,117 @@ def main():
         format="%.1f"
     )
 
-    def input_row(label, key_prefix, default_values, periodos):
-        st.write(f"### {label}")
-        if len(default_values) < periodos:
-            default_values = default_values + [0] * (periodos - len(default_values))
+    if metodo == "Barrido de Parámetros":
+        # Ejes de la rejilla, por defecto alrededor de los valores de arriba
+        texto_pedido = st.text_input(
+            "Costes de pedido a barrer (separados por comas)",
+            ", ".join(f"{costo_pedido * factor:g}" for factor in (0.5, 0.8, 1, 1.2, 1.5))
+        )
+        texto_mantenimiento = st.text_input(
+            "Costes de mantenimiento a barrer",
+            ", ".join(f"{costo_mantenimiento * factor:g}" for factor in (0.5, 0.8, 1, 1.2, 1.5))
+        )
+        texto_stock = st.text_input("Stocks de seguridad a barrer", f"{stock_seguridad}")
+        texto_plazos = st.text_input("Tiempos de suministro a barrer", f"{tiempo_suministro}, {tiempo_suministro + 1}")
+        try:
+            barrido = {
+                "costos_pedido": _valores_barrido(texto_pedido),
+                "costos_mantenimiento": _valores_barrido(texto_mantenimiento),
+                "stocks_seguridad": _valores_barrido(texto_stock, int),
+                "tiempos_suministro": _valores_barrido(texto_plazos, int),
+            }
+        except ValueError as error:
+            st.error(f"Valores del barrido no válidos: {error}")
+            return
+
+    def tabla_editable(periodos):
+        # Una sola rejilla editable para las dos filas de entrada
+        tabla = pd.DataFrame(
+            0, index=["Necesidades Brutas", "Recepciones Programadas"],
+            columns=[str(i+1) for i in range(periodos)]
+        )
+        tabla = st.data_editor(
+            tabla, key=f"entrada_{periodos}", use_container_width=True,
+            column_config={
+                columna: st.column_config.NumberColumn(min_value=0, step=1, format="%d")
+                for columna in tabla.columns
+            }
+        ).fillna(0).astype(np.int64)
+        return tabla.loc["Necesidades Brutas"].to_numpy(), tabla.loc["Recepciones Programadas"].to_numpy()
+
+    articulos = None
+    if modo_entrada == "Tabla editable":
+        necesidades_brutas, recepciones_programadas = tabla_editable(periodos)
+    else:
+        fichero = st.file_uploader(
+            "Fichero de demanda: columnas articulo, tipo (NB o RP) y una columna por periodo",
+            type=["csv", "parquet"]
+        )
+        if fichero is None:
+            return
+        try:
+            articulos, matriz_nb, matriz_rp = leer_demanda_subida(fichero.getvalue(), fichero.name)
+        except (ValueError, ImportError) as error:
+            st.error(f"No se ha podido leer el fichero: {error}")
+            return
+        periodos = matriz_nb.shape[1]
+        st.write(f"{len(articulos)} artículos × {periodos} periodos")
+        if metodo in ("Coste Total de Todas", "Barrido de Parámetros"):
+            necesidades_brutas, recepciones_programadas = matriz_nb, matriz_rp
         else:
-            default_values = default_values[:periodos]
-
-        cols = st.columns(periodos)
-        for i, col in enumerate(cols):
-            with col:
-                st.markdown(
-                    f"<div style='text-align: center; font-weight: bold;'>{i+1}</div>",
-                    unsafe_allow_html=True
-                )
-        return [
-            cols[i].number_input(
-                "", min_value=0, step=1,
-                key=f"{key_prefix}_{i}",
-                value=default_values[i],
-                format="%d"
+            i = st.selectbox("Artículo", range(len(articulos)), format_func=lambda i: str(articulos[i]))
+            necesidades_brutas, recepciones_programadas = matriz_nb[i], matriz_rp[i]
+
+    # Cada sesión mide en su propia instrumentación: las sesiones son hilos del mismo proceso y no
+    # deben activar, desactivar ni reiniciar las medidas de las demás
+    if "instrumentacion" not in st.session_state:
+        st.session_state.instrumentacion = Instrumentacion(activa=INSTRUMENTACION.activa)
+    instrumentacion = st.session_state.instrumentacion
+    with st.sidebar:
+        instrumentacion.activa = st.checkbox("Medir tiempos por etapa", value=instrumentacion.activa)
+        perfilar = st.checkbox("Perfilar el cálculo (cProfile)")
+
+    def calcular_y_mostrar():
+        parametros = {
+            "tiempo_suministro": tiempo_suministro,
+            "stock_seguridad": stock_seguridad,
+            "disponibilidad_inicial": disponibilidad_inicial,
+            "costo_pedido": costo_pedido,
+            "costo_mantenimiento": costo_mantenimiento,
+        }
+        if metodo == "Periodo Constante":
+            parametros["periodo_constante"] = periodo_constante
+        if metodo == "Barrido de Parámetros":
+            parametros.update(barrido)
+        cache = cache_calculos()
+        with instrumentacion.etapa("calculo"):
+            calculo = cache.obtener(
+                clave_planificacion(metodo, necesidades_brutas, recepciones_programadas, **parametros),
+                lambda: _calcular_vista(metodo, necesidades_brutas, recepciones_programadas, **parametros)
             )
-            for i in range(periodos)
-        ]
-
-    necesidades_brutas_defaults = [0, 0, 0, 0, 0, 0, 0, 0]
-    recepciones_programadas_defaults = [0] * periodos
+        st.caption(f"Caché de cálculos: {cache.aciertos} aciertos, {cache.fallos} fallos, {len(cache)} resultados guardados")
 
-    necesidades_brutas = input_row(
-        "Necesidades Brutas",
-        "nb",
-        necesidades_brutas_defaults,
-        periodos
-    )
-    recepciones_programadas = input_row(
-        "Recepciones Programadas",
-        "rp",
-        recepciones_programadas_defaults,
-        periodos
-    )
+        if metodo == "Barrido de Parámetros":
+            with instrumentacion.etapa("render"):
+                _mostrar_barrido(calculo)
+            return
 
-    if st.button("Calcular"):
         # Coste Total de Todas
         if metodo == "Coste Total de Todas":
-            # Lote a Lote
-            d_lote, nn_lote, q_lote, l_lote, _ = calcular_lote_a_lote(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial
-            )
-            coste_lote, _, _ = calcular_coste_total(
-                q_lote, nn_lote, costo_pedido, costo_mantenimiento
-            )
-            # Periodo Constante para varios periodos: 2, 3 y 4
-            costes_pc = []
-            for pc in (2, 3, 4):
-                d_pc, nn_pc, q_pc, l_pc, _ = calcular_periodo_constante(
-                    necesidades_brutas, recepciones_programadas,
-                    tiempo_suministro, stock_seguridad,
-                    disponibilidad_inicial, pc
-                )
-                c_pc, _, _ = calcular_coste_total(
-                    q_pc, nn_pc, costo_pedido, costo_mantenimiento
-                )
-                costes_pc.append((pc, c_pc))
-            # Minimo Coste Unitario
-            res_mcu = calcular_minimo_coste_unitario(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, costo_pedido,
-                costo_mantenimiento
-            )
-            coste_mcu, _, _ = calcular_coste_total(
-                res_mcu["recepcion_pedidos"],
-                res_mcu["necesidades_netas"],
-                costo_pedido, costo_mantenimiento
-            )
-            # Minimo Coste Total
-            res_mct = calcular_minimo_coste_total(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, costo_pedido,
-                costo_mantenimiento
-            )
-            coste_mct, _, _ = calcular_coste_total(
-                res_mct["recepcion_pedidos"],
-                res_mct["necesidades_netas"],
-                costo_pedido, costo_mantenimiento
-            )
-            # Silver Meal
-            res_sm = calcular_silver_meal(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, costo_pedido,
-                costo_mantenimiento
-            )
-            coste_sm, _, _ = calcular_coste_total(
-                res_sm["recepcion_pedidos"],
-                res_sm["necesidades_netas"],
-                costo_pedido, costo_mantenimiento
-            )
-
-            # Preparar DataFrame
-            estrategias = ["Lote a Lote"] + [f"Periodo Constante ({pc})" for pc, _ in costes_pc] + [
-                "Minimo Coste Unitario",
-                "Minimo Coste Total",
-                "Silver Meal"
-            ]
-            costes = [coste_lote] + [c for _, c in costes_pc] + [
-                coste_mcu,
-                coste_mct,
-                coste_sm
-            ]
-            df_costes = pd.DataFrame({
-                "Estrategia": estrategias,
-                "Coste Total (€)": costes
-            }).set_index("Estrategia")
-            st.subheader("Costes Totales por Estrategia")
-            st.dataframe(df_costes.style.format("{:.0f}"))
+            with instrumentacion.etapa("render"):
+                df_costes = calculo.sum().to_frame("Coste Total (€)")
+                df_costes.index.name = "Estrategia"
+                st.subheader("Costes Totales por Estrategia")
+                st.dataframe(df_costes.style.format("{:.0f}"))
+                if articulos is not None and len(articulos) > 1:
+                    st.subheader("Costes por Artículo")
+                    df_articulos = calculo.set_axis(articulos).round(0)
+                    df_articulos.index.name = "Artículo"
+                    st.dataframe(df_articulos, use_container_width=True)
             return
 
-        # Cálculo según método individual 
-        if metodo == "Lote a Lote":
-            disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, _ = calcular_lote_a_lote(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial
-            )
-        elif metodo == "Periodo Constante":
-            disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, _ = calcular_periodo_constante(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, periodo_constante
-            )
-        elif metodo == "Minimo Coste Unitario":
-            resultados = calcular_minimo_coste_unitario(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, costo_pedido,
-                costo_mantenimiento
-            )
-            disponibilidades = resultados["disponibilidades"]
-            necesidades_netas = resultados["necesidades_netas"]
-            recepcion_pedidos = resultados["recepcion_pedidos"]
-            lanzamiento_pedidos = resultados["lanzamiento_pedidos"]
-        elif metodo == "Minimo Coste Total":
-            resultados = calcular_minimo_coste_total(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, costo_pedido,
-                costo_mantenimiento
-            )
-            disponibilidades = resultados["disponibilidades"]
-            necesidades_netas = resultados["necesidades_netas"]
-            recepcion_pedidos = resultados["recepcion_pedidos"]
-            lanzamiento_pedidos = resultados["lanzamiento_pedidos"]
-        else:  # Silver Meal
-            resultados = calcular_silver_meal(
-                necesidades_brutas, recepciones_programadas,
-                tiempo_suministro, stock_seguridad,
-                disponibilidad_inicial, costo_pedido,
-                costo_mantenimiento
-            )
-            disponibilidades = resultados["disponibilidades"]
-            necesidades_netas = resultados["necesidades_netas"]
-            recepcion_pedidos = resultados["recepcion_pedidos"]
-            lanzamiento_pedidos = resultados["lanzamiento_pedidos"]
-
-        # --- Cálculo de costes totales individual ---
-        coste, coste_total_posesion, coste_total_pedido = calcular_coste_total(
-            recepcion_pedidos, necesidades_netas,
-            costo_pedido, costo_mantenimiento
-        )
+        disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, resultados, costes = calculo
+        coste, coste_total_posesion, coste_total_pedido = costes
 
         st.markdown(f"""
         <div style='text-align: center;'>
@@ -793,67 +370,63 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
-                # Tabla
-        launch_positions = [(i+1 - tiempo_suministro) for i in range(periodos) if recepcion_pedidos[i] > 0]
-        min_launch = min(launch_positions) if launch_positions else 1
-        start_col = min_launch if min_launch <= 0 else 1
-        all_cols = list(range(start_col, periodos + 1))
-        rows = {
-            "Necesidades Brutas":      {i+1: necesidades_brutas[i] for i in range(periodos)},
-            "Disponibilidades":        {i+1: disponibilidades[i]    for i in range(periodos)},
-            "Recepciones Programadas": {i+1: recepciones_programadas[i] for i in range(periodos)},
-            "Necesidades Netas":       {i+1: necesidades_netas[i]   for i in range(periodos)},
-            "Recepción de Pedidos":    {i+1: recepcion_pedidos[i]   for i in range(periodos)},
-            "Lanzamiento de Pedidos":  {(i+1 - tiempo_suministro): recepcion_pedidos[i] for i in range(periodos)}
-        }
-        data_aux = {name: [mapping.get(col, 0) for col in all_cols] for name, mapping in rows.items()}
-        df_aux = pd.DataFrame(data_aux, index=[str(c) for c in all_cols]).T
-        st.markdown("<h2 style='text-align: center;'>Resultados</h2>", unsafe_allow_html=True)
-        st.dataframe(
-            df_aux.style.format("{:.0f}"),
-            use_container_width=True
-        )
+        with instrumentacion.etapa("tabla"):
+            # Tabla: todas las filas en la escala de los lanzamientos (origen desplazado tiempo_suministro
+            # periodos), así que la tabla es un corte del array desde el primer lanzamiento atrasado
+            origen = tiempo_suministro
+            tabla = np.zeros((6, origen + periodos))
+            tabla[:5, origen:] = (
+                necesidades_brutas, disponibilidades, recepciones_programadas, necesidades_netas, recepcion_pedidos
+            )
+            tabla[5] = lanzamiento_pedidos
+            atrasados = np.flatnonzero(lanzamiento_pedidos[:origen])
+            inicio = atrasados[0] if len(atrasados) else origen
+            df_aux = pd.DataFrame(
+                tabla[:, inicio:],
+                index=[
+                    "Necesidades Brutas", "Disponibilidades", "Recepciones Programadas",
+                    "Necesidades Netas", "Recepción de Pedidos", "Lanzamiento de Pedidos",
+                ],
+                columns=[str(c) for c in range(inicio - origen + 1, periodos + 1)],
+            )
+        with instrumentacion.etapa("render"):
+            st.markdown("<h2 style='text-align: center;'>Resultados</h2>", unsafe_allow_html=True)
+            st.dataframe(
+                df_aux.style.format("{:.0f}"),
+                use_container_width=True
+            )
 
-        # Mostrar detalle para métodos especiales
-        if metodo == "Minimo Coste Unitario":
-            st.markdown("## Detalle del cálculo de Mínimo Coste Unitario")
-            data_detalle = {
-                "Periodo": resultados["periodo_tabla"],
-                "NNi": resultados["necesidades_netas_tabla"],
-                "Q": resultados["Q"],
-                "Coste Posesión": resultados["coste_posesion"],
-                "Cost Posesión / u": resultados["coste_posesion_por_unidad"],
-                "Cost Emisión / u": resultados["coste_emision_por_unidad"],
-                "Cost Total / u": resultados["coste_total_por_unidad"]
-            }
-            df_detalle = pd.DataFrame(data_detalle)
-            st.dataframe(df_detalle)
-
-        elif metodo == "Minimo Coste Total":
-            st.markdown("## Detalle del cálculo de Mínimo Coste Total")
-            data_detalle = {
-                "Periodo": resultados["periodo_tabla"],
-                "NNi": resultados["necesidades_netas_tabla"],
-                "Q": resultados["Q"],
-                "Coste Posesión": resultados["coste_posesion"],
-                "Coste Emisión": resultados["coste_emision"],
-                "Desviación": resultados["desviacion"]
-            }
-            df_detalle = pd.DataFrame(data_detalle)
-            st.dataframe(df_detalle)
-
-        elif metodo == "Silver Meal":
-            st.markdown("## Detalle del cálculo de Silver Meal")
-            data_detalle = {
-                "Periodo": resultados["periodo_tabla"],
-                "NNi": resultados["necesidades_netas_tabla"],
-                "Q": resultados["Q"],
-                "Coste Posesión": resultados["coste_posesion"],
-                "Coste Emisión": resultados["coste_emision"],
-                "Silver Meal": resultados["silver_meal_value"]
-            }
-            df_detalle = pd.DataFrame(data_detalle)
-            st.dataframe(df_detalle)
+            # Mostrar detalle para métodos especiales
+            if metodo == "Minimo Coste Unitario":
+                st.markdown("## Detalle del cálculo de Mínimo Coste Unitario")
+                st.dataframe(resultados.to_dataframe())
+
+            elif metodo == "Minimo Coste Total":
+                st.markdown("## Detalle del cálculo de Mínimo Coste Total")
+                st.dataframe(resultados.to_dataframe())
+
+            elif metodo == "Silver Meal":
+                st.markdown("## Detalle del cálculo de Silver Meal")
+                st.dataframe(resultados.to_dataframe())
+
+    if st.button("Calcular"):
+        perfil = cProfile.Profile() if perfilar else None
+        instrumentacion.reiniciar()
+        if perfil is not None:
+            try:
+                perfil.enable()
+            except ValueError:
+                # Solo puede haber un perfilador activo por proceso (p. ej. otra sesión perfilando)
+                st.warning("Ya hay otro perfil en curso en el servidor; se calcula sin perfilar")
+                perfil = None
+        try:
+            # Lo que mide el motor con INSTRUMENTACION va a la instrumentación de la sesión
+            with instrumentacion.medir():
+                calcular_y_mostrar()
+        finally:
+            if perfil is not None:
+                perfil.disable()
+        _mostrar_instrumentacion(instrumentacion, perfil)
 
 
 
@@ -0,0 +1,280 @@
+"""
+Benchmarks de rendimiento del motor de planificación.
+
+Uso: python benchmark.py [--articulos N] [--periodos T] [--repeticiones R] [--procesos P]
+                           [--horizontes H1 H2 ...] [--enlaces E] [--instrumentacion FICHERO.json]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from mrp import (
+    INSTRUMENTACION,
+    METODOS_BATCH,
+    PlanIncremental,
+    barrer_parametros,
+    calcular_minimo_coste_total,
+    calcular_minimo_coste_unitario,
+    calcular_silver_meal,
+    comparar_estrategias,
+    evaluar_costes,
+    evaluar_incertidumbre,
+    en_segundo_plano,
+    explosionar_bom,
+    plan_batch,
+    plan_capacitado,
+    planificar_en_flujo,
+    simular_horizonte_rodante,
+)
+
+
+def demanda_sintetica(articulos, periodos, semilla=0):
+    """Necesidades brutas irregulares (≈40 % de periodos sin demanda) y recepciones programadas dispersas."""
+    rng = np.random.default_rng(semilla)
+    necesidades_brutas = rng.integers(0, 500, (articulos, periodos)) * (rng.random((articulos, periodos)) < 0.6)
+    recepciones_programadas = rng.integers(0, 200, (articulos, periodos)) * (rng.random((articulos, periodos)) < 0.05)
+    parametros = {
+        "tiempo_suministro": rng.integers(1, 4, articulos),
+        "stock_seguridad": rng.integers(0, 50, articulos),
+        "disponibilidad_inicial": rng.integers(0, 1000, articulos),
+        "costo_pedido": rng.choice([200, 500, 1000], articulos),
+        "costo_mantenimiento": rng.choice([0.5, 1.0, 2.0], articulos),
+        "periodo_constante": rng.integers(2, 5, articulos),
+    }
+    return necesidades_brutas, recepciones_programadas, parametros
+
+
+def _mejor_tiempo(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def benchmark_plan_batch(articulos, periodos, repeticiones):
+    """Rendimiento (artículos/s) de plan_batch para cada método."""
+    necesidades_brutas, recepciones_programadas, parametros = demanda_sintetica(articulos, periodos)
+    print(f"plan_batch: {articulos} artículos × {periodos} periodos")
+    for metodo in METODOS_BATCH:
+        segundos = _mejor_tiempo(
+            lambda: plan_batch(necesidades_brutas, recepciones_programadas, parametros, metodo),
+            repeticiones
+        )
+        print(f"  {metodo:<24}{segundos:9.3f} s {articulos / segundos:12.0f} artículos/s")
+
+
+def benchmark_comparar_estrategias(articulos, periodos, repeticiones, procesos):
+    """Comparación de todas las estrategias en serie y con un pool de procesos."""
+    necesidades_brutas, recepciones_programadas, parametros = demanda_sintetica(articulos, periodos)
+    print(f"comparar_estrategias: {articulos} artículos × {periodos} periodos")
+    for etiqueta, n in (("serie", None), (f"{procesos} procesos", procesos)):
+        segundos = _mejor_tiempo(
+            lambda: comparar_estrategias(necesidades_brutas, recepciones_programadas, parametros, procesos=n),
+            repeticiones
+        )
+        print(f"  {etiqueta:<24}{segundos:9.3f} s {articulos / segundos:12.0f} artículos/s")
+
+
+def benchmark_evaluar_costes(articulos, periodos, repeticiones):
+    """Planes evaluados por segundo con evaluar_costes sobre una pila de planes candidatos."""
+    rng = np.random.default_rng(0)
+    necesidades_netas = rng.integers(0, 500, periodos)
+    planes = rng.integers(0, 2000, (articulos, periodos)) * (rng.random((articulos, periodos)) < 0.2)
+    segundos = _mejor_tiempo(lambda: evaluar_costes(planes, necesidades_netas, 1000, 1.0), repeticiones)
+    print(f"evaluar_costes: {articulos} planes × {periodos} periodos")
+    print(f"  {'vectorizado':<24}{segundos:9.3f} s {articulos / segundos:12.0f} planes/s")
+
+
+def bom_sintetica(articulos, enlaces, niveles=10, periodos=52, semilla=0):
+    """
+    BOM aleatoria sin ciclos: los artículos se reparten en niveles y cada enlace une un padre con un
+    componente de un nivel inferior, de modo que hay muchos componentes compartidos.
+    Solo los artículos del nivel superior tienen demanda independiente.
+    """
+    rng = np.random.default_rng(semilla)
+    nivel = np.sort(rng.integers(0, niveles, articulos))
+    nivel[0] = 0
+    componentes = rng.integers(0, articulos, enlaces)
+    componentes = componentes[nivel[componentes] > 0]
+    # Padre elegido entre los artículos de niveles superiores al del componente
+    limite = np.searchsorted(nivel, nivel[componentes])
+    padres = (rng.random(len(componentes)) * limite).astype(np.intp)
+    cantidades = rng.integers(1, 4, len(componentes))
+    necesidades_brutas = np.zeros((articulos, periodos), dtype=np.int64)
+    finales = nivel == 0
+    necesidades_brutas[finales] = rng.integers(0, 50, (finales.sum(), periodos)) * (rng.random((finales.sum(), periodos)) < 0.5)
+    return necesidades_brutas, padres, componentes, cantidades
+
+
+def benchmark_explosion_bom(articulos, enlaces, repeticiones):
+    """Explosión multinivel completa sobre una BOM sintética."""
+    necesidades_brutas, padres, componentes, cantidades = bom_sintetica(articulos, enlaces)
+    print(f"explosionar_bom: {articulos} artículos, {len(padres)} enlaces")
+    for metodo in ("Lote a Lote", "Silver Meal"):
+        segundos = _mejor_tiempo(
+            lambda: explosionar_bom(necesidades_brutas, None, {}, padres, componentes, cantidades, metodo),
+            repeticiones
+        )
+        print(f"  {metodo:<24}{segundos:9.3f} s {len(padres) / segundos:12.0f} enlaces/s")
+
+
+def benchmark_replanificacion_incremental(articulos, periodos, repeticiones, cambios=100):
+    """Cambios puntuales de demanda replanificados por cambio neto frente a regenerar el plan entero."""
+    necesidades_brutas, recepciones_programadas, parametros = demanda_sintetica(articulos, periodos)
+    rng = np.random.default_rng(1)
+    print(f"replanificación incremental: {articulos} artículos × {periodos} periodos, {cambios} cambios")
+    for metodo in ("Lote a Lote", "Silver Meal"):
+        plan = PlanIncremental(necesidades_brutas, recepciones_programadas, parametros, metodo)
+
+        def cambio_neto():
+            for _ in range(cambios):
+                plan.modificar(rng.integers(0, articulos), rng.integers(0, periodos), necesidades_brutas=rng.integers(0, 500))
+                plan.replanificar()
+
+        incremental = _mejor_tiempo(cambio_neto, repeticiones) / cambios
+        completo = _mejor_tiempo(
+            lambda: plan_batch(necesidades_brutas, recepciones_programadas, parametros, metodo), repeticiones
+        )
+        print(f"  {metodo:<24}{incremental * 1e3:9.3f} ms/cambio {completo * 1e3:12.1f} ms regenerando")
+
+
+def benchmark_horizonte_rodante(articulos, periodos, procesos, horizonte=12, congelados=2):
+    """Simulación con horizonte rodante de todos los métodos y sus indicadores realizados."""
+    necesidades_brutas, _, parametros = demanda_sintetica(articulos, periodos)
+    print(f"horizonte rodante: {articulos} artículos × {periodos} periodos, ventana {horizonte}, {congelados} congelados")
+    inicio = time.perf_counter()
+    resultado = simular_horizonte_rodante(necesidades_brutas, parametros, horizonte=horizonte, congelados=congelados, procesos=procesos)
+    segundos = time.perf_counter() - inicio
+    for metodo, fila in resultado.iterrows():
+        print(f"  {metodo:<24}{fila['coste_total']:16.0f} coste {fila['nerviosismo']:12.0f} cambios {fila['no_servidas']:10.0f} no servidas")
+    print(f"  {'total':<24}{segundos:9.3f} s")
+
+
+def benchmark_flujo(articulos, periodos, procesos, bloques=20):
+    """Planificación en flujo de bloques generados sobre la marcha, en serie y con un pool de procesos."""
+    print(f"flujo: {bloques} bloques de {articulos} artículos × {periodos} periodos, costes de Lote a Lote y Silver Meal")
+
+    def generar():
+        for semilla in range(bloques):
+            necesidades_brutas, recepciones_programadas, _ = demanda_sintetica(articulos, periodos, semilla)
+            yield list(range(articulos)), necesidades_brutas, recepciones_programadas
+
+    for etiqueta, n in (("serie", None), (f"{procesos} procesos", procesos)):
+        inicio = time.perf_counter()
+        for _ in planificar_en_flujo(
+            en_segundo_plano(generar()), ("Lote a Lote", "Silver Meal"), procesos=n, claves=("coste_total",)
+        ):
+            pass
+        segundos = time.perf_counter() - inicio
+        print(f"  {etiqueta:<24}{segundos:9.3f} s {articulos * bloques / segundos:12.0f} artículos/s")
+
+
+def benchmark_barrido(articulos, periodos, repeticiones):
+    """Barrido de 5 costes de pedido × 4 de mantenimiento × 2 stocks × 3 plazos frente a plan_batch por combinación."""
+    necesidades_brutas, recepciones_programadas, parametros = demanda_sintetica(articulos, periodos)
+    ejes = ([500, 800, 1000, 1200, 1500], [0.5, 1.0, 1.5, 2.0], [0, 50], [1, 2, 3])
+    print(f"barrido de parámetros: {articulos} artículos × {periodos} periodos, 120 combinaciones")
+    for metodo in ("Lote a Lote", "EOQ", "Silver Meal"):
+        barrido = _mejor_tiempo(
+            lambda: barrer_parametros(necesidades_brutas, recepciones_programadas, parametros, *ejes, metodos=[metodo]),
+            repeticiones
+        )
+        # Sin barrido: un plan_batch por combinación de costes y stock (el plazo no cambia el coste)
+        por_combinacion = _mejor_tiempo(lambda: [
+            plan_batch(necesidades_brutas, recepciones_programadas, {
+                **parametros, "costo_pedido": c, "costo_mantenimiento": h, "stock_seguridad": s
+            }, metodo)
+            for c in ejes[0] for h in ejes[1] for s in ejes[2]
+        ], repeticiones)
+        print(f"  {metodo:<24}{barrido:9.3f} s {por_combinacion:12.3f} s con plan_batch")
+
+
+def benchmark_capacidad(articulos, periodos, repeticiones):
+    """Dixon-Silver con capacidad compartida al 110 % de la carga media, doblando los artículos: casi lineal."""
+    print("Dixon-Silver con capacidad compartida (µs/artículo·periodo)")
+    for n in (articulos // 4, articulos // 2, articulos):
+        necesidades_brutas, recepciones_programadas, parametros = demanda_sintetica(n, periodos)
+        capacidad = 1.1 * necesidades_brutas.sum(axis=0).mean()
+        segundos = _mejor_tiempo(
+            lambda: plan_capacitado(necesidades_brutas, recepciones_programadas, parametros, capacidad),
+            repeticiones
+        )
+        print(f"  {n:>8} artículos{segundos / (n * periodos) * 1e6:12.2f}")
+
+
+def benchmark_incertidumbre(articulos, periodos, procesos, escenarios=1000):
+    """Monte Carlo de todos los métodos con 13 stocks candidatos, en este proceso y repartido en el pool."""
+    necesidades_brutas, recepciones_programadas, parametros = demanda_sintetica(articulos, periodos)
+    print(f"incertidumbre: {articulos} artículos × {periodos} periodos × {escenarios} escenarios")
+    for reparto in (None, procesos):
+        inicio = time.perf_counter()
+        evaluar_incertidumbre(
+            necesidades_brutas, recepciones_programadas, parametros, escenarios=escenarios, semilla=0,
+            procesos=reparto, escenarios_por_bloque=max(1, escenarios // 8)
+        )
+        segundos = time.perf_counter() - inicio
+        print(f"  procesos={reparto or 1:<15}{segundos:9.3f} s {articulos * escenarios / segundos:12.0f} escenarios·artículo/s")
+
+
+def demanda_con_empates(periodos, semilla=0):
+    """
+    Demanda dispersa (un periodo de cada cinco) pensada para forzar empates en las heurísticas:
+    con costo_mantenimiento = 0 la desviación de Mínimo Coste Total no cambia nunca y los periodos
+    sin demanda repiten el coste unitario de Mínimo Coste Unitario.
+    """
+    rng = np.random.default_rng(semilla)
+    necesidades_brutas = rng.integers(1, 500, periodos) * (np.arange(periodos) % 5 == 0)
+    return necesidades_brutas, np.zeros(periodos, dtype=necesidades_brutas.dtype)
+
+
+def benchmark_escalado_heuristicas(horizontes, repeticiones):
+    """Tiempo por periodo de las heurísticas en horizontes crecientes: debe mantenerse constante."""
+    print("escalado de heurísticas con empates (µs/periodo)")
+    print(f"  {'periodos':<24}" + "".join(f"{h:>12}" for h in horizontes))
+    for nombre, heuristica in (
+        ("Minimo Coste Unitario", calcular_minimo_coste_unitario),
+        ("Minimo Coste Total", calcular_minimo_coste_total),
+        ("Silver Meal", calcular_silver_meal),
+    ):
+        fila = []
+        for periodos in horizontes:
+            necesidades_brutas, recepciones_programadas = demanda_con_empates(periodos)
+            segundos = _mejor_tiempo(
+                lambda: heuristica(necesidades_brutas, recepciones_programadas, 1, 0, 0, 1000, 0.0),
+                repeticiones
+            )
+            fila.append(segundos / periodos * 1e6)
+        print(f"  {nombre:<24}" + "".join(f"{us:12.2f}" for us in fila))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articulos", type=int, default=5000)
+    parser.add_argument("--periodos", type=int, default=52)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--horizontes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--enlaces", type=int, default=100000)
+    parser.add_argument("--instrumentacion", metavar="FICHERO", help="guarda en JSON los tiempos por etapa de todo el benchmark")
+    args = parser.parse_args()
+    INSTRUMENTACION.activa = args.instrumentacion is not None
+    benchmark_plan_batch(args.articulos, args.periodos, args.repeticiones)
+    benchmark_comparar_estrategias(args.articulos, args.periodos, args.repeticiones, args.procesos)
+    benchmark_evaluar_costes(args.articulos, args.periodos, args.repeticiones)
+    benchmark_escalado_heuristicas(args.horizontes, args.repeticiones)
+    benchmark_explosion_bom(args.articulos * 4, args.enlaces, args.repeticiones)
+    benchmark_replanificacion_incremental(args.articulos, args.periodos, args.repeticiones)
+    benchmark_horizonte_rodante(args.articulos, args.periodos, args.procesos)
+    benchmark_flujo(args.articulos, args.periodos, args.procesos)
+    benchmark_barrido(args.articulos // 5, args.periodos, args.repeticiones)
+    benchmark_capacidad(args.articulos // 5, args.periodos, args.repeticiones)
+    benchmark_incertidumbre(args.articulos // 50, args.periodos, args.procesos)
+    if args.instrumentacion:
+        INSTRUMENTACION.to_json(args.instrumentacion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Prueba de carga del servicio de planificación al estilo de locust: usuarios concurrentes que
+repiten peticiones POST /plan durante un tiempo fijo.
+
+Uso: python carga.py [--url http://127.0.0.1:8000] [--usuarios N] [--duracion S] [--articulos N]
+                     [--periodos T] [--metodo M] [--arrow] [--arrancar] [--procesos N] [--ventana-ms X]
+
+Cada usuario abre una conexión persistente y envía una petición tras otra con una matriz de
+demanda aleatoria de --articulos artículos. Al final se imprimen las peticiones por segundo, las
+latencias p50, p90 y p99, los errores y cuántas peticiones ha juntado el servicio en cada lote.
+Con --arrancar se levanta antes una instancia local del servicio y se para al terminar.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from servicio import TIPO_ARROW, TIPO_JSON
+
+
+class ClienteHTTP:
+    """Cliente HTTP/1.1 mínimo con una conexión persistente, suficiente para hablar con servicio.py."""
+
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self._lector = self._escritor = None
+
+    async def enviar(self, verbo, ruta, cuerpo=b"", tipo=TIPO_JSON):
+        # Devuelve (estado, cuerpo); reabre la conexión si el servidor la cerró
+        if self._escritor is None:
+            self._lector, self._escritor = await asyncio.open_connection(self.host, self.puerto)
+        self._escritor.write(
+            f"{verbo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: {tipo}\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n\r\n".encode("latin-1") + cuerpo
+        )
+        await self._escritor.drain()
+        cabecera = await self._lector.readuntil(b"\r\n\r\n")
+        linea, *resto = cabecera.decode("latin-1").split("\r\n")
+        cabeceras = dict(
+            (nombre.strip().lower(), valor.strip()) for nombre, valor in
+            (campo.split(":", 1) for campo in resto if ":" in campo)
+        )
+        respuesta = await self._lector.readexactly(int(cabeceras.get("content-length", 0)))
+        if cabeceras.get("connection", "").lower() == "close":
+            await self.cerrar()
+        return int(linea.split(" ")[1]), respuesta
+
+    async def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            self._lector = self._escritor = None
+
+
+def cuerpo_peticion(rng, articulos, periodos, metodo, arrow=False):
+    # Petición con demanda aleatoria en JSON o en un stream Arrow
+    necesidades_brutas = rng.integers(0, 400, (articulos, periodos)) * (rng.random((articulos, periodos)) < 0.7)
+    if not arrow:
+        return json.dumps({"metodo": metodo, "necesidades_brutas": necesidades_brutas.tolist()}).encode()
+    import pyarrow as pa
+
+    tabla = pa.table({
+        "necesidades_brutas": pa.FixedSizeListArray.from_arrays(pa.array(necesidades_brutas.ravel()), periodos)
+    })
+    destino = pa.BufferOutputStream()
+    with pa.ipc.new_stream(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return destino.getvalue().to_pybytes()
+
+
+async def _usuario(host, puerto, ruta, cuerpos, tipo, fin, latencias, errores):
+    cliente = ClienteHTTP(host, puerto)
+    try:
+        i = 0
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                estado, _ = await cliente.enviar("POST", ruta, cuerpos[i % len(cuerpos)], tipo)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await cliente.cerrar()
+                estado = None
+            if estado == 200:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                errores.append(estado)
+            i += 1
+    finally:
+        await cliente.cerrar()
+
+
+async def _estado(host, puerto):
+    cliente = ClienteHTTP(host, puerto)
+    try:
+        return json.loads((await cliente.enviar("GET", "/salud"))[1])
+    finally:
+        await cliente.cerrar()
+
+
+async def ejecutar_carga(host, puerto, usuarios=50, duracion=10.0, articulos=10, periodos=52,
+                         metodo="Wagner-Whitin", arrow=False, calentamiento=1.0):
+    """
+    Lanza la carga y devuelve un dict con peticiones, errores, peticiones_por_segundo, p50, p90,
+    p99 (segundos) y peticiones_por_lote. Los primeros `calentamiento` segundos no se miden.
+    """
+    rng = np.random.default_rng(0)
+    cuerpos = [cuerpo_peticion(rng, articulos, periodos, metodo, arrow) for _ in range(16)]
+    tipo = TIPO_ARROW if arrow else TIPO_JSON
+    ruta = f"/plan?metodo={metodo.replace(' ', '%20')}"
+
+    if calentamiento:
+        fin = time.perf_counter() + calentamiento
+        await asyncio.gather(*(_usuario(host, puerto, ruta, cuerpos, tipo, fin, [], []) for _ in range(usuarios)))
+    antes = await _estado(host, puerto)
+    latencias, errores = [], []
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*(_usuario(host, puerto, ruta, cuerpos, tipo, fin, latencias, errores) for _ in range(usuarios)))
+    transcurrido = time.perf_counter() - inicio
+    despues = await _estado(host, puerto)
+
+    p50, p90, p99 = np.quantile(latencias, [0.5, 0.9, 0.99]) if latencias else (np.nan,) * 3
+    lotes = despues["lotes"] - antes["lotes"]
+    return {
+        "peticiones": len(latencias),
+        "errores": len(errores),
+        "peticiones_por_segundo": len(latencias) / transcurrido,
+        "p50": p50,
+        "p90": p90,
+        "p99": p99,
+        "peticiones_por_lote": (despues["peticiones"] - antes["peticiones"]) / lotes if lotes else np.nan,
+    }
+
+
+def _arrancar_servicio(puerto, procesos, ventana_ms):
+    # Instancia local en otro proceso; se espera a que responda a /salud
+    argumentos = [sys.executable, "-m", "servicio", "--puerto", str(puerto), "--ventana-ms", str(ventana_ms)]
+    if procesos:
+        argumentos += ["--procesos", str(procesos)]
+    servidor = subprocess.Popen(argumentos, cwd=os.path.dirname(os.path.abspath(__file__)))
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            asyncio.run(_estado("127.0.0.1", puerto))
+            return servidor
+        except OSError:
+            time.sleep(0.1)
+    servidor.terminate()
+    raise RuntimeError("El servicio no ha arrancado")
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos de medida")
+    parser.add_argument("--articulos", type=int, default=10, help="artículos por petición")
+    parser.add_argument("--periodos", type=int, default=52)
+    parser.add_argument("--metodo", default="Wagner-Whitin")
+    parser.add_argument("--arrow", action="store_true", help="peticiones en Arrow en vez de JSON")
+    parser.add_argument("--arrancar", action="store_true", help="levanta una instancia local del servicio")
+    parser.add_argument("--procesos", type=int, help="con --arrancar, procesos de cálculo del servicio")
+    parser.add_argument("--ventana-ms", type=float, default=2.0, help="con --arrancar, ventana de agrupación")
+    args = parser.parse_args(argumentos)
+
+    destino = urlsplit(args.url)
+    host, puerto = destino.hostname, destino.port or 80
+    servidor = _arrancar_servicio(puerto, args.procesos, args.ventana_ms) if args.arrancar else None
+    try:
+        resultado = asyncio.run(ejecutar_carga(
+            host, puerto, args.usuarios, args.duracion, args.articulos, args.periodos, args.metodo, args.arrow
+        ))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+    print(f"{args.usuarios} usuarios, {args.articulos} artículos × {args.periodos} periodos por petición, "
+          f"{args.metodo}, {'Arrow' if args.arrow else 'JSON'}")
+    print(f"  peticiones        {resultado['peticiones']:>10} ({resultado['errores']} errores)")
+    print(f"  peticiones/s      {resultado['peticiones_por_segundo']:>10.1f}")
+    for cuantil in ("p50", "p90", "p99"):
+        print(f"  latencia {cuantil}      {resultado[cuantil] * 1000:>10.1f} ms")
+    print(f"  peticiones/lote   {resultado['peticiones_por_lote']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
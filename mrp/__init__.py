@@ -0,0 +1,48 @@
+"""
+Motor de planificación de necesidades de materiales (MRP) sin interfaz.
+
+Los submódulos se importan la primera vez que se usa uno de sus nombres, de modo que
+``import mrp`` no carga numpy ni pandas: numpy llega con el primer método que se usa y
+pandas solo con las funciones que leen o devuelven tablas.
+"""
+import importlib
+
+# Submódulo -> nombres públicos que exporta el paquete
+_EXPORTACIONES = {
+    "instrumentacion": ("INSTRUMENTACION", "Instrumentacion"),
+    "costes": ("calcular_coste_total", "evaluar_costes"),
+    "neteo": ("calcular_neteo",),
+    "lotificacion": (
+        "calcular_eoq", "calcular_lote_a_lote", "calcular_periodo_constante", "calcular_poq", "calcular_wagner_whitin",
+    ),
+    "heuristicas": (
+        "COLUMNAS_MCT", "COLUMNAS_MCU", "COLUMNAS_SILVER_MEAL", "ResultadoHeuristica",
+        "calcular_minimo_coste_total", "calcular_minimo_coste_unitario", "calcular_silver_meal",
+    ),
+    "batch": ("ESTRATEGIAS_COMPARACION", "METODOS_BATCH", "PARAMETROS_POR_DEFECTO", "comparar_estrategias", "plan_batch"),
+    "bom": ("calcular_codigos_nivel", "explosionar_bom"),
+    "incremental": ("PlanIncremental",),
+    "simulacion": ("INDICADORES_SIMULACION", "simular_horizonte_rodante"),
+    "importacion": ("leer_demanda", "leer_demanda_por_bloques"),
+    "flujo": ("en_segundo_plano", "planificar_en_flujo"),
+    "mapeado": ("SERIES_MAPEADAS", "planificar_mapeado"),
+    "barrido": ("COLUMNAS_BARRIDO", "barrer_parametros"),
+    "capacidad": ("calcular_dixon_silver", "plan_capacitado"),
+    "incertidumbre": ("COLUMNAS_INCERTIDUMBRE", "DISTRIBUCIONES", "evaluar_incertidumbre", "generar_escenarios"),
+    "cache": ("CacheLRU", "clave_planificacion"),
+}
+_SUBMODULO = {nombre: submodulo for submodulo, nombres in _EXPORTACIONES.items() for nombre in nombres}
+__all__ = sorted(_SUBMODULO)
+
+
+def __getattr__(nombre):
+    submodulo = _SUBMODULO.get(nombre)
+    if submodulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f"{__name__}.{submodulo}"), nombre)
+    globals()[nombre] = valor  # las siguientes consultas ya no pasan por aquí
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
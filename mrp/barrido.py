@@ -0,0 +1,145 @@
+"""Barrido de parámetros: coste de cada método sobre una rejilla de costes, stock de seguridad y plazos."""
+import numpy as np
+
+from .batch import METODOS_BATCH, _leer_parametros
+from .costes import evaluar_costes
+from .flujo import _mapa_acotado
+from .instrumentacion import INSTRUMENTACION
+from .neteo import calcular_neteo
+
+# Métodos cuyo plan no depende de los costes: se lotifica una vez y solo se evalúa la rejilla
+_LOTIFICACION_SIN_COSTES = ("Lote a Lote", "Periodo Constante")
+
+# Columnas del resultado de barrer_parametros
+COLUMNAS_BARRIDO = (
+    "metodo", "costo_pedido", "costo_mantenimiento", "stock_seguridad", "tiempo_suministro",
+    "coste_total", "coste_posesion", "coste_pedido", "lanzamientos_atrasados",
+)
+
+
+def _eje(valores, parametros, nombre):
+    # Valores de un eje de la rejilla; sin valores, el eje es el valor de params_table (que debe ser común)
+    if valores is None:
+        comun = np.unique(parametros[nombre])
+        if len(comun) != 1:
+            raise ValueError(f"{nombre} tiene un valor por artículo: indique los valores del barrido")
+        return comun
+    return np.atleast_1d(np.asarray(valores))
+
+
+def _barrer_bloque(tarea):
+    # Se ejecuta en los procesos del pool: toda la rejilla sobre un bloque de artículos. Devuelve
+    # los totales del bloque, forma (stocks, metodos, combinaciones de costes, 3 + plazos): coste,
+    # posesión, pedido y las unidades atrasadas de cada plazo, que se suman entre bloques
+    necesidades_brutas, recepciones_programadas, parametros, metodos, costo_pedido, costo_mantenimiento, \
+        stocks_seguridad, tiempos_suministro = tarea
+    articulos, periodos = necesidades_brutas.shape
+    combinaciones = len(costo_pedido)
+    rejilla = {
+        **{nombre: np.tile(valor, combinaciones) for nombre, valor in parametros.items()},
+        "costo_pedido": np.repeat(costo_pedido, articulos),
+        "costo_mantenimiento": np.repeat(costo_mantenimiento, articulos),
+    }
+    totales = np.zeros((len(stocks_seguridad), len(metodos), combinaciones, 3 + len(tiempos_suministro)))
+    for s, stock_seguridad in enumerate(stocks_seguridad):
+        disponibilidades, necesidades_netas = calcular_neteo(
+            necesidades_brutas, recepciones_programadas, stock_seguridad, parametros["disponibilidad_inicial"]
+        )
+        for m, metodo in enumerate(metodos):
+            with INSTRUMENTACION.etapa(f"lotificacion:{metodo}"):
+                if metodo in _LOTIFICACION_SIN_COSTES:
+                    recepcion_pedidos = METODOS_BATCH[metodo](disponibilidades, necesidades_netas, parametros)[None]
+                else:
+                    recepcion_pedidos = METODOS_BATCH[metodo](
+                        np.tile(disponibilidades, (combinaciones, 1)), np.tile(necesidades_netas, (combinaciones, 1)), rejilla
+                    ).reshape(combinaciones, articulos, periodos)
+            costes = evaluar_costes(
+                recepcion_pedidos, necesidades_netas, costo_pedido[:, None, None], costo_mantenimiento[:, None, None]
+            )
+            for j, coste in enumerate(costes):
+                totales[s, m, :, j] = coste.sum(axis=-1)
+            # Con plazo L se lanzan antes del periodo 1 las recepciones de los periodos 0..L-1
+            recibido = np.zeros((len(recepcion_pedidos), periodos + 1))
+            np.cumsum(recepcion_pedidos.sum(axis=1), axis=-1, out=recibido[:, 1:])
+            totales[s, m, :, 3:] = recibido[:, np.minimum(tiempos_suministro, periodos)]
+    return totales
+
+
+def barrer_parametros(necesidades_brutas, recepciones_programadas=None, params_table=None, costos_pedido=None,
+                      costos_mantenimiento=None, stocks_seguridad=None, tiempos_suministro=None,
+                      metodos=tuple(METODOS_BATCH), procesos=None, articulos_por_bloque=None):
+    """
+    Coste de cada método en todas las combinaciones de una rejilla de parámetros.
+    - necesidades_brutas, recepciones_programadas: vector de un artículo o matriz artículos × periodos
+    - params_table: resto de parámetros, como en plan_batch (disponibilidad_inicial, periodo_constante...)
+    - costos_pedido, costos_mantenimiento, stocks_seguridad, tiempos_suministro: valores de cada eje;
+      un eje sin valores toma el de params_table
+    - metodos: claves de METODOS_BATCH
+    - procesos, articulos_por_bloque: como en comparar_estrategias
+    Devuelve un DataFrame con una fila por método y combinación (columnas COLUMNAS_BARRIDO) y los
+    costes sumados sobre todos los artículos. lanzamientos_atrasados son las unidades que habría
+    que lanzar antes del periodo 1 con ese plazo de suministro.
+
+    El neteo solo depende del stock de seguridad, así que se hace una vez por valor del eje y vale
+    para todos los plazos. Las combinaciones de costes se apilan como filas y se lotifican en una
+    sola llamada por método (una sola vez para los métodos que no usan los costes), y los costes
+    de la rejilla se evalúan de golpe difundiendo C_p y h. El plazo solo desplaza los lanzamientos:
+    no cambia el plan ni su coste.
+    """
+    import pandas as pd
+
+    necesidades_brutas = np.atleast_2d(np.asarray(necesidades_brutas))
+    if recepciones_programadas is None:
+        recepciones_programadas = np.zeros_like(necesidades_brutas)
+    recepciones_programadas = np.atleast_2d(np.asarray(recepciones_programadas))
+    total = len(necesidades_brutas)
+    parametros = _leer_parametros(params_table, total)
+    metodos = tuple(metodos)
+    for metodo in metodos:
+        if metodo not in METODOS_BATCH:
+            raise ValueError(f"Método desconocido: {metodo!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+
+    costos_pedido = _eje(costos_pedido, parametros, "costo_pedido")
+    costos_mantenimiento = _eje(costos_mantenimiento, parametros, "costo_mantenimiento")
+    stocks_seguridad = _eje(stocks_seguridad, parametros, "stock_seguridad")
+    tiempos_suministro = _eje(tiempos_suministro, parametros, "tiempo_suministro").astype(np.int64)
+    # Combinaciones de costes, C_p el eje lento y h el rápido
+    costo_pedido, costo_mantenimiento = (
+        eje.ravel() for eje in np.meshgrid(costos_pedido, costos_mantenimiento, indexing="ij")
+    )
+
+    paralelo = procesos is not None and procesos > 1
+    if articulos_por_bloque is None:
+        articulos_por_bloque = -(-total // (procesos * 4)) if paralelo else total
+    articulos_por_bloque = max(1, articulos_por_bloque)
+    tareas = (
+        (None, (
+            necesidades_brutas[inicio:inicio + articulos_por_bloque],
+            recepciones_programadas[inicio:inicio + articulos_por_bloque],
+            {nombre: valor[inicio:inicio + articulos_por_bloque] for nombre, valor in parametros.items()},
+            metodos, costo_pedido, costo_mantenimiento, stocks_seguridad, tiempos_suministro,
+        ))
+        for inicio in range(0, total, articulos_por_bloque)
+    )
+    totales = np.zeros((len(stocks_seguridad), len(metodos), len(costo_pedido), 3 + len(tiempos_suministro)))
+    for _, resultado in _mapa_acotado(_barrer_bloque, tareas, procesos):
+        totales += resultado
+
+    # Filas en orden stock, método, C_p, h, plazo
+    indice = pd.MultiIndex.from_product(
+        [stocks_seguridad, metodos, range(len(costo_pedido)), tiempos_suministro],
+        names=["stock_seguridad", "metodo", "combinacion", "tiempo_suministro"],
+    ).to_frame(index=False)
+    plazos = len(tiempos_suministro)
+    resultado = pd.DataFrame({
+        "metodo": indice["metodo"],
+        "costo_pedido": costo_pedido[indice["combinacion"]],
+        "costo_mantenimiento": costo_mantenimiento[indice["combinacion"]],
+        "stock_seguridad": indice["stock_seguridad"],
+        "tiempo_suministro": indice["tiempo_suministro"],
+        "coste_total": np.repeat(totales[..., 0].ravel(), plazos),
+        "coste_posesion": np.repeat(totales[..., 1].ravel(), plazos),
+        "coste_pedido": np.repeat(totales[..., 2].ravel(), plazos),
+        "lanzamientos_atrasados": totales[..., 3:].ravel(),
+    })
+    return resultado[list(COLUMNAS_BARRIDO)]
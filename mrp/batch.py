@@ -0,0 +1,245 @@
+"""Planificación de matrices de artículos con cualquier método y comparación de estrategias."""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .costes import evaluar_costes
+from .heuristicas import calcular_minimo_coste_total, calcular_minimo_coste_unitario, calcular_silver_meal
+from .instrumentacion import INSTRUMENTACION
+from .lotificacion import _lotes_eoq, _lotes_poq, _wagner_whitin
+from .neteo import calcular_neteo
+
+
+# PLANIFICACIÓN DE VARIOS ARTÍCULOS
+# Valores por defecto de los parámetros (los mismos que ofrece la interfaz)
+PARAMETROS_POR_DEFECTO = {
+    "tiempo_suministro": 1,
+    "stock_seguridad": 0,
+    "disponibilidad_inicial": 0,
+    "costo_pedido": 1000,
+    "costo_mantenimiento": 1.0,
+    "periodo_constante": 2,
+}
+
+
+def _leer_parametros(params_table, articulos):
+    # Cada parámetro se convierte en un vector con un valor por artículo
+    params_table = {} if params_table is None else params_table
+    return {
+        nombre: np.broadcast_to(np.asarray(params_table.get(nombre, defecto)), (articulos,))
+        for nombre, defecto in PARAMETROS_POR_DEFECTO.items()
+    }
+
+
+def _lanzar_matriz(recepcion_pedidos, tiempo_suministro, origen):
+    # Lanzamientos por filas con un tiempo de suministro por artículo (mismo criterio que _lanzar);
+    # todas las filas comparten el origen, que debe ser al menos el mayor tiempo de suministro
+    articulos, periodos = recepcion_pedidos.shape
+    lanzamiento_pedidos = np.zeros((articulos, origen + periodos), dtype=recepcion_pedidos.dtype)
+    columnas = np.arange(periodos) + (origen - tiempo_suministro)[:, None]
+    np.put_along_axis(lanzamiento_pedidos, columnas, recepcion_pedidos, axis=1)
+    return lanzamiento_pedidos
+
+
+def _demanda_en_horizonte(lanzamiento_pedidos, origen):
+    # Lo que ven los componentes de unos lanzamientos con origen desplazado: los atrasados
+    # (periodos negativos) se necesitan ya, en el primer periodo del horizonte
+    demanda = lanzamiento_pedidos[..., origen:].copy()
+    demanda[..., 0] += lanzamiento_pedidos[..., :origen].sum(axis=-1)
+    return demanda
+
+
+def _recepciones_lote_a_lote(disponibilidades, necesidades_netas, parametros):
+    return necesidades_netas.copy()
+
+
+def _recepciones_periodo_constante(disponibilidades, necesidades_netas, parametros):
+    articulos, periodos = necesidades_netas.shape
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    for periodo_constante in np.unique(parametros["periodo_constante"]):
+        filas = np.flatnonzero(parametros["periodo_constante"] == periodo_constante)
+        bloques = -(-periodos // periodo_constante)
+        relleno = np.zeros((len(filas), bloques * periodo_constante), dtype=necesidades_netas.dtype)
+        relleno[:, :periodos] = necesidades_netas[filas]
+        relleno = relleno.reshape(len(filas), bloques, periodo_constante)
+        # Cada bloque se pide entero en su primer periodo con necesidad neta
+        primero = np.argmax(relleno > 0, axis=2)
+        fila, bloque = np.nonzero(relleno.any(axis=2))
+        recepcion_pedidos[filas[fila], bloque * periodo_constante + primero[fila, bloque]] = relleno.sum(axis=2)[fila, bloque]
+    return recepcion_pedidos
+
+
+def _recepciones_eoq(disponibilidades, necesidades_netas, parametros):
+    return _lotes_eoq(necesidades_netas, parametros["costo_pedido"], parametros["costo_mantenimiento"])[0]
+
+
+def _recepciones_poq(disponibilidades, necesidades_netas, parametros):
+    return _lotes_poq(necesidades_netas, parametros["costo_pedido"], parametros["costo_mantenimiento"])[0]
+
+
+def _recepciones_wagner_whitin(disponibilidades, necesidades_netas, parametros):
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    for i in range(len(necesidades_netas)):
+        recepcion_pedidos[i] = _wagner_whitin(
+            necesidades_netas[i].tolist(), parametros["costo_pedido"][i], parametros["costo_mantenimiento"][i]
+        )
+    return recepcion_pedidos
+
+
+def _recepciones_heuristica(calcular):
+    def recepciones(disponibilidades, necesidades_netas, parametros):
+        recepcion_pedidos = np.zeros_like(necesidades_netas)
+        for i in range(len(necesidades_netas)):
+            recepcion_pedidos[i] = calcular(
+                necesidades_netas[i], None, 0, None, None,
+                parametros["costo_pedido"][i], parametros["costo_mantenimiento"][i],
+                neteo=(disponibilidades[i], necesidades_netas[i]), traza=False
+            ).recepcion_pedidos
+        return recepcion_pedidos
+    return recepciones
+
+
+# Métodos disponibles para plan_batch: nombre -> recepciones sobre la matriz de necesidades netas
+METODOS_BATCH = {
+    "Lote a Lote": _recepciones_lote_a_lote,
+    "EOQ": _recepciones_eoq,
+    "POQ": _recepciones_poq,
+    "Periodo Constante": _recepciones_periodo_constante,
+    "Minimo Coste Unitario": _recepciones_heuristica(calcular_minimo_coste_unitario),
+    "Minimo Coste Total": _recepciones_heuristica(calcular_minimo_coste_total),
+    "Silver Meal": _recepciones_heuristica(calcular_silver_meal),
+    "Wagner-Whitin": _recepciones_wagner_whitin,
+}
+
+
+def plan_batch(demand_matrix, scheduled_receipts_matrix, params_table, method):
+    """
+    Planifica todos los artículos de una matriz artículos × periodos con el mismo método.
+    - demand_matrix: necesidades brutas, una fila por artículo
+    - scheduled_receipts_matrix: recepciones programadas, misma forma (o None si no hay)
+    - params_table: mapping (dict, DataFrame...) con las columnas de PARAMETROS_POR_DEFECTO,
+      cada una escalar o con un valor por artículo; las que falten toman el valor por defecto
+    - method: clave de METODOS_BATCH
+    Devuelve un dict de matrices apiladas con la misma forma que demand_matrix y los vectores
+    coste_total, coste_posesion y coste_pedido con un valor por artículo. lanzamiento_pedidos tiene
+    además origen_lanzamientos columnas delante (el mayor tiempo de suministro): la columna
+    origen_lanzamientos + p es el periodo p, y los lanzamientos atrasados quedan en periodos negativos.
+    """
+    if method not in METODOS_BATCH:
+        raise ValueError(f"Método desconocido: {method!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+    necesidades_brutas = np.atleast_2d(np.asarray(demand_matrix))
+    if scheduled_receipts_matrix is None:
+        recepciones_programadas = np.zeros_like(necesidades_brutas)
+    else:
+        recepciones_programadas = np.atleast_2d(np.asarray(scheduled_receipts_matrix))
+    parametros = _leer_parametros(params_table, len(necesidades_brutas))
+
+    disponibilidades, necesidades_netas = calcular_neteo(
+        necesidades_brutas, recepciones_programadas,
+        parametros["stock_seguridad"], parametros["disponibilidad_inicial"]
+    )
+    with INSTRUMENTACION.etapa(f"lotificacion:{method}"):
+        recepcion_pedidos = METODOS_BATCH[method](disponibilidades, necesidades_netas, parametros)
+    INSTRUMENTACION.contar("articulos_planificados", len(necesidades_brutas))
+    origen = int(parametros["tiempo_suministro"].max(initial=0))
+    coste, coste_posesion, coste_pedido = evaluar_costes(
+        recepcion_pedidos, necesidades_netas,
+        parametros["costo_pedido"][:, None], parametros["costo_mantenimiento"][:, None]
+    )
+    return {
+        "disponibilidades": disponibilidades,
+        "necesidades_netas": necesidades_netas,
+        "recepcion_pedidos": recepcion_pedidos,
+        "lanzamiento_pedidos": _lanzar_matriz(recepcion_pedidos, parametros["tiempo_suministro"], origen),
+        "origen_lanzamientos": origen,
+        "coste_total": coste,
+        "coste_posesion": coste_posesion,
+        "coste_pedido": coste_pedido,
+    }
+
+
+# COMPARACIÓN DE ESTRATEGIAS
+# (etiqueta, método de METODOS_BATCH, parámetros que se fijan para esa estrategia)
+ESTRATEGIAS_COMPARACION = (
+    ("Lote a Lote", "Lote a Lote", {}),
+    ("EOQ", "EOQ", {}),
+    ("POQ", "POQ", {}),
+    ("Periodo Constante (2)", "Periodo Constante", {"periodo_constante": 2}),
+    ("Periodo Constante (3)", "Periodo Constante", {"periodo_constante": 3}),
+    ("Periodo Constante (4)", "Periodo Constante", {"periodo_constante": 4}),
+    ("Minimo Coste Unitario", "Minimo Coste Unitario", {}),
+    ("Minimo Coste Total", "Minimo Coste Total", {}),
+    ("Silver Meal", "Silver Meal", {}),
+    ("Wagner-Whitin", "Wagner-Whitin", {}),
+)
+
+
+def _costes_bloque(tarea):
+    # Se ejecuta en los procesos del pool: un neteo por bloque y todas las estrategias sobre él
+    necesidades_brutas, recepciones_programadas, parametros, estrategias = tarea
+    disponibilidades, necesidades_netas = calcular_neteo(
+        necesidades_brutas, recepciones_programadas,
+        parametros["stock_seguridad"], parametros["disponibilidad_inicial"]
+    )
+    costes = np.empty((len(necesidades_brutas), len(estrategias)))
+    for j, (_, metodo, extra) in enumerate(estrategias):
+        parametros_estrategia = _leer_parametros({**parametros, **extra}, len(necesidades_brutas))
+        with INSTRUMENTACION.etapa(f"lotificacion:{metodo}"):
+            recepcion_pedidos = METODOS_BATCH[metodo](disponibilidades, necesidades_netas, parametros_estrategia)
+        costes[:, j] = evaluar_costes(
+            recepcion_pedidos, necesidades_netas,
+            parametros_estrategia["costo_pedido"][:, None], parametros_estrategia["costo_mantenimiento"][:, None]
+        )[0]
+    return costes
+
+
+def comparar_estrategias(necesidades_brutas, recepciones_programadas, params_table,
+                         estrategias=ESTRATEGIAS_COMPARACION, procesos=None, articulos_por_bloque=None, articulos=None):
+    """
+    Coste total de cada estrategia para cada artículo.
+    - necesidades_brutas, recepciones_programadas: matrices artículos × periodos (como en plan_batch)
+    - params_table: parámetros por artículo, como en plan_batch
+    - estrategias: secuencia de (etiqueta, método, parámetros fijos)
+    - procesos: tamaño del pool de procesos; None o 1 calcula en este proceso
+    - articulos_por_bloque: artículos enviados a cada tarea del pool (por defecto ~4 bloques por proceso)
+    - articulos: etiquetas para el índice del resultado (por defecto 0..N-1)
+    Devuelve un DataFrame artículos × estrategias. Los bloques se reensamblan en el orden de
+    entrada, así que el resultado es idéntico con y sin pool e independiente de procesos y
+    articulos_por_bloque.
+    """
+    import pandas as pd
+
+    necesidades_brutas = np.atleast_2d(np.asarray(necesidades_brutas))
+    if recepciones_programadas is None:
+        recepciones_programadas = np.zeros_like(necesidades_brutas)
+    recepciones_programadas = np.atleast_2d(np.asarray(recepciones_programadas))
+    total = len(necesidades_brutas)
+    parametros = _leer_parametros(params_table, total)
+    estrategias = tuple(estrategias)
+
+    paralelo = procesos is not None and procesos > 1
+    if articulos_por_bloque is None:
+        articulos_por_bloque = -(-total // (procesos * 4)) if paralelo else total
+    articulos_por_bloque = max(1, articulos_por_bloque)
+    tareas = [
+        (
+            necesidades_brutas[inicio:inicio + articulos_por_bloque],
+            recepciones_programadas[inicio:inicio + articulos_por_bloque],
+            {nombre: valor[inicio:inicio + articulos_por_bloque] for nombre, valor in parametros.items()},
+            estrategias,
+        )
+        for inicio in range(0, total, articulos_por_bloque)
+    ]
+
+    if paralelo and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            bloques = list(pool.map(_costes_bloque, tareas))
+    else:
+        bloques = [_costes_bloque(tarea) for tarea in tareas]
+
+    costes = np.concatenate(bloques) if bloques else np.empty((0, len(estrategias)))
+    return pd.DataFrame(
+        costes,
+        index=articulos if articulos is not None else range(total),
+        columns=[etiqueta for etiqueta, _, _ in estrategias],
+    )
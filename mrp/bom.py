@@ -0,0 +1,113 @@
+"""Explosión multinivel de la lista de materiales por códigos de nivel."""
+import numpy as np
+
+from .batch import _demanda_en_horizonte, _lanzar_matriz, _leer_parametros, plan_batch
+
+
+# LISTA DE MATERIALES (BOM)
+def calcular_codigos_nivel(padres, componentes, articulos):
+    """
+    Código de nivel inferior (low-level code) de cada artículo: el nivel más profundo en el que
+    aparece en cualquier estructura. Los artículos que no son componente de nada tienen nivel 0.
+    - padres, componentes: índices de artículo de cada enlace de la BOM (padre -> componente)
+    - articulos: número total de artículos
+    Se recorre la BOM por oleadas (Kahn): un artículo entra en la oleada k cuando ya se han
+    procesado todos sus padres, y k es justamente su camino más largo desde un artículo final.
+    Lanza ValueError si la BOM tiene ciclos.
+    """
+    padres = np.asarray(padres, dtype=np.intp)
+    componentes = np.asarray(componentes, dtype=np.intp)
+    pendientes = np.bincount(componentes, minlength=articulos)
+    niveles = np.full(articulos, -1)
+    frontera = np.flatnonzero(pendientes == 0)
+    nivel = 0
+    while len(frontera):
+        niveles[frontera] = nivel
+        en_frontera = np.zeros(articulos, dtype=bool)
+        en_frontera[frontera] = True
+        hijos = componentes[en_frontera[padres]]
+        pendientes -= np.bincount(hijos, minlength=articulos)
+        hijos = np.unique(hijos)
+        frontera = hijos[pendientes[hijos] == 0]
+        nivel += 1
+    if (niveles < 0).any():
+        raise ValueError("La lista de materiales tiene ciclos: " + ", ".join(map(str, np.flatnonzero(niveles < 0)[:10])))
+    return niveles
+
+
+def explosionar_bom(necesidades_brutas, recepciones_programadas, params_table,
+                    padres, componentes, cantidades, method="Lote a Lote"):
+    """
+    Planificación multinivel: los lanzamientos de cada padre son necesidades brutas de sus componentes.
+    - necesidades_brutas: demanda independiente, matriz artículos × periodos (ceros si no tiene)
+    - recepciones_programadas: misma forma (o None)
+    - params_table: parámetros por artículo, como en plan_batch
+    - padres, componentes, cantidades: enlaces de la BOM (cantidad de componente por unidad de padre);
+      un componente compartido aparece en varios enlaces
+    - method: método de METODOS_BATCH con el que se lotifica cada artículo
+    Los artículos se procesan por código de nivel: cuando se planifica un nivel todos sus padres ya
+    tienen plan, y su demanda dependiente se suma de golpe para todos los enlaces del nivel.
+    Devuelve el dict de plan_batch para todos los artículos, más "necesidades_dependientes" y "nivel".
+    Todos los artículos comparten origen_lanzamientos (el mayor tiempo de suministro); los
+    lanzamientos atrasados de un padre se suman a la demanda de sus componentes en el primer periodo.
+    """
+    necesidades_brutas = np.atleast_2d(np.asarray(necesidades_brutas))
+    articulos, periodos = necesidades_brutas.shape
+    if recepciones_programadas is None:
+        recepciones_programadas = np.zeros_like(necesidades_brutas)
+    recepciones_programadas = np.atleast_2d(np.asarray(recepciones_programadas))
+    parametros = _leer_parametros(params_table, articulos)
+    padres = np.asarray(padres, dtype=np.intp)
+    componentes = np.asarray(componentes, dtype=np.intp)
+    cantidades = np.asarray(cantidades)
+
+    niveles = calcular_codigos_nivel(padres, componentes, articulos)
+    origen = int(parametros["tiempo_suministro"].max(initial=0))
+    dtype = np.result_type(necesidades_brutas, cantidades)
+    necesidades_dependientes = np.zeros((articulos, periodos), dtype=dtype)
+    plan = {
+        "disponibilidades": np.zeros((articulos, periodos), dtype=dtype),
+        "necesidades_netas": np.zeros((articulos, periodos), dtype=dtype),
+        "recepcion_pedidos": np.zeros((articulos, periodos), dtype=dtype),
+        "lanzamiento_pedidos": np.zeros((articulos, origen + periodos), dtype=dtype),
+        "origen_lanzamientos": origen,
+        "coste_total": np.zeros(articulos),
+        "coste_posesion": np.zeros(articulos),
+        "coste_pedido": np.zeros(articulos),
+    }
+
+    # Enlaces agrupados por el nivel del padre
+    orden_enlaces = np.argsort(niveles[padres], kind="stable")
+    limites_enlaces = np.searchsorted(niveles[padres][orden_enlaces], np.arange(niveles.max() + 2))
+    orden_articulos = np.argsort(niveles, kind="stable")
+    limites_articulos = np.searchsorted(niveles[orden_articulos], np.arange(niveles.max() + 2))
+
+    for nivel in range(niveles.max() + 1):
+        filas = orden_articulos[limites_articulos[nivel]:limites_articulos[nivel + 1]]
+        plan_nivel = plan_batch(
+            necesidades_brutas[filas] + necesidades_dependientes[filas],
+            recepciones_programadas[filas],
+            {nombre: valor[filas] for nombre, valor in parametros.items()},
+            method
+        )
+        plan_nivel["lanzamiento_pedidos"] = _lanzar_matriz(
+            plan_nivel["recepcion_pedidos"], parametros["tiempo_suministro"][filas], origen
+        )
+        del plan_nivel["origen_lanzamientos"]
+        for nombre, valor in plan_nivel.items():
+            plan[nombre][filas] = valor
+        lanzamientos = _demanda_en_horizonte(plan_nivel["lanzamiento_pedidos"], origen)
+
+        # Demanda dependiente de todos los enlaces cuyo padre está en este nivel
+        enlaces = orden_enlaces[limites_enlaces[nivel]:limites_enlaces[nivel + 1]]
+        if len(enlaces):
+            posicion = np.empty(articulos, dtype=np.intp)
+            posicion[filas] = np.arange(len(filas))
+            np.add.at(
+                necesidades_dependientes, componentes[enlaces],
+                cantidades[enlaces, None] * lanzamientos[posicion[padres[enlaces]]]
+            )
+
+    plan["necesidades_dependientes"] = necesidades_dependientes
+    plan["nivel"] = niveles
+    return plan
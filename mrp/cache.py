@@ -0,0 +1,79 @@
+"""Caché de resultados de planificación compartida entre sesiones."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# CACHÉ DE RESULTADOS
+class CacheLRU:
+    """
+    Caché acotada de resultados de planificación, compartida por todas las sesiones.
+    - max_entradas: número máximo de resultados guardados; al superarlo se descarta el menos usado
+    - ttl: segundos que un resultado sigue siendo válido desde que se calculó; los caducados se
+      descartan al consultarlos y cada vez que se guarda un resultado nuevo
+    Lleva la cuenta de aciertos y fallos para mostrarla en la interfaz.
+    """
+
+    def __init__(self, max_entradas=128, ttl=3600):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave, calcular):
+        """Devuelve el resultado guardado para clave o lo calcula con calcular() y lo guarda."""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if ahora - entrada[0] <= self.ttl:
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return entrada[1]
+                del self._entradas[clave]
+            self.fallos += 1
+        # El cálculo se hace fuera del lock para no bloquear al resto de sesiones
+        valor = calcular()
+        with self._lock:
+            self._purgar(time.monotonic())
+            self._entradas[clave] = (ahora, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return valor
+
+    def _purgar(self, ahora):
+        # Descarta los resultados caducados; el orden LRU no es el de cálculo, así que se recorren
+        # todos (como mucho max_entradas)
+        caducadas = [clave for clave, (calculado, _) in self._entradas.items() if ahora - calculado > self.ttl]
+        for clave in caducadas:
+            del self._entradas[clave]
+
+
+def _resumir_array(resumen, array):
+    # Tipo, forma y contenido completo: repr() de un array grande lo abrevia con "..."
+    array = np.ascontiguousarray(array)
+    resumen.update(f"{array.dtype}{array.shape}".encode())
+    resumen.update(array.tobytes())
+
+
+def clave_planificacion(metodo, necesidades_brutas, recepciones_programadas, **parametros):
+    # Resumen de todas las entradas del cálculo: vectores de demanda y recepciones, costes y plazos
+    resumen = hashlib.blake2b(metodo.encode(), digest_size=16)
+    for vector in (necesidades_brutas, recepciones_programadas):
+        _resumir_array(resumen, vector)
+    for nombre, valor in sorted(parametros.items()):
+        resumen.update(f"|{nombre}=".encode())
+        if isinstance(valor, np.ndarray):
+            _resumir_array(resumen, valor)
+        else:
+            resumen.update(repr(valor).encode())
+    return resumen.hexdigest()
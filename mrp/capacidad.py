@@ -0,0 +1,194 @@
+"""Lotificación con capacidad limitada: heurística de Dixon-Silver con presuavizado para varios artículos."""
+import heapq
+
+import numpy as np
+
+from .batch import PARAMETROS_POR_DEFECTO, _lanzar_matriz, _leer_parametros
+from .costes import evaluar_costes
+from .instrumentacion import INSTRUMENTACION
+from .neteo import _lanzar, calcular_neteo
+
+# Holgura para comparar cargas en coma flotante
+_TOLERANCIA = 1e-9
+
+
+def _por_articulo_y_periodo(valor, articulos, periodos):
+    # Escalar, vector por artículo o matriz artículos × periodos (o 1 × periodos) -> artículos × periodos
+    valor = np.asarray(valor, dtype=np.float64)
+    if valor.ndim == 1:
+        valor = valor[:, None]
+    return np.broadcast_to(valor, (articulos, periodos))
+
+
+def _presuavizar(necesidades_netas, costo_mantenimiento, capacidad, consumo):
+    """
+    Adelanta necesidades hasta que ningún periodo supere su capacidad. Se recorre el horizonte
+    hacia atrás y el exceso de carga de t pasa a t-1, empezando por los artículos más baratos de
+    guardar por unidad de capacidad (h/consumo), con movimientos parciales si hace falta.
+    Devuelve la matriz de necesidades adelantadas; si en el primer periodo sigue sobrando carga,
+    la capacidad acumulada no basta y se lanza ValueError.
+    """
+    suavizadas = necesidades_netas.astype(np.float64)
+    periodos = suavizadas.shape[1]
+    ocupan = consumo > 0
+    for t in range(periodos - 1, -1, -1):
+        exceso = consumo @ suavizadas[:, t] - capacidad[t]
+        if exceso <= _TOLERANCIA:
+            continue
+        if t == 0:
+            raise ValueError(
+                f"Capacidad insuficiente: faltan {exceso:g} unidades de capacidad en los primeros periodos"
+            )
+        candidatos = np.flatnonzero((suavizadas[:, t] > 0) & ocupan)
+        orden = candidatos[np.argsort(costo_mantenimiento[candidatos, t - 1] / consumo[candidatos], kind="stable")]
+        cargas = consumo[orden] * suavizadas[orden, t]
+        movida = np.clip(exceso - (np.cumsum(cargas) - cargas), 0, cargas) / consumo[orden]
+        suavizadas[orden, t] = np.maximum(suavizadas[orden, t] - movida, 0)
+        suavizadas[orden, t - 1] += movida
+    return suavizadas
+
+
+def _lotes_dixon_silver(necesidades_netas, costo_pedido, costo_mantenimiento, capacidad, consumo):
+    """
+    Recepciones de varios artículos que comparten una capacidad por periodo (Dixon-Silver).
+    - necesidades_netas: matriz artículos × periodos
+    - costo_pedido, costo_mantenimiento: matrices artículos × periodos
+    - capacidad: capacidad de cada periodo, en las unidades de consumo
+    - consumo: capacidad que ocupa una unidad de cada artículo
+    Tras el presuavizado cada periodo cabe en su capacidad, así que basta un pase hacia delante:
+    en cada periodo los artículos con necesidad abren un lote y se amplían, de uno en uno, los
+    lotes con mayor prioridad U = (CM(T) - CM(T+1)) / (consumo·NN), con CM el coste medio por
+    periodo de Silver-Meal, mientras U >= 0 y la necesidad siguiente quepa en lo que queda de
+    capacidad. Como en calcular_silver_meal, los periodos sin necesidad cuentan en T pero CM(T)
+    es el de la última necesidad añadida, y un empate solo amplía si quedan necesidades después;
+    con capacidad de sobra el plan es el de Silver-Meal. Con un montículo por periodo el coste es
+    O(artículos·periodos·log(artículos)).
+    """
+    articulos, periodos = necesidades_netas.shape
+    pendientes = _presuavizar(necesidades_netas, costo_mantenimiento, capacidad, consumo)
+    # H[i, t]: coste de guardar una unidad de i desde el periodo 0 hasta el t
+    posesion = np.zeros((articulos, periodos + 1))
+    np.cumsum(costo_mantenimiento, axis=1, out=posesion[:, 1:])
+    recepcion_pedidos = np.zeros((articulos, periodos))
+    ultima_necesidad = periodos - 1 - np.argmax(pendientes[:, ::-1] > 0, axis=1)
+
+    def ampliacion(i, t, siguiente, medio):
+        # Prioridad de añadir al lote de i abierto en t la primera necesidad desde siguiente;
+        # medio es (numerador, periodos) del coste medio de la última necesidad añadida
+        numerador, cubiertos = medio
+        j = siguiente
+        while j < periodos and pendientes[i, j] <= 0:
+            j += 1
+        if j == periodos:
+            return None
+        necesidad = pendientes[i, j]
+        nuevo = (numerador + necesidad * (posesion[i, j] - posesion[i, t]), j - t + 1)
+        ahorro = numerador / cubiertos - nuevo[0] / nuevo[1]
+        if ahorro < 0 or (ahorro == 0 and j >= ultima_necesidad[i]):
+            return None
+        carga = consumo[i] * necesidad
+        prioridad = ahorro / carga if carga > 0 else np.inf
+        return -prioridad, i, j, carga, nuevo
+
+    for t in range(periodos):
+        activos = np.flatnonzero(pendientes[:, t] > 0)
+        if not len(activos):
+            continue
+        restante = capacidad[t] - consumo[activos] @ pendientes[activos, t]
+        recepcion_pedidos[activos, t] = pendientes[activos, t]
+        pendientes[activos, t] = 0
+        monticulo = [
+            candidato for i in activos.tolist()
+            if (candidato := ampliacion(i, t, t + 1, (costo_pedido[i, t], 1))) is not None
+        ]
+        heapq.heapify(monticulo)
+        while monticulo:
+            _, i, j, carga, medio = heapq.heappop(monticulo)
+            if carga > restante + _TOLERANCIA:
+                continue  # no cabe: el lote de i se cierra aquí
+            restante -= carga
+            recepcion_pedidos[i, t] += pendientes[i, j]
+            pendientes[i, j] = 0
+            candidato = ampliacion(i, t, j + 1, medio)
+            if candidato is not None:
+                heapq.heappush(monticulo, candidato)
+
+    if np.issubdtype(necesidades_netas.dtype, np.integer) and np.array_equal(recepcion_pedidos, np.round(recepcion_pedidos)):
+        return recepcion_pedidos.astype(necesidades_netas.dtype)
+    return recepcion_pedidos
+
+
+def calcular_dixon_silver(necesidades_brutas, recepciones_programadas, tiempo_suministro, stock_seguridad,
+                          disponibilidad_inicial, costo_pedido, costo_mantenimiento, capacidad, neteo=None):
+    """
+    Dixon-Silver para un artículo: Silver-Meal sin superar la capacidad de cada periodo.
+    - costo_pedido, costo_mantenimiento: escalares o un valor por periodo
+    - capacidad: unidades que se pueden recibir en cada periodo (escalar o un valor por periodo)
+    """
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+    periodos = len(necesidades_netas)
+
+    recepcion_pedidos = _lotes_dixon_silver(
+        necesidades_netas[None],
+        _por_articulo_y_periodo(np.reshape(costo_pedido, (1, -1)), 1, periodos),
+        _por_articulo_y_periodo(np.reshape(costo_mantenimiento, (1, -1)), 1, periodos),
+        np.broadcast_to(np.asarray(capacidad, dtype=np.float64), (periodos,)),
+        np.ones(1),
+    )[0]
+    lanzamiento_pedidos = _lanzar(recepcion_pedidos, tiempo_suministro)
+    disponible_adicional = disponibilidades[0] + np.cumsum(recepcion_pedidos - necesidades_netas)
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
+
+
+def plan_capacitado(demand_matrix, scheduled_receipts_matrix, params_table, capacidad, consumo=1):
+    """
+    Planifica a la vez todos los artículos de una matriz que comparten una capacidad por periodo.
+    - demand_matrix, scheduled_receipts_matrix, params_table: como en plan_batch; costo_pedido y
+      costo_mantenimiento admiten además una matriz artículos × periodos (o 1 × periodos para un
+      valor por periodo común a todos)
+    - capacidad: capacidad de cada periodo de recepción (escalar o un valor por periodo)
+    - consumo: capacidad que ocupa una unidad de cada artículo (escalar o un valor por artículo)
+    Devuelve lo mismo que plan_batch más carga, la capacidad usada en cada periodo. Lanza
+    ValueError si la capacidad acumulada no cubre las necesidades netas.
+    """
+    necesidades_brutas = np.atleast_2d(np.asarray(demand_matrix))
+    if scheduled_receipts_matrix is None:
+        recepciones_programadas = np.zeros_like(necesidades_brutas)
+    else:
+        recepciones_programadas = np.atleast_2d(np.asarray(scheduled_receipts_matrix))
+    articulos, periodos = necesidades_brutas.shape
+    params_table = {} if params_table is None else dict(params_table)
+    costo_pedido, costo_mantenimiento = (
+        _por_articulo_y_periodo(params_table.pop(nombre, PARAMETROS_POR_DEFECTO[nombre]), articulos, periodos)
+        for nombre in ("costo_pedido", "costo_mantenimiento")
+    )
+    parametros = _leer_parametros(params_table, articulos)
+    capacidad = np.broadcast_to(np.asarray(capacidad, dtype=np.float64), (periodos,))
+    consumo = np.broadcast_to(np.asarray(consumo, dtype=np.float64), (articulos,))
+
+    disponibilidades, necesidades_netas = calcular_neteo(
+        necesidades_brutas, recepciones_programadas,
+        parametros["stock_seguridad"], parametros["disponibilidad_inicial"]
+    )
+    with INSTRUMENTACION.etapa("lotificacion:Dixon-Silver"):
+        recepcion_pedidos = _lotes_dixon_silver(
+            necesidades_netas, costo_pedido, costo_mantenimiento, capacidad, consumo
+        )
+    INSTRUMENTACION.contar("articulos_planificados", articulos)
+    origen = int(parametros["tiempo_suministro"].max(initial=0))
+    coste, coste_posesion, coste_pedido = evaluar_costes(
+        recepcion_pedidos, necesidades_netas, costo_pedido, costo_mantenimiento
+    )
+    return {
+        "disponibilidades": disponibilidades,
+        "necesidades_netas": necesidades_netas,
+        "recepcion_pedidos": recepcion_pedidos,
+        "lanzamiento_pedidos": _lanzar_matriz(recepcion_pedidos, parametros["tiempo_suministro"], origen),
+        "origen_lanzamientos": origen,
+        "coste_total": coste,
+        "coste_posesion": coste_posesion,
+        "coste_pedido": coste_pedido,
+        "carga": consumo @ recepcion_pedidos,
+    }
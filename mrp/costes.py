@@ -0,0 +1,57 @@
+"""Coste de los planes de pedidos: emisión más posesión."""
+import numpy as np
+
+from .instrumentacion import INSTRUMENTACION
+
+
+# COSTE TOTAL
+def evaluar_costes(planes, necesidades_netas, costo_pedido, costo_mantenimiento):
+    """
+    Coste de muchos planes de pedidos a la vez.
+    - planes: recepciones Q_t, array (..., periodos); p. ej. planes × periodos
+    - necesidades_netas: NN_t, array que se difunda contra planes (un vector común o uno por plan)
+    - costo_pedido: C_p, escalar, vector por periodo o array que se difunda contra planes
+      (p. ej. forma (planes, 1) para un valor por plan)
+    - costo_mantenimiento: h, con las mismas formas admitidas que costo_pedido
+    Devuelve (coste, coste_posesion, coste_pedido) con la forma de planes sin el eje de periodos.
+    Cada periodo con Q_t > 0 cuesta C_p y cada unidad de inventario final positivo cuesta h.
+    """
+    with INSTRUMENTACION.etapa("costes"):
+        planes = np.asarray(planes)
+        inventario = np.cumsum(planes - necesidades_netas, axis=-1)
+        coste_pedido = np.where(planes > 0, costo_pedido, 0).sum(axis=-1)
+        coste_posesion = (np.maximum(inventario, 0) * costo_mantenimiento).sum(axis=-1)
+    INSTRUMENTACION.contar("planes_evaluados", int(np.prod(planes.shape[:-1])))
+    return coste_pedido + coste_posesion, coste_posesion, coste_pedido
+
+
+def calcular_coste_total(recepcion_pedidos, necesidades_netas, costo_pedido, costo_mantenimiento):
+    """
+    - recepcion_pedidos: lista Q_t para cada periodo t
+    - necesidades_netas: lista NN_t para cada periodo t
+    - costo_pedido: C_p (€/pedido), escalar o uno por periodo (el del periodo en que se recibe)
+    - costo_mantenimiento: h (€/unidad·periodo), escalar o uno por periodo (el del inventario final)
+    """
+    coste, coste_total_posesion, coste_total_pedido = evaluar_costes(
+        recepcion_pedidos, necesidades_netas, costo_pedido, costo_mantenimiento
+    )
+    return coste.item(), coste_total_posesion.item(), coste_total_pedido.item()
+
+
+def _costes_por_periodo(costo_pedido, costo_mantenimiento, periodos):
+    """
+    Costes de un artículo como listas por periodo, para los bucles de las heurísticas.
+    - costo_pedido, costo_mantenimiento: escalares o vectores con un valor por periodo
+    Devuelve (pedido, posesion): pedido[t] es C_p de un pedido recibido en t; posesion es None si
+    h es escalar (una unidad recibida en i y necesaria en t cuesta h·(t - i), como siempre) o la
+    lista H[t] = h_0 + ... + h_{t-1}, con la que esa unidad cuesta H[t] - H[i].
+    """
+    if np.ndim(costo_pedido) == 0:
+        pedido = [costo_pedido] * periodos
+    else:
+        pedido = np.broadcast_to(costo_pedido, (periodos,)).tolist()
+    if np.ndim(costo_mantenimiento) == 0:
+        return pedido, None
+    posesion = np.zeros(periodos + 1)
+    np.cumsum(np.broadcast_to(costo_mantenimiento, (periodos,)), out=posesion[1:])
+    return pedido, posesion.tolist()
@@ -0,0 +1,128 @@
+"""Planificación en flujo: lectura por bloques, planificación y escritura incremental con contrapresión."""
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import plan_batch
+
+
+class _ErrorProductor:
+    # Excepción del hilo lector, que se relanza en el consumidor
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+_FIN = object()
+
+
+def en_segundo_plano(iterable, maximo=2):
+    """
+    Recorre iterable en un hilo aparte y entrega sus elementos por un generador, para que la
+    lectura (E/S y parseo) se solape con el cálculo.
+    - maximo: elementos que pueden esperar en la cola; si el consumidor va más lento, el hilo se
+      bloquea hasta que haya sitio (contrapresión), así que nunca hay más de maximo leídos de más
+    Las excepciones del hilo se relanzan al consumirlas. Si el consumidor cierra el generador antes
+    de terminar, el hilo se detiene en cuanto acaba el elemento que esté leyendo.
+    """
+    cola = queue.Queue(maxsize=maximo)
+    parar = threading.Event()
+
+    def poner(elemento):
+        while not parar.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def productor():
+        try:
+            for elemento in iterable:
+                if not poner(elemento):
+                    return
+        except BaseException as error:
+            poner(_ErrorProductor(error))
+        else:
+            poner(_FIN)
+
+    hilo = threading.Thread(target=productor, name="lector", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            elemento = cola.get()
+            if elemento is _FIN:
+                return
+            if isinstance(elemento, _ErrorProductor):
+                raise elemento.error
+            yield elemento
+    finally:
+        parar.set()
+        hilo.join()
+
+
+def _planificar_bloque(tarea):
+    # Se ejecuta en los procesos del pool: todos los métodos sobre un bloque de artículos
+    necesidades_brutas, recepciones_programadas, params_table, metodos, claves = tarea
+    planes = []
+    for metodo in metodos:
+        plan = plan_batch(necesidades_brutas, recepciones_programadas, params_table, metodo)
+        planes.append((metodo, plan if claves is None else {clave: plan[clave] for clave in claves}))
+    return planes
+
+
+def _mapa_acotado(funcion, tareas, procesos=None, en_vuelo=None):
+    """
+    Aplica funcion a cada argumento de tareas, un iterable de (contexto, argumento), y genera
+    (contexto, resultado) en el orden de entrada. Con procesos > 1 usa un pool con como mucho
+    en_vuelo tareas pendientes (por defecto 2 por proceso): la siguiente tarea solo se pide cuando
+    el consumidor ha recogido la más antigua. El contexto no sale de este proceso.
+    """
+    if procesos is None or procesos <= 1:
+        for contexto, argumento in tareas:
+            yield contexto, funcion(argumento)
+        return
+
+    en_vuelo = en_vuelo or 2 * procesos
+    pendientes = deque()
+    pool = ProcessPoolExecutor(max_workers=procesos)
+    try:
+        for contexto, argumento in tareas:
+            if len(pendientes) >= en_vuelo:
+                anterior, futuro = pendientes.popleft()
+                yield anterior, futuro.result()
+            pendientes.append((contexto, pool.submit(funcion, argumento)))
+        while pendientes:
+            anterior, futuro = pendientes.popleft()
+            yield anterior, futuro.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def planificar_en_flujo(bloques, metodos, params_table=None, procesos=None, en_vuelo=None, claves=None):
+    """
+    Planifica un flujo de bloques de artículos y entrega los planes bloque a bloque.
+    - bloques: iterable de (articulos, necesidades_brutas, recepciones_programadas), p. ej.
+      leer_demanda_por_bloques (mejor envuelto en en_segundo_plano)
+    - metodos: claves de METODOS_BATCH
+    - params_table: parámetros como en plan_batch, comunes a todos los bloques
+    - procesos: tamaño del pool de procesos; None o 1 planifica en este proceso
+    - en_vuelo: bloques que se planifican a la vez como máximo (por defecto 2 por proceso)
+    - claves: claves del plan que se devuelven (por defecto todas); con solo los costes se
+      ahorra mandar las matrices de vuelta desde los procesos
+    Genera (articulos, necesidades_brutas, recepciones_programadas, planes) en el orden de entrada,
+    con planes una lista de (metodo, plan). Solo se pide un bloque nuevo cuando hay sitio entre los
+    que están en vuelo y el consumidor ha recogido el más antiguo, así que la memoria depende de
+    en_vuelo y del tamaño de bloque, nunca del número total de artículos.
+    """
+    metodos = tuple(metodos)
+    tareas = (
+        ((articulos, necesidades_brutas, recepciones_programadas),
+         (necesidades_brutas, recepciones_programadas, params_table, metodos, claves))
+        for articulos, necesidades_brutas, recepciones_programadas in bloques
+    )
+    for bloque, planes in _mapa_acotado(_planificar_bloque, tareas, procesos, en_vuelo):
+        yield (*bloque, planes)
@@ -0,0 +1,453 @@
+"""Heurísticas de lotificación con traza del cálculo: Mínimo Coste Unitario, Mínimo Coste Total y Silver Meal."""
+from functools import partial
+
+import numpy as np
+
+from .costes import _costes_por_periodo
+from .neteo import _ultima_necesidad, calcular_neteo
+
+
+# RESULTADO DE LAS HEURÍSTICAS
+class ResultadoHeuristica:
+    """
+    Resultado de Mínimo Coste Unitario, Mínimo Coste Total y Silver Meal.
+    - disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional: arrays del plan
+    - columnas: ((clave, etiqueta), ...) de la traza del cálculo; las tres primeras son siempre
+      periodo_tabla, necesidades_netas_tabla y Q
+    - regenerar: si se indica, la traza no se registró durante el cálculo (traza=False) y se
+      reconstruye llamando a regenerar() la primera vez que se consulta
+    La traza se guarda en una matriz preasignada (como mucho dos filas por periodo: la que amplía
+    el ciclo y la que abre el siguiente) y solo se convierte en DataFrame al mostrarla.
+    Admite el acceso del antiguo dict de resultados: resultado["recepcion_pedidos"], resultado["Q"]...
+    """
+    __slots__ = (
+        "disponibilidades", "necesidades_netas", "recepcion_pedidos", "lanzamiento_pedidos",
+        "disponible_adicional", "columnas", "_traza", "_filas", "_regenerar",
+    )
+
+    def __init__(self, disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos,
+                 disponible_adicional, columnas, regenerar=None):
+        self.disponibilidades = disponibilidades
+        self.necesidades_netas = necesidades_netas
+        self.recepcion_pedidos = recepcion_pedidos
+        self.lanzamiento_pedidos = lanzamiento_pedidos
+        self.disponible_adicional = disponible_adicional
+        self.columnas = columnas
+        self._traza = np.empty((2 * len(necesidades_netas), len(columnas))) if regenerar is None else None
+        self._filas = 0
+        self._regenerar = regenerar
+
+    def registrar_fila(self, *valores):
+        self._traza[self._filas] = valores
+        self._filas += 1
+
+    @property
+    def traza(self):
+        if self._traza is None:
+            completo = self._regenerar()
+            self._traza, self._filas = completo._traza, completo._filas
+        return self._traza[:self._filas]
+
+    def __getitem__(self, clave):
+        for j, (nombre, _) in enumerate(self.columnas):
+            if nombre == clave:
+                return self.traza[:, j]
+        if clave in self.__slots__ and not clave.startswith("_"):
+            return getattr(self, clave)
+        raise KeyError(clave)
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        traza = self.traza
+        enteros = (np.int64, self.necesidades_netas.dtype, self.necesidades_netas.dtype)
+        return pd.DataFrame({
+            etiqueta: traza[:, j].astype(enteros[j]) if j < len(enteros) else traza[:, j]
+            for j, (_, etiqueta) in enumerate(self.columnas)
+        })
+
+
+def _regenerador(calcular, tiempo_suministro, costo_pedido, costo_mantenimiento, neteo):
+    # Repite la heurística con traza sobre el neteo ya calculado, sin volver a netear
+    return partial(
+        calcular, None, None, tiempo_suministro, None, None,
+        costo_pedido, costo_mantenimiento, neteo=neteo, traza=True
+    )
+
+
+COLUMNAS_COMUNES = (("periodo_tabla", "Periodo"), ("necesidades_netas_tabla", "NNi"), ("Q", "Q"))
+
+
+# MÍNIMO COSTE UNITARIO (detalle con columnas: Periodo, NNi, Q, Coste Posesión, Coste Posesión / u, Cost Emisión / u, Cost Total / u)
+COLUMNAS_MCU = COLUMNAS_COMUNES + (
+    ("coste_posesion", "Coste Posesión"),
+    ("coste_posesion_por_unidad", "Cost Posesión / u"),
+    ("coste_emision_por_unidad", "Cost Emisión / u"),
+    ("coste_total_por_unidad", "Cost Total / u"),
+)
+
+
+def calcular_minimo_coste_unitario(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
+                                   stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento, neteo=None, traza=True):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+    periodos = len(necesidades_netas)
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    # Lanzamientos con origen desplazado (ver _lanzar): el de la recepción en p va en el índice p
+    lanzamiento_pedidos = np.zeros(tiempo_suministro + periodos, dtype=necesidades_netas.dtype)
+    disponible_adicional = np.zeros_like(necesidades_netas)
+    nn = necesidades_netas.tolist()
+    ultima_necesidad = _ultima_necesidad(necesidades_netas)
+    pedido, posesion = _costes_por_periodo(costo_pedido, costo_mantenimiento, periodos)
+
+    inicio_ciclo = None
+    Q_acumulado = 0
+    costo_posesion_acumulado = 0
+    prev_unit_cost = None
+
+    resultado = ResultadoHeuristica(
+        disponibilidades, necesidades_netas, recepcion_pedidos,
+        lanzamiento_pedidos, disponible_adicional, COLUMNAS_MCU,
+        regenerar=None if traza else _regenerador(calcular_minimo_coste_unitario, tiempo_suministro, costo_pedido, costo_mantenimiento, neteo)
+    )
+
+    def registrar_fila(periodo, necesidad, Q_val, cost_pos_val, cost_pos_u, cost_emi_u, cost_tot_u):
+        resultado.registrar_fila(periodo, necesidad, Q_val, cost_pos_val, cost_pos_u, cost_emi_u, cost_tot_u)
+
+    for t in range(periodos):
+        if nn[t] > 0 or inicio_ciclo is not None:
+            if inicio_ciclo is None:
+                inicio_ciclo = t
+                Q_acumulado = nn[t]
+                costo_posesion_acumulado = 0
+                unit_cost = (pedido[inicio_ciclo] / Q_acumulado) if Q_acumulado else 0
+                prev_unit_cost = unit_cost
+                if traza:
+                    registrar_fila(
+                        periodo=t+1,
+                        necesidad=nn[t],
+                        Q_val=Q_acumulado,
+                        cost_pos_val=costo_posesion_acumulado,
+                        cost_pos_u=0,
+                        cost_emi_u=(pedido[inicio_ciclo] / Q_acumulado if Q_acumulado else 0),
+                        cost_tot_u=unit_cost
+                    )
+            else:
+                Q_nuevo = Q_acumulado + nn[t]
+                costo_adicional = ((t - inicio_ciclo) * costo_mantenimiento if posesion is None
+                                   else posesion[t] - posesion[inicio_ciclo]) * nn[t]
+                costo_posesion_nuevo = costo_posesion_acumulado + costo_adicional
+                unit_cost_nuevo = ((pedido[inicio_ciclo] + costo_posesion_nuevo) / Q_nuevo) if Q_nuevo else 0
+                if traza:
+                    registrar_fila(
+                        periodo=t+1,
+                        necesidad=nn[t],
+                        Q_val=Q_nuevo,
+                        cost_pos_val=costo_posesion_nuevo,
+                        cost_pos_u=(costo_posesion_nuevo / Q_nuevo if Q_nuevo else 0),
+                        cost_emi_u=(pedido[inicio_ciclo] / Q_nuevo if Q_nuevo else 0),
+                        cost_tot_u=unit_cost_nuevo
+                    )
+                if unit_cost_nuevo > prev_unit_cost:
+                    recepcion_pedidos[inicio_ciclo] = Q_acumulado
+                    lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+                    inicio_ciclo = t
+                    Q_acumulado = nn[t]
+                    costo_posesion_acumulado = 0
+                    unit_cost_nuevo = (pedido[inicio_ciclo] / Q_acumulado) if Q_acumulado else 0
+                    prev_unit_cost = unit_cost_nuevo
+                    if traza:
+                        registrar_fila(
+                            periodo=t+1,
+                            necesidad=nn[t],
+                            Q_val=Q_acumulado,
+                            cost_pos_val=costo_posesion_acumulado,
+                            cost_pos_u=0,
+                            cost_emi_u=(pedido[inicio_ciclo] / Q_acumulado if Q_acumulado else 0),
+                            cost_tot_u=unit_cost_nuevo
+                        )
+                elif unit_cost_nuevo == prev_unit_cost:
+                    if t < ultima_necesidad:
+                        Q_acumulado = Q_nuevo
+                        costo_posesion_acumulado = costo_posesion_nuevo
+                        prev_unit_cost = unit_cost_nuevo
+                    else:
+                        recepcion_pedidos[inicio_ciclo] = Q_acumulado
+                        lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+                        inicio_ciclo = None
+                        Q_acumulado = 0
+                        costo_posesion_acumulado = 0
+                        prev_unit_cost = None
+                else:
+                    Q_acumulado = Q_nuevo
+                    costo_posesion_acumulado = costo_posesion_nuevo
+                    prev_unit_cost = unit_cost_nuevo
+
+    if inicio_ciclo is not None and Q_acumulado > 0:
+        recepcion_pedidos[inicio_ciclo] = Q_acumulado
+        lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+
+    return resultado
+
+# MINIMO COSTE TOTAL  
+# En esta función el coste de emisión es el costo_pedido del inicio del ciclo (no se divide), y la desviación se calcula como |coste_posesion - costo_pedido|
+COLUMNAS_MCT = COLUMNAS_COMUNES + (
+    ("coste_posesion", "Coste Posesión"),
+    ("coste_emision", "Coste Emisión"),
+    ("desviacion", "Desviación"),
+)
+
+
+def calcular_minimo_coste_total(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
+                                stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento, neteo=None, traza=True):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+    periodos = len(necesidades_netas)
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    # Lanzamientos con origen desplazado (ver _lanzar): el de la recepción en p va en el índice p
+    lanzamiento_pedidos = np.zeros(tiempo_suministro + periodos, dtype=necesidades_netas.dtype)
+    disponible_adicional = np.zeros_like(necesidades_netas)
+    nn = necesidades_netas.tolist()
+    ultima_necesidad = _ultima_necesidad(necesidades_netas)
+    pedido, posesion = _costes_por_periodo(costo_pedido, costo_mantenimiento, periodos)
+
+    # Variables para la lógica de acumulación
+    inicio_ciclo = None            
+    Q_acumulado = 0                
+    costo_posesion_acumulado = 0   
+    prev_desviacion = None         
+
+    # Resultado con la tabla final
+    resultado = ResultadoHeuristica(
+        disponibilidades, necesidades_netas, recepcion_pedidos,
+        lanzamiento_pedidos, disponible_adicional, COLUMNAS_MCT,
+        regenerar=None if traza else _regenerador(calcular_minimo_coste_total, tiempo_suministro, costo_pedido, costo_mantenimiento, neteo)
+    )
+
+    # Función para registrar una fila
+    def registrar_fila(periodo, necesidad, Q_val, coste_pos_val):
+
+        coste_emision_val = pedido[inicio_ciclo]
+        desviacion_val = abs(coste_pos_val - coste_emision_val)
+
+        if traza:
+            resultado.registrar_fila(periodo, necesidad, Q_val, coste_pos_val, coste_emision_val, desviacion_val)
+
+        return desviacion_val  # Devolvemos la desviación para compararla afuera
+
+    # Bucle principal
+    for t in range(periodos):
+        # Solo procesamos si hay necesidad en este periodo o si ya se inició un ciclo
+        if nn[t] > 0 or inicio_ciclo is not None:
+            if inicio_ciclo is None:
+                # Iniciar ciclo en este periodo
+                inicio_ciclo = t
+                Q_acumulado = nn[t]
+                costo_posesion_acumulado = 0
+                # Registramos la fila (desviacion_inicial)
+                desviacion_nueva = registrar_fila(periodo=t+1,
+                                                  necesidad=nn[t],
+                                                  Q_val=Q_acumulado,
+                                                  coste_pos_val=costo_posesion_acumulado)
+                prev_desviacion = desviacion_nueva
+            else:
+                # Acumulamos
+                Q_nuevo = Q_acumulado + nn[t]
+                # Coste adicional de posesión
+                costo_adicional = ((t - inicio_ciclo) * costo_mantenimiento if posesion is None
+                                   else posesion[t] - posesion[inicio_ciclo]) * nn[t]
+                costo_posesion_nuevo = costo_posesion_acumulado + costo_adicional
+
+                # Registramos la fila y calculamos la desviación nueva
+                desviacion_nueva = registrar_fila(periodo=t+1,
+                                                  necesidad=nn[t],
+                                                  Q_val=Q_nuevo,
+                                                  coste_pos_val=costo_posesion_nuevo)
+
+                # Comparamos la desviación
+                if desviacion_nueva > prev_desviacion:
+                    # El mínimo relativo se produjo en el paso anterior
+                    # Fijamos el pedido en el periodo "inicio_ciclo"
+                    recepcion_pedidos[inicio_ciclo] = Q_acumulado
+                    lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+
+                    # Reiniciamos el ciclo en este periodo
+                    inicio_ciclo = t
+                    Q_acumulado = nn[t]
+                    costo_posesion_acumulado = 0
+                    # Registramos la "segunda fila" para el mismo periodo t
+                    desviacion_nueva = registrar_fila(periodo=t+1,
+                                                      necesidad=nn[t],
+                                                      Q_val=Q_acumulado,
+                                                      coste_pos_val=costo_posesion_acumulado)
+                    prev_desviacion = desviacion_nueva
+
+                elif desviacion_nueva == prev_desviacion:
+                    # Si es igual, comprobamos si quedan necesidades futuras
+                    if t < ultima_necesidad:
+                        Q_acumulado = Q_nuevo
+                        costo_posesion_acumulado = costo_posesion_nuevo
+                        prev_desviacion = desviacion_nueva
+                    else:
+                        # No quedan necesidades futuras
+                        recepcion_pedidos[inicio_ciclo] = Q_acumulado
+                        lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+                        inicio_ciclo = None
+                        Q_acumulado = 0
+                        costo_posesion_acumulado = 0
+                        prev_desviacion = None
+                else:
+                    # Si la desviación ha disminuido
+                    Q_acumulado = Q_nuevo
+                    costo_posesion_acumulado = costo_posesion_nuevo
+                    prev_desviacion = desviacion_nueva
+
+    # Si al finalizar el bucle queda un ciclo abierto, se programa el pedido final
+    if inicio_ciclo is not None and Q_acumulado > 0:
+        recepcion_pedidos[inicio_ciclo] = Q_acumulado
+        lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+
+    # Devolvemos todos los vectores
+    return resultado
+
+
+# SILVER MEAL
+COLUMNAS_SILVER_MEAL = COLUMNAS_COMUNES + (
+    ("coste_posesion", "Coste Posesión"),
+    ("coste_emision", "Coste Emisión"),
+    ("silver_meal_value", "Silver Meal"),  # (coste_posesion + coste_emision) / contador_periodos
+)
+
+
+def calcular_silver_meal(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
+                         stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento, neteo=None, traza=True):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+    periodos = len(necesidades_netas)
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    # Lanzamientos con origen desplazado (ver _lanzar): el de la recepción en p va en el índice p
+    lanzamiento_pedidos = np.zeros(tiempo_suministro + periodos, dtype=necesidades_netas.dtype)
+    disponible_adicional = np.zeros_like(necesidades_netas)
+    nn = necesidades_netas.tolist()
+    ultima_necesidad = _ultima_necesidad(necesidades_netas)
+    pedido, posesion = _costes_por_periodo(costo_pedido, costo_mantenimiento, periodos)
+
+    # Variables para la lógica de Silver-Meal
+    inicio_ciclo = None            # Periodo donde comienza la acumulación
+    Q_acumulado = 0                # Acumulación de necesidades netas
+    costo_posesion_acumulado = 0   # Coste de posesión acumulado
+    contador_periodos = 0          # Número de periodos que llevamos en el ciclo (incluyendo periodos con NN=0 si ya empezó)
+    prev_silver_meal_val = None    # Valor anterior de la fórmula
+
+    # Resultado con la tabla final
+    resultado = ResultadoHeuristica(
+        disponibilidades, necesidades_netas, recepcion_pedidos,
+        lanzamiento_pedidos, disponible_adicional, COLUMNAS_SILVER_MEAL,
+        regenerar=None if traza else _regenerador(calcular_silver_meal, tiempo_suministro, costo_pedido, costo_mantenimiento, neteo)
+    )
+
+    def registrar_fila(periodo, necesidad, Q_val, coste_pos_val, num_periodos):
+        """
+        Añade una fila a la traza del resultado.
+        cost_emision = C_p del periodo en que empieza el ciclo.
+        silver_meal_val = (coste_pos_val + cost_emision) / num_periodos.
+        """
+        coste_emision_val = pedido[inicio_ciclo]
+        silver_val = (coste_pos_val + coste_emision_val) / num_periodos
+
+        if traza:
+            resultado.registrar_fila(periodo, necesidad, Q_val, coste_pos_val, coste_emision_val, silver_val)
+
+        return silver_val  # devolvemos el valor para comparar afuera
+
+    # Bucle principal
+    for t in range(periodos):
+        # Si no hay necesidades netas y aún no hemos iniciado un ciclo, no hacemos nada
+        if inicio_ciclo is None and nn[t] == 0:
+            continue
+
+        if inicio_ciclo is None:
+            # Primer periodo con NN>0: iniciamos el ciclo
+            inicio_ciclo = t
+            Q_acumulado = nn[t]
+            costo_posesion_acumulado = 0
+            contador_periodos = 1  # Empezamos contando este periodo
+            silver_val_inicial = registrar_fila(periodo=t+1,
+                                                necesidad=nn[t],
+                                                Q_val=Q_acumulado,
+                                                coste_pos_val=costo_posesion_acumulado,
+                                                num_periodos=contador_periodos)
+            prev_silver_meal_val = silver_val_inicial
+        else:
+            # Ya estamos en un ciclo
+            contador_periodos += 1  # Avanzamos un periodo (aunque NN=0, se cuenta)
+            if nn[t] > 0:
+                # Acumulamos la NN de este periodo
+                Q_nuevo = Q_acumulado + nn[t]
+                # Coste adicional de posesión
+                costo_adicional = ((t - inicio_ciclo) * costo_mantenimiento if posesion is None
+                                   else posesion[t] - posesion[inicio_ciclo]) * nn[t]
+                costo_posesion_nuevo = costo_posesion_acumulado + costo_adicional
+
+                # Calculamos el nuevo valor de Silver-Meal
+                silver_meal_nuevo = registrar_fila(periodo=t+1,
+                                                   necesidad=nn[t],
+                                                   Q_val=Q_nuevo,
+                                                   coste_pos_val=costo_posesion_nuevo,
+                                                   num_periodos=contador_periodos)
+                # Comparamos
+                if silver_meal_nuevo > prev_silver_meal_val:
+                    # El mínimo relativo se produjo en el periodo anterior
+                    recepcion_pedidos[inicio_ciclo] = Q_acumulado
+                    lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+
+                    # Reiniciamos el ciclo en este periodo
+                    inicio_ciclo = t
+                    Q_acumulado = nn[t]
+                    costo_posesion_acumulado = 0
+                    contador_periodos = 1  # este periodo se cuenta como el primero del nuevo ciclo
+
+                    # Registramos la "segunda fila" para el mismo t
+                    silver_meal_nuevo2 = registrar_fila(periodo=t+1,
+                                                        necesidad=nn[t],
+                                                        Q_val=Q_acumulado,
+                                                        coste_pos_val=costo_posesion_acumulado,
+                                                        num_periodos=contador_periodos)
+                    prev_silver_meal_val = silver_meal_nuevo2
+                elif silver_meal_nuevo == prev_silver_meal_val:
+                    # Si es igual, comprobamos si hay NN futuras
+                    if t < ultima_necesidad:
+                        Q_acumulado = Q_nuevo
+                        costo_posesion_acumulado = costo_posesion_nuevo
+                        prev_silver_meal_val = silver_meal_nuevo
+                    else:
+                        # No quedan NN futuras
+                        recepcion_pedidos[inicio_ciclo] = Q_acumulado
+                        lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+                        inicio_ciclo = None
+                        Q_acumulado = 0
+                        costo_posesion_acumulado = 0
+                        contador_periodos = 0
+                        prev_silver_meal_val = None
+                else:
+                    # Si ha bajado, seguimos acumulando
+                    Q_acumulado = Q_nuevo
+                    costo_posesion_acumulado = costo_posesion_nuevo
+                    prev_silver_meal_val = silver_meal_nuevo
+            else:
+                # NN[t] == 0, incrementamos contador_periodos, pero NO registramos fila
+                # (según la especificación, ignoramos ese periodo en la tabla).
+                # No se altera Q_acumulado ni coste_posesion_acumulado.
+                # Solo seguimos con la comparación en periodos futuros.
+                pass
+
+    # Si al final queda un ciclo abierto, programamos el pedido final
+    if inicio_ciclo is not None and Q_acumulado > 0:
+        recepcion_pedidos[inicio_ciclo] = Q_acumulado
+        lanzamiento_pedidos[inicio_ciclo] = recepcion_pedidos[inicio_ciclo]
+
+    # Devolvemos resultados
+    return resultado
@@ -0,0 +1,81 @@
+"""Lectura de ficheros de demanda (CSV o Parquet) completos o por bloques."""
+import numpy as np
+
+
+# IMPORTACIÓN DE DEMANDA
+def leer_demanda(fichero, formato=None):
+    """
+    Lectura en bloque de las necesidades brutas y recepciones programadas de uno o varios artículos.
+    - fichero: ruta o fichero abierto (p. ej. el de st.file_uploader) en CSV o Parquet
+    - formato: "csv" o "parquet"; por defecto se deduce de la extensión del nombre
+    El fichero tiene una fila por artículo y tipo, con las columnas articulo, tipo ("NB" para
+    necesidades brutas, "RP" para recepciones programadas) y una columna por periodo. Un artículo
+    sin fila RP no tiene recepciones programadas y las celdas vacías cuentan como 0.
+    Devuelve (articulos, necesidades_brutas, recepciones_programadas), estas dos como matrices
+    artículos × periodos que se pasan directamente a plan_batch o comparar_estrategias.
+    """
+    import pandas as pd
+
+    formato = _formato_demanda(fichero, formato)
+    tabla = pd.read_parquet(fichero) if formato == "parquet" else pd.read_csv(fichero)
+    return _matrices_demanda(tabla)
+
+
+def _formato_demanda(fichero, formato):
+    if formato is None:
+        nombre = str(getattr(fichero, "name", fichero)).lower()
+        formato = "parquet" if nombre.endswith((".parquet", ".pq")) else "csv"
+    return formato
+
+
+def _matrices_demanda(tabla):
+    # Tabla con columnas articulo, tipo y periodos -> (articulos, necesidades_brutas, recepciones_programadas)
+    import pandas as pd
+
+    faltan = {"articulo", "tipo"} - set(tabla.columns)
+    if faltan:
+        raise ValueError(f"Faltan las columnas: {', '.join(sorted(faltan))}")
+    tipos = tabla["tipo"].astype(str).str.strip().str.upper().to_numpy()
+    if not np.isin(tipos, ("NB", "RP")).all():
+        raise ValueError("La columna tipo solo admite los valores NB y RP")
+
+    columnas_periodo = [columna for columna in tabla.columns if columna not in ("articulo", "tipo")]
+    valores = tabla[columnas_periodo].fillna(0).to_numpy()
+    if valores.dtype.kind == "f" and np.array_equal(valores, np.floor(valores)):
+        valores = valores.astype(np.int64)  # las celdas vacías no deben convertir las cantidades en decimales
+    codigos, articulos = pd.factorize(tabla["articulo"])
+    necesidades_brutas = np.zeros((len(articulos), len(columnas_periodo)), dtype=valores.dtype)
+    recepciones_programadas = np.zeros_like(necesidades_brutas)
+    es_nb = tipos == "NB"
+    necesidades_brutas[codigos[es_nb]] = valores[es_nb]
+    recepciones_programadas[codigos[~es_nb]] = valores[~es_nb]
+    return list(articulos), necesidades_brutas, recepciones_programadas
+
+
+def leer_demanda_por_bloques(fichero, formato=None, filas_por_bloque=10_000):
+    """
+    Igual que leer_demanda, pero lee el fichero por trozos de filas_por_bloque filas y devuelve un
+    generador de (articulos, necesidades_brutas, recepciones_programadas), uno por trozo, de modo
+    que la memoria no depende del tamaño del fichero. Las filas de un mismo artículo tienen que
+    ir seguidas: las del último artículo de cada trozo se guardan para el siguiente.
+    """
+    import pandas as pd
+
+    if _formato_demanda(fichero, formato) == "parquet":
+        import pyarrow.parquet as pq
+        trozos = (lote.to_pandas() for lote in pq.ParquetFile(fichero).iter_batches(batch_size=filas_por_bloque))
+    else:
+        trozos = pd.read_csv(fichero, chunksize=filas_por_bloque)
+
+    pendiente = None
+    for tabla in trozos:
+        if pendiente is not None:
+            tabla = pd.concat([pendiente, tabla], ignore_index=True)
+        articulos = tabla["articulo"].to_numpy()
+        distintos = np.flatnonzero(articulos != articulos[-1])
+        corte = distintos[-1] + 1 if len(distintos) else 0
+        pendiente = tabla.iloc[corte:]
+        if corte:
+            yield _matrices_demanda(tabla.iloc[:corte])
+    if pendiente is not None and len(pendiente):
+        yield _matrices_demanda(pendiente)
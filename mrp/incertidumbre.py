@@ -0,0 +1,222 @@
+"""Evaluación Monte Carlo de los métodos de lotificación con demanda incierta."""
+import numpy as np
+
+from .batch import METODOS_BATCH, _leer_parametros
+from .flujo import _mapa_acotado
+from .instrumentacion import INSTRUMENTACION
+from .neteo import calcular_neteo
+
+# Distribuciones de generar_escenarios
+DISTRIBUCIONES = ("normal", "poisson", "residuos")
+
+# Columnas del resultado de evaluar_incertidumbre
+COLUMNAS_INCERTIDUMBRE = (
+    "articulo", "metodo", "stock_seguridad", "coste_medio", "coste_p05", "coste_p50", "coste_p95",
+    "probabilidad_rotura", "no_servidas_media", "recomendado",
+)
+
+# Escenarios de la muestra piloto con la que se elige la rejilla de stocks de seguridad por defecto
+_ESCENARIOS_PILOTO = 256
+
+
+def generar_escenarios(prevision, escenarios, rng, distribucion="normal", dispersion=0.2, residuos=None):
+    """
+    Escenarios de demanda alrededor de una previsión.
+    - prevision: matriz artículos × periodos (o vector de un artículo)
+    - escenarios: número de escenarios por artículo
+    - rng: np.random.Generator
+    - distribucion: "normal" (desviación dispersion·previsión: dispersion es el coeficiente de
+      variación, escalar, por artículo o artículos × periodos), "poisson" (media la previsión) o
+      "residuos" (previsión más residuos históricos remuestreados con reemplazo)
+    - residuos: errores históricos de previsión, vector común o matriz artículos × histórico
+    Devuelve un array artículos × escenarios × periodos sin demandas negativas, entero si la
+    previsión lo es.
+    """
+    prevision = np.atleast_2d(np.asarray(prevision))
+    articulos, periodos = prevision.shape
+    forma = (articulos, escenarios, periodos)
+    if distribucion == "normal":
+        desviacion = np.broadcast_to(np.asarray(dispersion, dtype=np.float64), prevision.shape) * prevision
+        demanda = rng.normal(prevision[:, None, :], desviacion[:, None, :], size=forma)
+    elif distribucion == "poisson":
+        return rng.poisson(np.maximum(prevision, 0)[:, None, :], size=forma).astype(
+            prevision.dtype if np.issubdtype(prevision.dtype, np.integer) else np.float64
+        )
+    elif distribucion == "residuos":
+        if residuos is None:
+            raise ValueError('La distribución "residuos" necesita los residuos históricos')
+        residuos = np.atleast_2d(np.asarray(residuos, dtype=np.float64))
+        residuos = np.broadcast_to(residuos, (articulos, residuos.shape[1]))
+        indices = rng.integers(0, residuos.shape[1], size=forma)
+        demanda = prevision[:, None, :] + np.take_along_axis(residuos, indices.reshape(articulos, -1), axis=1).reshape(forma)
+    else:
+        raise ValueError(f"Distribución desconocida: {distribucion!r}. Disponibles: {', '.join(DISTRIBUCIONES)}")
+    demanda = np.maximum(demanda, 0)
+    if np.issubdtype(prevision.dtype, np.integer):
+        return np.rint(demanda).astype(prevision.dtype)
+    return demanda
+
+
+def _ejecutar_escenarios(tarea):
+    # Se ejecuta en los procesos del pool: un bloque de escenarios con su propia semilla. Cada plan
+    # (filas candidato × artículo) se ejecuta contra la demanda de todos los escenarios a la vez,
+    # con ventas perdidas como en simular_horizonte_rodante. Devuelve, por método, el coste de cada
+    # fila y escenario y, sumados sobre los escenarios, las roturas y la demanda no servida
+    semilla, escenarios, prevision, generacion, planes, recepciones_programadas, \
+        existencias_iniciales, costo_pedido, costo_mantenimiento = tarea
+    articulos, periodos = prevision.shape
+    filas = len(existencias_iniciales)
+    candidatos = filas // articulos
+    demanda = generar_escenarios(prevision, escenarios, np.random.default_rng(semilla), **generacion)
+    # Periodos delante para recorrerlos sin saltos; la demanda se guarda una sola vez y se difunde
+    # sobre el eje de candidatos (estado candidatos × artículos × escenarios) en vez de repetirla
+    demanda = np.moveaxis(demanda, -1, 0).astype(np.float64)
+    forma = (candidatos, articulos, escenarios)
+
+    costes = np.empty((len(planes), filas, escenarios))
+    roturas = np.empty((len(planes), filas))
+    no_servidas = np.empty((len(planes), filas))
+    negativas = np.empty(forma)
+    for m, plan in enumerate(planes):
+        recibido = (plan + recepciones_programadas).astype(np.float64).reshape(candidatos, articulos, periodos)
+        existencias = np.broadcast_to(existencias_iniciales.reshape(candidatos, articulos, 1), forma).astype(np.float64)
+        posesion = np.zeros(forma)
+        faltas = np.zeros(forma)
+        # Operaciones en el sitio: en cada periodo no se crea ningún array de escenarios
+        for t in range(periodos):
+            existencias += recibido[:, :, t, None]
+            existencias -= demanda[t]
+            np.minimum(existencias, 0, out=negativas)
+            faltas -= negativas
+            np.maximum(existencias, 0, out=existencias)
+            posesion += existencias
+        pedido = (costo_pedido * (plan > 0).sum(axis=1))[:, None]
+        costes[m] = pedido + costo_mantenimiento[:, None] * posesion.reshape(filas, escenarios)
+        roturas[m] = (faltas > 0).sum(axis=-1).ravel()
+        no_servidas[m] = faltas.sum(axis=-1).ravel()
+    return costes, roturas, no_servidas
+
+
+def evaluar_incertidumbre(necesidades_brutas, recepciones_programadas=None, params_table=None,
+                          metodos=tuple(METODOS_BATCH), escenarios=1000, distribucion="normal", dispersion=0.2,
+                          residuos=None, stocks_seguridad=None, nivel_servicio=0.95, semilla=None,
+                          procesos=None, escenarios_por_bloque=1000):
+    """
+    Coste y riesgo de rotura de cada método cuando la demanda real se desvía de la prevista.
+    - necesidades_brutas: previsión con la que se planifica, vector de un artículo o matriz
+      artículos × periodos
+    - recepciones_programadas, params_table: como en plan_batch
+    - metodos: claves de METODOS_BATCH
+    - escenarios, distribucion, dispersion, residuos: escenarios de demanda, como en generar_escenarios
+    - stocks_seguridad: valores candidatos, comunes a todos los artículos o una matriz artículos ×
+      candidatos sin valores repetidos en una fila; por defecto, para cada artículo, 13 valores
+      distintos a saltos iguales desde 0 hasta unas 3 desviaciones típicas del error acumulado de
+      su previsión (la mayor de sus periodos), estimadas con una muestra piloto. Con previsión
+      entera los saltos son de al menos una unidad, así que los artículos con poca variación
+      prueban 0, 1, 2... en vez de repetir valores redondeados
+    - nivel_servicio: probabilidad mínima de no tener ninguna rotura en el horizonte
+    - semilla: semilla de la SeedSequence; con la misma semilla el resultado es el mismo sea cual sea procesos
+    - procesos: pool entre el que se reparten los bloques de escenarios (None en este proceso)
+    - escenarios_por_bloque: escenarios que genera y ejecuta cada tarea
+    Cada método planifica una vez con la previsión por stock candidato (todas las filas en una
+    llamada, como en barrer_parametros) y el plan se ejecuta contra todos los escenarios. Cada
+    bloque de escenarios tiene su propia semilla hija (SeedSequence.spawn), así que el reparto no
+    cambia los números. Devuelve un DataFrame con una fila por artículo, método y stock candidato
+    (columnas COLUMNAS_INCERTIDUMBRE): cuantiles del coste realizado (pedidos y existencias al
+    final de cada periodo), probabilidad de rotura y demanda no servida media. recomendado marca el
+    menor stock que alcanza nivel_servicio (o el mayor candidato si ninguno lo alcanza).
+    """
+    import pandas as pd
+
+    prevision = np.atleast_2d(np.asarray(necesidades_brutas))
+    if recepciones_programadas is None:
+        recepciones_programadas = np.zeros_like(prevision)
+    recepciones_programadas = np.atleast_2d(np.asarray(recepciones_programadas))
+    articulos, periodos = prevision.shape
+    parametros = _leer_parametros(params_table, articulos)
+    metodos = tuple(metodos)
+    for metodo in metodos:
+        if metodo not in METODOS_BATCH:
+            raise ValueError(f"Método desconocido: {metodo!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+    if escenarios < 1:
+        raise ValueError("Hace falta al menos un escenario")
+    generacion = {"distribucion": distribucion, "dispersion": dispersion, "residuos": residuos}
+
+    escenarios_por_bloque = max(1, escenarios_por_bloque)
+    bloques = range(0, escenarios, escenarios_por_bloque)
+    piloto, *semillas = np.random.SeedSequence(semilla).spawn(1 + len(bloques))
+    if stocks_seguridad is None:
+        # Una rejilla por artículo: los de poco volumen no se evalúan con los saltos del más variable
+        muestra = generar_escenarios(prevision, _ESCENARIOS_PILOTO, np.random.default_rng(piloto), **generacion)
+        desviacion = np.cumsum(muestra - prevision[:, None, :], axis=-1).std(axis=1).max(axis=-1, initial=0)
+        # Saltos distintos de cero para no simular dos veces el mismo stock
+        paso = 3 * desviacion / 12
+        if np.issubdtype(prevision.dtype, np.integer):
+            paso = np.maximum(np.ceil(paso), 1).astype(prevision.dtype)
+        else:
+            paso = np.where(paso > 0, paso, 1.0)
+        stocks_seguridad = paso[:, None] * np.arange(13)
+    elif np.ndim(stocks_seguridad) < 2:
+        stocks_seguridad = np.unique(np.atleast_1d(np.asarray(stocks_seguridad)))
+    # Matriz artículos × candidatos, cada fila en orden creciente
+    stocks_seguridad = np.sort(np.broadcast_to(stocks_seguridad, (articulos, np.shape(stocks_seguridad)[-1])), axis=-1)
+    if (np.diff(stocks_seguridad, axis=-1) == 0).any():
+        raise ValueError("stocks_seguridad no puede repetir un valor para el mismo artículo")
+    candidatos = stocks_seguridad.shape[1]
+
+    # Filas candidato × artículo, como las combinaciones de barrer_parametros
+    rejilla = {nombre: np.tile(valor, candidatos) for nombre, valor in parametros.items()}
+    rejilla["stock_seguridad"] = stocks_seguridad.T.ravel()
+    disponibilidades, necesidades_netas = calcular_neteo(
+        np.tile(prevision, (candidatos, 1)), np.tile(recepciones_programadas, (candidatos, 1)),
+        rejilla["stock_seguridad"], rejilla["disponibilidad_inicial"]
+    )
+    planes = []
+    for metodo in metodos:
+        with INSTRUMENTACION.etapa(f"lotificacion:{metodo}"):
+            planes.append(METODOS_BATCH[metodo](disponibilidades, necesidades_netas, rejilla))
+
+    recepciones_por_fila = np.tile(recepciones_programadas, (candidatos, 1))
+    # El neteo parte de max(SS, disponibilidad inicial): la ejecución empieza con esas mismas existencias
+    existencias_iniciales = disponibilidades[:, 0]
+    tareas = (
+        (None, (
+            semilla_bloque, min(escenarios_por_bloque, escenarios - inicio), prevision, generacion, planes,
+            recepciones_por_fila, existencias_iniciales, rejilla["costo_pedido"], rejilla["costo_mantenimiento"],
+        ))
+        for semilla_bloque, inicio in zip(semillas, bloques)
+    )
+    costes, roturas, no_servidas = [], 0, 0
+    with INSTRUMENTACION.etapa("escenarios"):
+        for _, (coste, rotura, faltas) in _mapa_acotado(_ejecutar_escenarios, tareas, procesos):
+            costes.append(coste)
+            roturas = roturas + rotura
+            no_servidas = no_servidas + faltas
+    INSTRUMENTACION.contar("escenarios_evaluados", escenarios * articulos)
+    costes = np.concatenate(costes, axis=-1)
+
+    def por_articulo(valor):
+        # (métodos, candidato·artículo) -> (artículo, método, candidato)
+        return np.asarray(valor).reshape(len(metodos), candidatos, articulos).transpose(2, 0, 1)
+
+    probabilidad = por_articulo(roturas / escenarios)
+    cumple = probabilidad <= 1 - nivel_servicio
+    elegido = np.where(cumple.any(axis=-1), cumple.argmax(axis=-1), candidatos - 1)
+    cuantiles = np.quantile(costes, [0.05, 0.5, 0.95], axis=-1)
+
+    indice = pd.MultiIndex.from_product(
+        [range(articulos), metodos, range(candidatos)], names=["articulo", "metodo", "candidato"]
+    ).to_frame(index=False)
+    resultado = pd.DataFrame({
+        "articulo": indice["articulo"],
+        "metodo": indice["metodo"],
+        "stock_seguridad": stocks_seguridad[indice["articulo"], indice["candidato"]],
+        "coste_medio": por_articulo(costes.mean(axis=-1)).ravel(),
+        "coste_p05": por_articulo(cuantiles[0]).ravel(),
+        "coste_p50": por_articulo(cuantiles[1]).ravel(),
+        "coste_p95": por_articulo(cuantiles[2]).ravel(),
+        "probabilidad_rotura": probabilidad.ravel(),
+        "no_servidas_media": por_articulo(no_servidas / escenarios).ravel(),
+        "recomendado": (np.arange(candidatos) == elegido[..., None]).ravel(),
+    })
+    return resultado[list(COLUMNAS_INCERTIDUMBRE)]
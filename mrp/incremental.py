@@ -0,0 +1,154 @@
+"""Replanificación por cambio neto de un plan de varios artículos."""
+import numpy as np
+
+from .batch import METODOS_BATCH, _demanda_en_horizonte, _lanzar_matriz, _leer_parametros, plan_batch
+from .bom import explosionar_bom
+from .costes import evaluar_costes
+from .neteo import calcular_neteo
+
+
+# REPLANIFICACIÓN POR CAMBIO NETO
+# Métodos cuyo plan se puede retomar desde el inicio de un ciclo: las decisiones a partir de un
+# periodo con pedido solo dependen de las necesidades netas desde ese periodo
+_HEURISTICAS_REANUDABLES = ("Minimo Coste Unitario", "Minimo Coste Total", "Silver Meal")
+
+
+class PlanIncremental:
+    """
+    Plan de varios artículos que se mantiene al día por cambio neto (net change) en lugar de
+    regenerarse entero.
+    - necesidades_brutas, recepciones_programadas, params_table, method: como en plan_batch
+    - bom: opcional, (padres, componentes, cantidades) como en explosionar_bom
+    Cada modificación marca el artículo como sucio desde el primer periodo cambiado. replanificar()
+    retoma el neteo en ese periodo a partir de la disponibilidad ya calculada y la lotificación en el
+    inicio del ciclo que lo contiene, y en modo BOM solo marca los componentes cuyos lanzamientos
+    de padre han cambiado, desde el primer periodo distinto. El plan vigente está en self.plan, con
+    las mismas claves que devuelve plan_batch (o explosionar_bom).
+    """
+
+    def __init__(self, necesidades_brutas, recepciones_programadas, params_table, method, bom=None):
+        if method not in METODOS_BATCH:
+            raise ValueError(f"Método desconocido: {method!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+        self.necesidades_brutas = np.array(np.atleast_2d(necesidades_brutas))
+        articulos, periodos = self.necesidades_brutas.shape
+        if recepciones_programadas is None:
+            self.recepciones_programadas = np.zeros_like(self.necesidades_brutas)
+        else:
+            self.recepciones_programadas = np.array(np.atleast_2d(recepciones_programadas))
+        self.parametros = {nombre: np.array(valor) for nombre, valor in _leer_parametros(params_table, articulos).items()}
+        self.method = method
+        self._sucios = {}
+
+        if bom is None:
+            self.plan = plan_batch(self.necesidades_brutas, self.recepciones_programadas, self.parametros, method)
+            self.plan["necesidades_dependientes"] = np.zeros_like(self.plan["necesidades_netas"])
+            self.plan["nivel"] = np.zeros(articulos, dtype=int)
+            self._enlaces = None
+        else:
+            padres, componentes, cantidades = (np.asarray(x) for x in bom)
+            self.plan = explosionar_bom(
+                self.necesidades_brutas, self.recepciones_programadas, self.parametros,
+                padres, componentes, cantidades, method
+            )
+            # Enlaces ordenados por padre para encontrar los componentes de un artículo en O(1)
+            orden = np.argsort(padres, kind="stable")
+            limites = np.searchsorted(padres[orden], np.arange(articulos + 1))
+            self._enlaces = (orden, limites, componentes, cantidades)
+
+    @property
+    def sucios(self):
+        """Artículos pendientes de replanificar y primer periodo afectado de cada uno."""
+        return dict(self._sucios)
+
+    def marcar_sucio(self, articulo, periodo=0):
+        self._sucios[articulo] = min(periodo, self._sucios.get(articulo, periodo))
+
+    def modificar(self, articulo, periodo, necesidades_brutas=None, recepciones_programadas=None):
+        """Cambia la demanda independiente y/o las recepciones programadas de un artículo en un periodo."""
+        if necesidades_brutas is not None:
+            self.necesidades_brutas[articulo, periodo] = necesidades_brutas
+        if recepciones_programadas is not None:
+            self.recepciones_programadas[articulo, periodo] = recepciones_programadas
+        self.marcar_sucio(articulo, periodo)
+
+    def modificar_parametros(self, articulo, **parametros):
+        """Cambia parámetros de un artículo (costes, plazos, stock...); se replanifica todo su horizonte."""
+        for nombre, valor in parametros.items():
+            self.parametros[nombre][articulo] = valor
+        # Un tiempo de suministro mayor que el origen necesita más periodos negativos en los lanzamientos
+        ampliacion = int(self.parametros["tiempo_suministro"][articulo]) - self.plan["origen_lanzamientos"]
+        if ampliacion > 0:
+            self.plan["lanzamiento_pedidos"] = np.pad(self.plan["lanzamiento_pedidos"], ((0, 0), (ampliacion, 0)))
+            self.plan["origen_lanzamientos"] += ampliacion
+        self.marcar_sucio(articulo, 0)
+
+    def replanificar(self):
+        """Replanifica los artículos sucios por orden de nivel y devuelve sus índices."""
+        replanificados = []
+        nivel = self.plan["nivel"]
+        while self._sucios:
+            nivel_actual = min(nivel[articulo] for articulo in self._sucios)
+            for articulo in [a for a in self._sucios if nivel[a] == nivel_actual]:
+                anteriores = self.plan["lanzamiento_pedidos"][articulo].copy()
+                self._replanificar_articulo(articulo, self._sucios.pop(articulo))
+                if self._enlaces is not None:
+                    self._propagar(articulo, _demanda_en_horizonte(
+                        self.plan["lanzamiento_pedidos"][articulo] - anteriores, self.plan["origen_lanzamientos"]
+                    ))
+                replanificados.append(articulo)
+        return np.array(sorted(replanificados), dtype=int)
+
+    def _reinicio_lotificacion(self, articulo, periodo):
+        # Primer periodo desde el que hay que rehacer la lotificación para que el plan sea el mismo
+        # que con una regeneración completa
+        if self.method == "Lote a Lote":
+            return periodo
+        if self.method == "Periodo Constante":
+            periodo_constante = self.parametros["periodo_constante"][articulo]
+            return periodo // periodo_constante * periodo_constante
+        if self.method in _HEURISTICAS_REANUDABLES:
+            # El ciclo anterior se cerró evaluando periodos < periodo, así que su decisión no cambia
+            pedidos = np.flatnonzero(self.plan["recepcion_pedidos"][articulo, :periodo] > 0)
+            return int(pedidos[-1]) if len(pedidos) else 0
+        return 0  # EOQ, POQ y Wagner-Whitin dependen de todo el horizonte
+
+    def _replanificar_articulo(self, articulo, periodo):
+        plan = self.plan
+        parametros = {nombre: valor[articulo:articulo + 1] for nombre, valor in self.parametros.items()}
+        brutas = self.necesidades_brutas[articulo] + plan["necesidades_dependientes"][articulo]
+        # La disponibilidad del periodo cambiado solo depende de periodos anteriores: sirve de arranque
+        disponibilidad = (plan["disponibilidades"][articulo, periodo] if periodo > 0
+                          else parametros["disponibilidad_inicial"][0])
+        disponibilidades, necesidades_netas = calcular_neteo(
+            brutas[periodo:], self.recepciones_programadas[articulo, periodo:],
+            parametros["stock_seguridad"][0], disponibilidad
+        )
+        plan["disponibilidades"][articulo, periodo:] = disponibilidades
+        plan["necesidades_netas"][articulo, periodo:] = necesidades_netas
+
+        reinicio = self._reinicio_lotificacion(articulo, periodo)
+        plan["recepcion_pedidos"][articulo, reinicio:] = METODOS_BATCH[self.method](
+            plan["disponibilidades"][articulo:articulo + 1, reinicio:],
+            plan["necesidades_netas"][articulo:articulo + 1, reinicio:],
+            parametros
+        )[0]
+        recepcion_pedidos = plan["recepcion_pedidos"][articulo:articulo + 1]
+        plan["lanzamiento_pedidos"][articulo] = _lanzar_matriz(
+            recepcion_pedidos, parametros["tiempo_suministro"], plan["origen_lanzamientos"]
+        )[0]
+        costes = evaluar_costes(
+            recepcion_pedidos[0], plan["necesidades_netas"][articulo],
+            parametros["costo_pedido"][0], parametros["costo_mantenimiento"][0]
+        )
+        for nombre, valor in zip(("coste_total", "coste_posesion", "coste_pedido"), costes):
+            plan[nombre][articulo] = valor
+
+    def _propagar(self, articulo, diferencia):
+        cambios = np.flatnonzero(diferencia)
+        if not len(cambios):
+            return
+        orden, limites, componentes, cantidades = self._enlaces
+        for enlace in orden[limites[articulo]:limites[articulo + 1]]:
+            componente = componentes[enlace]
+            self.plan["necesidades_dependientes"][componente] += cantidades[enlace] * diferencia
+            self.marcar_sucio(componente, int(cambios[0]))
@@ -0,0 +1,137 @@
+"""Temporizadores y contadores por etapa del motor de planificación."""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+
+# INSTRUMENTACIÓN
+class _Cronometro:
+    # Contexto que suma la duración de un bloque a una etapa de la instrumentación
+    __slots__ = ("_instrumentacion", "_nombre", "_inicio")
+
+    def __init__(self, instrumentacion, nombre):
+        self._instrumentacion = instrumentacion
+        self._nombre = nombre
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self._instrumentacion.registrar(self._nombre, time.perf_counter() - self._inicio)
+        return False
+
+
+class Instrumentacion:
+    """
+    Temporizadores y contadores por etapa del cálculo (neteo, lotificación, costes, tablas, render).
+    - activa: si es False, etapa() devuelve un contexto vacío y contar() no hace nada, así que el
+      coste de dejar la instrumentación en el código es una comprobación de atributo (más la
+      consulta del contexto en INSTRUMENTACION)
+    Los tiempos son inclusivos (una etapa incluye las que se anidan dentro) y se acumulan hasta
+    reiniciar(). Lo que se mide en los procesos de un pool se queda en esos procesos.
+    Dentro de `with instrumentacion.medir():` lo que el motor mide con INSTRUMENTACION va a esta
+    instrumentación, solo en ese hilo: así cada sesión de la interfaz tiene la suya.
+    """
+
+    def __init__(self, activa=False):
+        self.activa = activa
+        self._etapas = {}
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def etapa(self, nombre):
+        """Contexto que mide la duración de un bloque: with INSTRUMENTACION.etapa("neteo"): ..."""
+        return _Cronometro(self, nombre) if self.activa else _SIN_MEDIDA
+
+    def medir(self):
+        """Contexto en el que INSTRUMENTACION mide en esta instrumentación (en este hilo o tarea)."""
+        return _Redireccion(self)
+
+    def registrar(self, nombre, segundos):
+        with self._lock:
+            etapa = self._etapas.setdefault(nombre, [0, 0.0])
+            etapa[0] += 1
+            etapa[1] += segundos
+
+    def contar(self, nombre, cantidad=1):
+        if self.activa:
+            with self._lock:
+                self._contadores[nombre] = self._contadores.get(nombre, 0) + cantidad
+
+    def reiniciar(self):
+        with self._lock:
+            self._etapas.clear()
+            self._contadores.clear()
+
+    def resumen(self):
+        """Dict serializable con llamadas, segundos y milisegundos por llamada de cada etapa, y los contadores."""
+        with self._lock:
+            return {
+                "etapas": {
+                    nombre: {"llamadas": llamadas, "segundos": segundos, "ms_por_llamada": segundos * 1e3 / llamadas}
+                    for nombre, (llamadas, segundos) in self._etapas.items()
+                },
+                "contadores": dict(self._contadores),
+            }
+
+    def to_json(self, ruta=None):
+        """Resumen en JSON; si se indica ruta se escribe también en ese fichero."""
+        texto = json.dumps(self.resumen(), indent=2, ensure_ascii=False)
+        if ruta is not None:
+            with open(ruta, "w", encoding="utf-8") as fichero:
+                fichero.write(texto)
+        return texto
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        etapas = self.resumen()["etapas"]
+        df = pd.DataFrame.from_dict(etapas, orient="index", columns=["llamadas", "segundos", "ms_por_llamada"])
+        df.index.name = "Etapa"
+        return df.sort_values("segundos", ascending=False)
+
+
+_SIN_MEDIDA = nullcontext()
+
+# Instrumentación a la que va lo que mide INSTRUMENTACION en el contexto actual (None: la del proceso)
+_EN_CURSO = contextvars.ContextVar("instrumentacion_en_curso", default=None)
+
+
+class _Redireccion:
+    # Contexto de Instrumentacion.medir(); admite anidarse
+    __slots__ = ("_instrumentacion", "_testigo")
+
+    def __init__(self, instrumentacion):
+        self._instrumentacion = instrumentacion
+
+    def __enter__(self):
+        self._testigo = _EN_CURSO.set(self._instrumentacion)
+        return self._instrumentacion
+
+    def __exit__(self, *excepcion):
+        _EN_CURSO.reset(self._testigo)
+        return False
+
+
+class _InstrumentacionProceso(Instrumentacion):
+    # La instrumentación del proceso: dentro de medir() de otra instrumentación mide en esa
+    def etapa(self, nombre):
+        en_curso = _EN_CURSO.get()
+        return super().etapa(nombre) if en_curso is None else en_curso.etapa(nombre)
+
+    def contar(self, nombre, cantidad=1):
+        en_curso = _EN_CURSO.get()
+        if en_curso is None:
+            super().contar(nombre, cantidad)
+        else:
+            en_curso.contar(nombre, cantidad)
+
+
+# Instrumentación del proceso; se activa en tiempo de ejecución con INSTRUMENTACION.activa = True
+# o desde el arranque con la variable de entorno MRP_INSTRUMENTACION=1. Una aplicación con varios
+# usuarios no la cambia: cada uno mide en su Instrumentacion con medir()
+INSTRUMENTACION = _InstrumentacionProceso(activa=os.environ.get("MRP_INSTRUMENTACION", "") not in ("", "0"))
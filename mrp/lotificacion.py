@@ -0,0 +1,235 @@
+"""Métodos de lotificación exactos o de regla fija: Lote a Lote, EOQ, POQ, Periodo Constante y Wagner-Whitin."""
+import numpy as np
+
+from .costes import _costes_por_periodo
+from .neteo import _lanzar, calcular_neteo
+
+
+# LOTE A LOTE
+def calcular_lote_a_lote(necesidades_brutas, recepciones_programadas, tiempo_suministro, stock_seguridad, disponibilidad_inicial, neteo=None):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+
+    recepcion_pedidos = necesidades_netas.copy()
+    lanzamiento_pedidos = _lanzar(recepcion_pedidos, tiempo_suministro)
+    # Lo recibido cubre exactamente lo neto, el disponible adicional no varía
+    disponible_adicional = np.full_like(disponibilidades, disponibilidades[0])
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
+
+# EOQ Y POQ
+# Versiones para matrices artículos × periodos con costes por artículo; las de un artículo las
+# usan sobre una matriz de una fila.
+def _cantidad_economica(necesidades_netas, costo_pedido, costo_mantenimiento):
+    # EOQ = ⌈√(2·D·C_p / (h·T))⌉ de todos los artículos a la vez, con D la necesidad neta total del
+    # horizonte de T periodos. Con h = 0 no cuesta guardar: un único pedido cubre todo el horizonte
+    periodos = necesidades_netas.shape[1]
+    demanda_total = necesidades_netas.sum(axis=1)
+    costo_pedido = np.broadcast_to(costo_pedido, demanda_total.shape)
+    costo_mantenimiento = np.broadcast_to(costo_mantenimiento, demanda_total.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eoq = np.ceil(np.sqrt(2 * demanda_total * costo_pedido / (costo_mantenimiento * periodos)))
+    eoq = np.where(costo_mantenimiento > 0, eoq, demanda_total)
+    return demanda_total, np.maximum(eoq, 1)
+
+
+def _lotes_eoq(necesidades_netas, costo_pedido, costo_mantenimiento):
+    """
+    Recepciones EOQ de una matriz de necesidades netas: se pide en cuanto el stock no cubre la
+    necesidad del periodo, en múltiplos de la EOQ. Los pedidos acumulados hasta t son ⌈NN_acum[t]/EOQ⌉,
+    así que el plan sale de una suma acumulada sin recorrer los periodos.
+    Devuelve (recepcion_pedidos, eoq) con un valor de eoq por artículo.
+    """
+    _, eoq = _cantidad_economica(necesidades_netas, costo_pedido, costo_mantenimiento)
+    pedidos = np.ceil(np.cumsum(necesidades_netas, axis=1) / eoq[:, None])
+    recepcion_pedidos = np.diff(pedidos, axis=1, prepend=0) * eoq[:, None]
+    return recepcion_pedidos.astype(necesidades_netas.dtype, copy=False), eoq
+
+
+def _lotes_poq(necesidades_netas, costo_pedido, costo_mantenimiento):
+    """
+    Recepciones POQ (periodo económico) de una matriz de necesidades netas: cada pedido se lanza en
+    el primer periodo con necesidad que no está cubierto y cubre las necesidades de ese periodo y
+    de los P - 1 siguientes, con P = EOQ / demanda media redondeado (al menos 1). Se recorren los
+    periodos con operaciones sobre todos los artículos a la vez.
+    Devuelve (recepcion_pedidos, P) con un valor de P por artículo.
+    """
+    articulos, periodos = necesidades_netas.shape
+    demanda_total, eoq = _cantidad_economica(necesidades_netas, costo_pedido, costo_mantenimiento)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cobertura = np.where(demanda_total > 0, np.rint(eoq * periodos / demanda_total), 1)
+    cobertura = np.maximum(cobertura, 1).astype(np.int64)
+
+    acumuladas = np.zeros((articulos, periodos + 1), dtype=necesidades_netas.dtype)
+    np.cumsum(necesidades_netas, axis=1, out=acumuladas[:, 1:])
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    cubierto_hasta = np.zeros(articulos, dtype=np.int64)
+    filas = np.arange(articulos)
+    for t in range(periodos):
+        pide = (necesidades_netas[:, t] > 0) & (cubierto_hasta <= t)
+        if pide.any():
+            fin = np.minimum(t + cobertura[pide], periodos)
+            recepcion_pedidos[pide, t] = acumuladas[filas[pide], fin] - acumuladas[pide, t]
+            cubierto_hasta[pide] = fin
+    return recepcion_pedidos, cobertura
+
+
+def calcular_eoq(necesidades_brutas, recepciones_programadas, tiempo_suministro, stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento, neteo=None):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+
+    # Con costes por periodo la cantidad económica se calcula con sus medias
+    recepcion_pedidos = _lotes_eoq(necesidades_netas[None], np.mean(costo_pedido), np.mean(costo_mantenimiento))[0][0]
+    lanzamiento_pedidos = _lanzar(recepcion_pedidos, tiempo_suministro)
+    disponible_adicional = disponibilidades[0] + np.cumsum(recepcion_pedidos - necesidades_netas)
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
+
+
+def calcular_poq(necesidades_brutas, recepciones_programadas, tiempo_suministro, stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento, neteo=None):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+
+    # Con costes por periodo la cantidad económica se calcula con sus medias
+    recepcion_pedidos = _lotes_poq(necesidades_netas[None], np.mean(costo_pedido), np.mean(costo_mantenimiento))[0][0]
+    lanzamiento_pedidos = _lanzar(recepcion_pedidos, tiempo_suministro)
+    disponible_adicional = disponibilidades[0] + np.cumsum(recepcion_pedidos - necesidades_netas)
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
+
+# PERIODO CONSTANTE
+def calcular_periodo_constante(necesidades_brutas, recepciones_programadas, tiempo_suministro, 
+                               stock_seguridad, disponibilidad_inicial, periodo_constante, neteo=None):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+
+    nn = necesidades_netas.tolist()
+    for t, necesidad in enumerate(nn):
+        if t % periodo_constante == 0:
+            valor_periodo = sum(nn[t:t+periodo_constante])
+            colocado = False
+        if necesidad > 0 and not colocado:
+            recepcion_pedidos[t] = valor_periodo
+            colocado = True
+    lanzamiento_pedidos = _lanzar(recepcion_pedidos, tiempo_suministro)
+    disponible_adicional = disponibilidades[0] + np.cumsum(recepcion_pedidos - necesidades_netas)
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
+
+
+# WAGNER-WHITIN
+# Solución óptima exacta con el mismo modelo de costes que calcular_coste_total:
+# C_p por pedido y h por unidad que pasa de un periodo al siguiente.
+def _wagner_whitin(necesidades_netas, costo_pedido, costo_mantenimiento):
+    """
+    Programación dinámica hacia delante en O(n) (requiere costo_mantenimiento >= 0).
+    - costo_pedido, costo_mantenimiento: escalares o un valor por periodo
+    F[j] = coste mínimo de cubrir los periodos 0..j-1. Con H[k] el coste de guardar una unidad desde
+    el periodo 0 hasta el k (h·k con h escalar), un pedido en i que cubre i..j-1 cuesta
+    C_p[i] + W[j] - W[i] - H[i]·(P[j] - P[i]), con P y W sumas acumuladas de NN_k y H[k]·NN_k, así que
+    F[j] = W[j] + min_i (b_i - H[i]·P[j]): el mínimo de rectas de pendiente -H[i] evaluadas en
+    P[j]. Las pendientes no crecen con i y P[j] no decrece con j, de modo que la envolvente inferior
+    se mantiene en una cola doble con coste amortizado constante (la misma idea que
+    Wagelmans-Van Hoesel-Kolen). Con C_p escalar basta pedir en periodos con necesidad; con un C_p
+    por periodo puede salir más barato adelantar el pedido a un periodo sin necesidad, así que hay
+    una recta por periodo. Devuelve la lista de recepciones Q_t.
+    """
+    periodos = len(necesidades_netas)
+    recepcion_pedidos = [0] * periodos
+    pedido, posesion = _costes_por_periodo(costo_pedido, costo_mantenimiento, periodos)
+    en_todos = np.ndim(costo_pedido) != 0
+    P = [0] * (periodos + 1)
+    W = [0] * (periodos + 1)
+    if posesion is None:
+        # h escalar: W se acumula en enteros y se escala al final, como H[k] = h·k
+        for t, necesidad in enumerate(necesidades_netas):
+            P[t+1] = P[t] + necesidad
+            W[t+1] = W[t] + t * necesidad
+        posesion = [costo_mantenimiento * t for t in range(periodos + 1)]
+        W = [costo_mantenimiento * w for w in W]
+    else:
+        for t, necesidad in enumerate(necesidades_netas):
+            P[t+1] = P[t] + necesidad
+            W[t+1] = W[t] + posesion[t] * necesidad
+
+    F = [0] * (periodos + 1)
+    origen = [0] * (periodos + 1)
+    pendientes = []     # envolvente: rectas candidatas, desde cabeza hasta el final
+    ordenadas = []
+    indices = []
+    cabeza = 0
+    for j in range(1, periodos + 1):
+        i = j - 1
+        if en_todos or necesidades_netas[i] > 0:
+            # Nueva recta para un pedido en i
+            m = -posesion[i]
+            b = F[i] + pedido[i] - W[i] + posesion[i] * P[i]
+            # Con h = 0 las pendientes coinciden y basta la recta de menor ordenada
+            if not (len(pendientes) > cabeza and pendientes[-1] == m and ordenadas[-1] < b):
+                while len(pendientes) > cabeza and pendientes[-1] == m:
+                    pendientes.pop(); ordenadas.pop(); indices.pop()
+                while len(pendientes) - cabeza >= 2:
+                    m1, b1 = pendientes[-2], ordenadas[-2]
+                    m2, b2 = pendientes[-1], ordenadas[-1]
+                    if (b - b1) * (m1 - m2) <= (b2 - b1) * (m1 - m):
+                        pendientes.pop(); ordenadas.pop(); indices.pop()
+                    else:
+                        break
+                pendientes.append(m); ordenadas.append(b); indices.append(i)
+        x = P[j]
+        if x == 0:
+            continue  # todavía no hay necesidades: F[j] = 0
+        while (len(pendientes) - cabeza >= 2
+               and pendientes[cabeza+1] * x + ordenadas[cabeza+1] <= pendientes[cabeza] * x + ordenadas[cabeza]):
+            cabeza += 1
+        F[j] = pendientes[cabeza] * x + ordenadas[cabeza] + W[j]
+        origen[j] = indices[cabeza]
+
+    # Reconstrucción del plan desde el último periodo
+    j = periodos
+    while j > 0 and P[j] > 0:
+        i = origen[j]
+        recepcion_pedidos[i] = P[j] - P[i]
+        j = i
+    return recepcion_pedidos
+
+
+def _wagner_whitin_naive(necesidades_netas, costo_pedido, costo_mantenimiento):
+    # Versión de referencia O(n²) de la misma recursión, para comprobar _wagner_whitin; prueba
+    # pedidos en todos los periodos, también en los que no tienen necesidad
+    periodos = len(necesidades_netas)
+    pedido, posesion = _costes_por_periodo(costo_pedido, costo_mantenimiento, periodos)
+    if posesion is None:
+        posesion = [costo_mantenimiento * t for t in range(periodos + 1)]
+    F = [0] * (periodos + 1)
+    origen = [0] * (periodos + 1)
+    for j in range(1, periodos + 1):
+        if not any(necesidades_netas[:j]):
+            continue
+        mejor = None
+        for i in range(j):
+            coste = F[i] + pedido[i] + sum((posesion[k] - posesion[i]) * necesidades_netas[k] for k in range(i, j))
+            if mejor is None or coste < mejor:
+                mejor, origen[j] = coste, i
+        F[j] = mejor
+    recepcion_pedidos = [0] * periodos
+    j = periodos
+    while j > 0 and any(necesidades_netas[:j]):
+        i = origen[j]
+        recepcion_pedidos[i] = sum(necesidades_netas[i:j])
+        j = i
+    return recepcion_pedidos
+
+
+def calcular_wagner_whitin(necesidades_brutas, recepciones_programadas, tiempo_suministro,
+                           stock_seguridad, disponibilidad_inicial, costo_pedido, costo_mantenimiento, neteo=None):
+    if neteo is None:
+        neteo = calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial)
+    disponibilidades, necesidades_netas = neteo
+
+    recepcion_pedidos = np.zeros_like(necesidades_netas)
+    recepcion_pedidos[:] = _wagner_whitin(necesidades_netas.tolist(), costo_pedido, costo_mantenimiento)
+    lanzamiento_pedidos = _lanzar(recepcion_pedidos, tiempo_suministro)
+    disponible_adicional = disponibilidades[0] + np.cumsum(recepcion_pedidos - necesidades_netas)
+    return disponibilidades, necesidades_netas, recepcion_pedidos, lanzamiento_pedidos, disponible_adicional
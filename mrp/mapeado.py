@@ -0,0 +1,127 @@
+"""Planificación de matrices en ficheros mapeados en memoria, para horizontes que no caben en RAM."""
+import os
+
+import numpy as np
+
+from .batch import METODOS_BATCH, _leer_parametros, plan_batch
+from .flujo import _mapa_acotado
+
+# Series del plan que planificar_mapeado escribe en ficheros por defecto
+SERIES_MAPEADAS = ("disponibilidades", "recepcion_pedidos", "lanzamiento_pedidos")
+
+
+def _como_matriz(datos, modo="r"):
+    # Ruta de un .npy -> memmap; memmap, ndarray u objeto con protocolo de buffer -> vista sin copia
+    if isinstance(datos, (str, os.PathLike)):
+        return np.load(datos, mmap_mode=modo)
+    return np.atleast_2d(np.asarray(datos))
+
+
+def _planificar_filas(tarea):
+    # Se ejecuta en los procesos del pool: planifica las filas inicio:fin y las escribe en los
+    # ficheros de salida, que cada proceso abre por su ruta; solo vuelven los costes
+    necesidades_brutas, recepciones_programadas, inicio, fin, parametros, method, salidas = tarea
+    if isinstance(necesidades_brutas, (str, os.PathLike)):
+        necesidades_brutas = _como_matriz(necesidades_brutas)[inicio:fin]
+    if isinstance(recepciones_programadas, (str, os.PathLike)):
+        recepciones_programadas = _como_matriz(recepciones_programadas)[inicio:fin]
+    # Los núcleos de plan_batch crean sus propios arrays: el bloque se planifica en memoria y luego
+    # se copia a su tramo de las salidas (ver la memoria por bloque en planificar_mapeado)
+    plan = plan_batch(necesidades_brutas, recepciones_programadas, parametros, method)
+    for serie, destino in salidas.items():
+        if isinstance(destino, (str, os.PathLike)):
+            destino = _como_matriz(destino, "r+")
+        valor = plan[serie]
+        # Los lanzamientos del bloque tienen el origen del bloque: se alinean a la derecha
+        destino[inicio:fin, destino.shape[1] - valor.shape[1]:] = valor
+        if isinstance(destino, np.memmap):
+            destino.flush()
+    return plan["coste_total"], plan["coste_posesion"], plan["coste_pedido"]
+
+
+def planificar_mapeado(necesidades_brutas, recepciones_programadas, params_table, method, salida,
+                       series=SERIES_MAPEADAS, articulos_por_bloque=10_000, procesos=None, en_vuelo=None):
+    """
+    Igual que plan_batch, pero recorre la matriz por bloques de filas y escribe las matrices del
+    plan en ficheros .npy mapeados en memoria en vez de devolverlas, de modo que ni la entrada ni
+    la salida tienen que caber en RAM.
+    - necesidades_brutas, recepciones_programadas: ruta de un .npy, np.memmap, ndarray o cualquier
+      objeto con protocolo de buffer y forma artículos × periodos (p. ej. memoryview.cast(...));
+      recepciones_programadas puede ser None. Solo se leen las filas de cada bloque
+    - params_table, method: como en plan_batch
+    - salida: directorio donde se crean <serie>.npy (se sobrescriben si existen)
+    - series: matrices de plan_batch que se escriben
+    - articulos_por_bloque: filas que se planifican de cada vez
+    - procesos, en_vuelo: como en planificar_en_flujo. Cada proceso abre los ficheros de salida y
+      escribe sus filas directamente; las entradas dadas por ruta también se abren en el proceso,
+      sin copiarlas, y las demás se envían bloque a bloque
+    Devuelve un dict con una np.memmap de lectura y escritura por serie, origen_lanzamientos y los
+    vectores coste_total, coste_posesion y coste_pedido.
+    Los núcleos de lotificación no escriben directamente en los ficheros: cada bloque se planifica
+    con plan_batch en arrays normales y se copia después a sus filas de las salidas. El pico de
+    memoria por bloque (y por proceso) es el de plan_batch sobre el bloque, unas 7 veces el tamaño
+    del bloque de entrada (articulos_por_bloque × periodos × tamaño del tipo), que es lo que hay
+    que ajustar con articulos_por_bloque; la matriz completa nunca se carga.
+    """
+    if method not in METODOS_BATCH:
+        raise ValueError(f"Método desconocido: {method!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+    matriz = _como_matriz(necesidades_brutas)
+    articulos_por_bloque = max(1, articulos_por_bloque)
+    articulos, periodos = matriz.shape
+    parametros = _leer_parametros(params_table, articulos)
+    origen = int(parametros["tiempo_suministro"].max(initial=0))
+    recepciones = None if recepciones_programadas is None else _como_matriz(recepciones_programadas)
+    dtype = np.result_type(
+        matriz.dtype, matriz.dtype if recepciones is None else recepciones.dtype,
+        parametros["stock_seguridad"].dtype, parametros["disponibilidad_inicial"].dtype,
+    )
+
+    os.makedirs(salida, exist_ok=True)
+    rutas = {serie: os.path.join(salida, f"{serie}.npy") for serie in series}
+    # open_memmap crea cada fichero con su tamaño final sin escribirlo: las páginas se reservan al usarlas
+    creadas = {
+        serie: np.lib.format.open_memmap(
+            ruta, mode="w+", dtype=dtype,
+            shape=(articulos, origen + periodos if serie == "lanzamiento_pedidos" else periodos),
+        )
+        for serie, ruta in rutas.items()
+    }
+
+    # En paralelo las rutas viajan tal cual y cada proceso abre los ficheros; el resto de entradas
+    # se cortan aquí y viaja solo el bloque de filas
+    paralelo = procesos is not None and procesos > 1
+    if paralelo:
+        fuentes = [
+            datos if isinstance(datos, (str, os.PathLike)) else matriz_abierta
+            for datos, matriz_abierta in ((necesidades_brutas, matriz), (recepciones_programadas, recepciones))
+        ]
+        salidas = rutas
+    else:
+        fuentes = [matriz, recepciones]
+        salidas = creadas
+
+    def entrada(fuente, inicio):
+        if fuente is None or isinstance(fuente, (str, os.PathLike)):
+            return fuente
+        return fuente[inicio:inicio + articulos_por_bloque]
+
+    tareas = (
+        (inicio, (
+            entrada(fuentes[0], inicio), entrada(fuentes[1], inicio),
+            inicio, min(inicio + articulos_por_bloque, articulos),
+            {nombre: valor[inicio:inicio + articulos_por_bloque] for nombre, valor in parametros.items()},
+            method, salidas,
+        ))
+        for inicio in range(0, articulos, articulos_por_bloque)
+    )
+    costes = np.zeros((3, articulos))
+    for inicio, resultado in _mapa_acotado(_planificar_filas, tareas, procesos, en_vuelo):
+        costes[:, inicio:inicio + len(resultado[0])] = resultado
+
+    return {
+        **creadas,
+        "origen_lanzamientos": origen,
+        "coste_total": costes[0],
+        "coste_posesion": costes[1],
+        "coste_pedido": costes[2],
+    }
@@ -0,0 +1,62 @@
+"""Paso de necesidades brutas a netas y desfase de los lanzamientos."""
+import numpy as np
+
+from .instrumentacion import INSTRUMENTACION
+
+
+# NETEO
+def _por_articulo(valor, ndim):
+    # En modo matriz los parámetros pueden venir con un valor por artículo (fila)
+    valor = np.asarray(valor)
+    if ndim == 2 and valor.ndim == 1:
+        return valor[:, None]
+    return valor
+
+
+def calcular_neteo(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial):
+    """
+    Paso de necesidades brutas a netas, común a todos los métodos de lotificación.
+    - necesidades_brutas: NB_t, vector (periodos) o matriz (artículos × periodos)
+    - recepciones_programadas: RP_t, misma forma que necesidades_brutas
+    - stock_seguridad: SS, escalar o un valor por artículo
+    - disponibilidad_inicial: disponibilidad de la semana 1, escalar o un valor por artículo
+    Devuelve (disponibilidades, necesidades_netas) como arrays con la forma de la entrada.
+
+    La recursión D_t = max(SS, D_{t-1} + RP_{t-1} - NB_{t-1}) se resuelve con sumas
+    acumuladas: D_t - SS = S_t - min(SS - D_0, min_{k<=t} S_k), con S_t = sum_{j<t} (RP_j - NB_j).
+    """
+    with INSTRUMENTACION.etapa("neteo"):
+        necesidades_brutas = np.asarray(necesidades_brutas)
+        recepciones_programadas = np.asarray(recepciones_programadas)
+        ndim = necesidades_brutas.ndim
+        stock_seguridad = _por_articulo(stock_seguridad, ndim)
+        disponibilidad_inicial = _por_articulo(disponibilidad_inicial, ndim)
+
+        saldo = recepciones_programadas - necesidades_brutas
+        acumulado = np.cumsum(saldo, axis=-1) - saldo
+        holgura_inicial = np.maximum(disponibilidad_inicial, stock_seguridad) - stock_seguridad
+        minimo = np.minimum(np.minimum.accumulate(acumulado, axis=-1), -holgura_inicial)
+
+        disponibilidades = acumulado - minimo + stock_seguridad
+        necesidades_netas = np.maximum(
+            necesidades_brutas - disponibilidades - recepciones_programadas + stock_seguridad, 0
+        )
+    INSTRUMENTACION.contar("periodos_neteados", necesidades_brutas.size)
+    return disponibilidades, necesidades_netas
+
+
+def _ultima_necesidad(necesidades_netas):
+    # Índice del último periodo con necesidad neta (-1 si no hay ninguno); permite saber en O(1)
+    # si quedan necesidades futuras sin recorrer el resto del horizonte
+    positivos = np.flatnonzero(np.asarray(necesidades_netas) > 0)
+    return int(positivos[-1]) if len(positivos) else -1
+
+
+def _lanzar(recepcion_pedidos, tiempo_suministro):
+    # Serie de lanzamientos con origen desplazado: la posición tiempo_suministro + p corresponde al
+    # periodo p, así que el lanzamiento p - tiempo_suministro de la recepción en p se guarda en el
+    # índice p y los atrasados quedan en periodos cero o negativos en lugar de dar la vuelta al
+    # final del horizonte. Tiene tiempo_suministro + periodos posiciones.
+    lanzamiento_pedidos = np.zeros(tiempo_suministro + len(recepcion_pedidos), dtype=recepcion_pedidos.dtype)
+    lanzamiento_pedidos[:len(recepcion_pedidos)] = recepcion_pedidos
+    return lanzamiento_pedidos
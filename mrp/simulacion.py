@@ -0,0 +1,118 @@
+"""Simulación con horizonte rodante y zona congelada."""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .batch import METODOS_BATCH, _leer_parametros
+from .instrumentacion import INSTRUMENTACION
+from .neteo import calcular_neteo
+
+
+# SIMULACIÓN CON HORIZONTE RODANTE
+# Indicadores que devuelve la simulación, en el orden de las columnas del resultado
+INDICADORES_SIMULACION = ("coste_total", "coste_pedido", "coste_posesion", "no_servidas", "nerviosismo")
+
+
+def _simular_bloque(tarea):
+    # Se ejecuta en los procesos del pool: todos los métodos sobre un bloque de artículos
+    demanda, previsiones, parametros, metodos, horizonte, congelados = tarea
+    articulos, periodos = demanda.shape
+    tipo = np.result_type(demanda, previsiones, parametros["disponibilidad_inicial"], parametros["stock_seguridad"])
+    # Previsiones, pedidos firmes y último plan se guardan en periodos absolutos con una ventana de
+    # relleno al final: cada ventana es una vista de estas matrices y no se copia nada entre ventanas
+    prevision = np.zeros((articulos, periodos + horizonte), dtype=tipo)
+    prevision[:, :periodos] = previsiones
+    posiciones = np.arange(horizonte)
+    # Los pedidos dentro del tiempo de suministro ya están lanzados: la zona congelada nunca es menor
+    zona = np.clip(np.maximum(congelados, parametros["tiempo_suministro"]), 1, horizonte)[:, None]
+    libres = (posiciones >= zona) & (posiciones < horizonte - 1)
+    filas = np.arange(articulos)
+
+    indicadores = np.zeros((len(metodos), len(INDICADORES_SIMULACION)))
+    for j, metodo in enumerate(metodos):
+        firmes = np.zeros_like(prevision)
+        plan_anterior = np.zeros_like(prevision)
+        existencias = parametros["disponibilidad_inicial"].astype(tipo)
+        for t in range(periodos):
+            ventana = slice(t, t + horizonte)
+            disponibilidades, necesidades_netas = calcular_neteo(
+                prevision[:, ventana], firmes[:, ventana], parametros["stock_seguridad"], existencias
+            )
+            if t > 0:
+                # Lo que falte dentro de la zona ya congelada no se puede pedir allí: se pasa al primer
+                # periodo que aún se puede cambiar (el que entra ahora en la zona congelada)
+                fijos = posiciones < zona - 1
+                atrasadas = np.where(fijos, necesidades_netas, 0).sum(axis=1)
+                necesidades_netas = np.where(fijos, 0, necesidades_netas)
+                necesidades_netas[filas, zona[:, 0] - 1] += atrasadas
+            with INSTRUMENTACION.etapa(f"lotificacion:{metodo}"):
+                plan = METODOS_BATCH[metodo](disponibilidades, necesidades_netas, parametros)
+            # En la primera ventana se congela la zona entera; después solo el periodo que entra en ella
+            nuevos = posiciones < zona if t == 0 else posiciones == zona - 1
+            firmes[:, ventana] += np.where(nuevos, plan, 0)
+            if t > 0:
+                indicadores[j, 4] += np.count_nonzero((plan != plan_anterior[:, ventana]) & libres)
+            plan_anterior[:, ventana] = plan
+
+            # Ejecución del periodo t con la demanda real; la que no se cubre se pierde
+            recibido = firmes[:, t]
+            servible = existencias + recibido
+            indicadores[j, 3] += np.maximum(demanda[:, t] - servible, 0).sum()
+            existencias = np.maximum(servible - demanda[:, t], 0)
+            indicadores[j, 1] += (parametros["costo_pedido"] * (recibido > 0)).sum()
+            indicadores[j, 2] += (parametros["costo_mantenimiento"] * existencias).sum()
+    indicadores[:, 0] = indicadores[:, 1] + indicadores[:, 2]
+    return indicadores
+
+
+def simular_horizonte_rodante(necesidades_brutas, params_table, metodos=tuple(METODOS_BATCH), horizonte=12,
+                              congelados=1, previsiones=None, procesos=None, articulos_por_bloque=None):
+    """
+    Simula el uso real de los métodos: en cada periodo se replanifica una ventana de `horizonte`
+    periodos y solo se ejecuta el primero.
+    - necesidades_brutas: demanda real, matriz artículos × periodos
+    - params_table: parámetros por artículo, como en plan_batch
+    - metodos: claves de METODOS_BATCH que se simulan
+    - horizonte: periodos de cada ventana de planificación
+    - congelados: periodos de la zona congelada; los pedidos planificados en ella pasan a firmes y
+      ya no se replanifican (nunca es menor que el tiempo de suministro de cada artículo)
+    - previsiones: demanda con la que se planifica, misma forma (por defecto la real)
+    - procesos, articulos_por_bloque: reparto de artículos en un pool, como en comparar_estrategias
+    Devuelve un DataFrame métodos × INDICADORES_SIMULACION sumados sobre todos los artículos: coste
+    realizado (pedidos recibidos y existencias al final de cada periodo), demanda no servida y
+    nerviosismo, que cuenta los periodos libres de la ventana cuyo pedido planificado cambia
+    respecto al plan del periodo anterior.
+    """
+    import pandas as pd
+
+    demanda = np.atleast_2d(np.asarray(necesidades_brutas))
+    previsiones = demanda if previsiones is None else np.atleast_2d(np.asarray(previsiones))
+    total = len(demanda)
+    parametros = _leer_parametros(params_table, total)
+    metodos = tuple(metodos)
+    for metodo in metodos:
+        if metodo not in METODOS_BATCH:
+            raise ValueError(f"Método desconocido: {metodo!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+
+    paralelo = procesos is not None and procesos > 1
+    if articulos_por_bloque is None:
+        articulos_por_bloque = -(-total // (procesos * 4)) if paralelo else total
+    articulos_por_bloque = max(1, articulos_por_bloque)
+    tareas = [
+        (
+            demanda[inicio:inicio + articulos_por_bloque],
+            previsiones[inicio:inicio + articulos_por_bloque],
+            {nombre: valor[inicio:inicio + articulos_por_bloque] for nombre, valor in parametros.items()},
+            metodos, horizonte, congelados,
+        )
+        for inicio in range(0, total, articulos_por_bloque)
+    ]
+
+    if paralelo and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            bloques = list(pool.map(_simular_bloque, tareas))
+    else:
+        bloques = [_simular_bloque(tarea) for tarea in tareas]
+
+    indicadores = np.sum(bloques, axis=0) if bloques else np.zeros((len(metodos), len(INDICADORES_SIMULACION)))
+    return pd.DataFrame(indicadores, index=list(metodos), columns=list(INDICADORES_SIMULACION))
@@ -0,0 +1,171 @@
+"""
+Planificación por lotes sin interfaz: lee un fichero de demanda y escribe planes y costes.
+
+Uso: python -m planificar DEMANDA [--metodo M ... | --todos] [--plan FICHERO] [--costes FICHERO]
+                          [--tiempo-suministro N] [--stock-seguridad N] [--disponibilidad-inicial N]
+                          [--costo-pedido X] [--costo-mantenimiento X] [--periodo-constante N]
+                          [--filas-por-bloque N] [--procesos N] [--en-vuelo N]
+
+DEMANDA tiene el formato de leer_demanda (articulo, tipo NB/RP y una columna por periodo) y las
+filas de cada artículo van seguidas. Se lee y se planifica por bloques, y cada bloque se escribe
+en cuanto está calculado, así que la memoria depende del bloque y no del fichero. Con --procesos
+los bloques se planifican en paralelo, con como mucho --en-vuelo bloques a la vez. Las salidas
+son CSV o Parquet según la extensión; sin --costes los costes se escriben en CSV por la salida
+estándar. Este camino no importa Streamlit.
+"""
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from mrp import (
+    METODOS_BATCH, PARAMETROS_POR_DEFECTO, en_segundo_plano, leer_demanda_por_bloques, planificar_en_flujo
+)
+
+# Series del plan que se escriben en --plan, una fila por artículo, método y serie
+SERIES_PLAN = (
+    "necesidades_brutas", "disponibilidades", "recepciones_programadas",
+    "necesidades_netas", "recepcion_pedidos", "lanzamiento_pedidos",
+)
+
+
+class EscritorTabla:
+    """
+    Escritura incremental de DataFrames con las mismas columnas en un CSV o un Parquet.
+    - ruta: fichero de salida; "-" es la salida estándar (solo CSV)
+    En Parquet cada llamada a escribir() añade un grupo de filas y las columnas numéricas se
+    guardan como float64 para que el esquema no cambie entre bloques.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.parquet = str(ruta).lower().endswith((".parquet", ".pq"))
+        self._escritor = None
+        self._cabecera = True
+
+    def escribir(self, tabla):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            numericas = tabla.select_dtypes("number").columns
+            tabla = tabla.astype(dict.fromkeys(numericas, np.float64))
+            lote = pa.Table.from_pandas(tabla, preserve_index=False)
+            if self._escritor is None:
+                self._escritor = pq.ParquetWriter(self.ruta, lote.schema)
+            self._escritor.write_table(lote)
+        else:
+            destino = sys.stdout if self.ruta == "-" else self.ruta
+            tabla.to_csv(destino, mode="w" if self._cabecera else "a", header=self._cabecera, index=False)
+            self._cabecera = False
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+        return False
+
+
+def _tabla_plan(articulos, metodo, plan, necesidades_brutas, recepciones_programadas, origen):
+    # Todas las series en la escala de los lanzamientos: columnas de los periodos 1 - origen a T
+    periodos = necesidades_brutas.shape[1]
+    series = {"necesidades_brutas": necesidades_brutas, "recepciones_programadas": recepciones_programadas, **plan}
+    valores = np.zeros(
+        (len(articulos), len(SERIES_PLAN), origen + periodos),
+        dtype=np.result_type(*(series[nombre] for nombre in SERIES_PLAN))
+    )
+    for j, nombre in enumerate(SERIES_PLAN):
+        valor = series[nombre]
+        valores[:, j, origen + periodos - valor.shape[1]:] = valor
+    tabla = pd.DataFrame(
+        valores.reshape(-1, origen + periodos),
+        columns=[str(periodo) for periodo in range(1 - origen, periodos + 1)],
+    )
+    tabla.insert(0, "serie", np.tile(SERIES_PLAN, len(articulos)))
+    tabla.insert(0, "metodo", metodo)
+    tabla.insert(0, "articulo", np.repeat(np.asarray(articulos, dtype=object), len(SERIES_PLAN)))
+    return tabla
+
+
+class _SinEscritor:
+    # Escritor que descarta lo que recibe, para cuando no se pide el fichero del plan
+    def escribir(self, tabla):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+
+def planificar_fichero(demanda, metodos, parametros, plan=None, costes="-", filas_por_bloque=10_000,
+                       procesos=None, en_vuelo=None):
+    """
+    Planifica todos los artículos de un fichero de demanda con cada método de metodos.
+    - demanda: ruta del fichero de demanda (CSV o Parquet)
+    - metodos: claves de METODOS_BATCH
+    - parametros: dict con valores escalares de PARAMETROS_POR_DEFECTO
+    - plan: ruta donde escribir las series del plan (None para no escribirlas)
+    - costes: ruta donde escribir los costes por artículo y método ("-" para la salida estándar)
+    - filas_por_bloque: filas del fichero que se leen y planifican de cada vez
+    - procesos, en_vuelo: como en planificar_en_flujo (None planifica en este proceso)
+    La lectura va en un hilo aparte hasta dos bloques por delante, la planificación en el pool y la
+    escritura aquí, en el orden del fichero; cada etapa espera a la siguiente si esta se retrasa.
+    Devuelve el número de artículos planificados.
+    """
+    origen = int(parametros.get("tiempo_suministro", PARAMETROS_POR_DEFECTO["tiempo_suministro"]))
+    claves = None if plan is not None else ("coste_total", "coste_posesion", "coste_pedido")
+    bloques = en_segundo_plano(leer_demanda_por_bloques(demanda, filas_por_bloque=filas_por_bloque))
+    total = 0
+    with EscritorTabla(costes) as escritor_costes, \
+            (EscritorTabla(plan) if plan is not None else _SinEscritor()) as escritor_plan:
+        for articulos, necesidades_brutas, recepciones_programadas, planes in planificar_en_flujo(
+            bloques, metodos, parametros, procesos=procesos, en_vuelo=en_vuelo, claves=claves
+        ):
+            for metodo, resultado in planes:
+                escritor_costes.escribir(pd.DataFrame({
+                    "articulo": articulos,
+                    "metodo": metodo,
+                    "coste_total": resultado["coste_total"],
+                    "coste_posesion": resultado["coste_posesion"],
+                    "coste_pedido": resultado["coste_pedido"],
+                }))
+                if plan is not None:
+                    escritor_plan.escribir(_tabla_plan(
+                        articulos, metodo, resultado, necesidades_brutas, recepciones_programadas, origen
+                    ))
+            total += len(articulos)
+    return total
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog="python -m planificar", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("demanda", help="fichero de demanda CSV o Parquet")
+    seleccion = parser.add_mutually_exclusive_group()
+    seleccion.add_argument("--metodo", action="append", choices=list(METODOS_BATCH), help="se puede repetir")
+    seleccion.add_argument("--todos", action="store_true", help="todos los métodos (por defecto)")
+    parser.add_argument("--plan", metavar="FICHERO", help="series del plan por artículo y método")
+    parser.add_argument("--costes", metavar="FICHERO", default="-", help="costes por artículo y método (por defecto, la salida estándar)")
+    for nombre, defecto in PARAMETROS_POR_DEFECTO.items():
+        parser.add_argument("--" + nombre.replace("_", "-"), type=float if nombre.startswith("costo") else int, default=defecto)
+    parser.add_argument("--filas-por-bloque", type=int, default=10_000)
+    parser.add_argument("--procesos", type=int, help="procesos que planifican en paralelo (por defecto, ninguno)")
+    parser.add_argument("--en-vuelo", type=int, help="bloques planificándose a la vez (por defecto, 2 por proceso)")
+    args = parser.parse_args(argumentos)
+
+    metodos = args.metodo or list(METODOS_BATCH)
+    parametros = {nombre: getattr(args, nombre) for nombre in PARAMETROS_POR_DEFECTO}
+    total = planificar_fichero(
+        args.demanda, metodos, parametros, args.plan, args.costes, args.filas_por_bloque, args.procesos, args.en_vuelo
+    )
+    print(f"{total} artículos planificados con {len(metodos)} métodos", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
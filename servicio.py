@@ -0,0 +1,435 @@
+"""
+Servicio HTTP de planificación sobre asyncio, para llamar al motor desde otras aplicaciones.
+
+Uso: python -m servicio [--host H] [--puerto P] [--procesos N] [--ventana-ms X] [--max-articulos N]
+
+POST /plan recibe un plan_batch por petición, en JSON (application/json) o en un stream IPC de
+Arrow (application/vnd.apache.arrow.stream), y responde en el mismo formato:
+- JSON: {"metodo": M, "necesidades_brutas": [[...], ...], "recepciones_programadas": [[...], ...],
+  "parametros": {nombre: escalar o lista por artículo}}; un solo artículo puede ir como vector
+- Arrow: una fila por artículo con la columna necesidades_brutas (lista de periodos), opcionalmente
+  recepciones_programadas y columnas por artículo con los nombres de PARAMETROS_POR_DEFECTO; el
+  método va en la consulta (/plan?metodo=...)
+La respuesta lleva las matrices de plan_batch, los costes por artículo y origen_lanzamientos (en
+Arrow, una fila por artículo y origen_lanzamientos en los metadatos del esquema). GET /salud
+responde {"estado": "ok"} con los lotes calculados y las peticiones que han entrado en ellos.
+
+Las peticiones que llegan a la vez se juntan en una sola llamada a plan_batch por método y el
+cálculo se hace en un pool de procesos, de modo que el bucle de eventos solo lee, agrupa y
+responde. Este camino no importa Streamlit.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from mrp import METODOS_BATCH, PARAMETROS_POR_DEFECTO, plan_batch
+from mrp.batch import _leer_parametros
+
+logger = logging.getLogger(__name__)
+
+TIPO_JSON = "application/json"
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+
+# Matrices y vectores por artículo de la respuesta, en este orden
+SERIES_RESPUESTA = ("disponibilidades", "necesidades_netas", "recepcion_pedidos", "lanzamiento_pedidos")
+COSTES_RESPUESTA = ("coste_total", "coste_posesion", "coste_pedido")
+
+
+# AGRUPACIÓN DE PETICIONES
+class PeticionPlan:
+    """
+    Una petición de plan ya validada, a la espera de su lote.
+    - necesidades_brutas, recepciones_programadas: matrices artículos × periodos
+    - parametros: vectores por artículo, como los devuelve _leer_parametros
+    - metodo: clave de METODOS_BATCH
+    Los valores se validan aquí (ValueError, que el servicio responde con 400) para que una
+    petición mal formada no llegue a un lote y haga fallar a las que se calculan con ella.
+    """
+    __slots__ = ("necesidades_brutas", "recepciones_programadas", "parametros", "metodo", "clave", "futuro")
+
+    def __init__(self, necesidades_brutas, recepciones_programadas, parametros, metodo):
+        if metodo not in METODOS_BATCH:
+            raise ValueError(f"Método desconocido: {metodo!r}. Disponibles: {', '.join(METODOS_BATCH)}")
+        necesidades_brutas = _matriz_numerica(necesidades_brutas, "necesidades_brutas")
+        if recepciones_programadas is None:
+            recepciones_programadas = np.zeros_like(necesidades_brutas)
+        recepciones_programadas = _matriz_numerica(recepciones_programadas, "recepciones_programadas")
+        if recepciones_programadas.shape != necesidades_brutas.shape:
+            raise ValueError("recepciones_programadas debe tener la forma de necesidades_brutas")
+        desconocidos = set(parametros) - set(PARAMETROS_POR_DEFECTO)
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}")
+        self.necesidades_brutas = necesidades_brutas
+        self.recepciones_programadas = recepciones_programadas
+        self.parametros = _validar_parametros(_leer_parametros(parametros, len(necesidades_brutas)))
+        self.metodo = metodo
+        # Solo se juntan peticiones cuyo plan por separado tendría el mismo tipo: el lote no cambia los números
+        self.clave = (metodo, necesidades_brutas.shape[1], np.result_type(
+            necesidades_brutas, recepciones_programadas,
+            self.parametros["stock_seguridad"], self.parametros["disponibilidad_inicial"],
+        ))
+        self.futuro = None
+
+
+# Parámetros que tienen que ser enteros, con su mínimo
+_MINIMOS_ENTEROS = {"tiempo_suministro": 0, "periodo_constante": 1}
+
+
+def _matriz_numerica(valor, nombre):
+    matriz = np.atleast_2d(np.asarray(valor))
+    if matriz.ndim != 2 or not np.issubdtype(matriz.dtype, np.number) or not matriz.size:
+        raise ValueError(f"{nombre} debe ser un vector o una matriz numérica no vacía artículos × periodos")
+    if not np.isfinite(matriz).all():
+        raise ValueError(f"{nombre} no admite valores infinitos ni NaN")
+    return matriz
+
+
+def _validar_parametros(parametros):
+    # Todos numéricos y finitos; tiempo_suministro y periodo_constante, enteros desde su mínimo
+    for nombre, valor in parametros.items():
+        if not np.issubdtype(valor.dtype, np.number) or not np.isfinite(valor).all():
+            raise ValueError(f"{nombre} debe ser numérico y finito")
+        if nombre in _MINIMOS_ENTEROS:
+            minimo = _MINIMOS_ENTEROS[nombre]
+            if (valor != np.round(valor)).any() or (valor < minimo).any():
+                raise ValueError(f"{nombre} debe ser un entero mayor o igual que {minimo}")
+            parametros[nombre] = valor.astype(np.int64)
+    return parametros
+
+
+class AgrupadorPlanes:
+    """
+    Junta en una sola llamada a plan_batch las peticiones que llegan a la vez.
+    - ejecutor: concurrent.futures.Executor donde se calcula (normalmente un ProcessPoolExecutor)
+    - ventana: segundos que se esperan más peticiones desde la primera de un lote
+    - max_articulos: artículos de un lote a partir de los cuales se cierra sin esperar más
+    - en_vuelo: lotes calculándose a la vez como máximo (por defecto, ilimitado)
+    Un lote se reparte por (método, periodos, tipo): cada grupo apila sus matrices y sus parámetros
+    por artículo, se planifica en el ejecutor y cada petición recibe sus filas. Los lanzamientos se
+    recortan al origen de la petición, así que el resultado es el de plan_batch por separado. Si
+    el lote falla, sus peticiones se repiten una a una y el error solo llega a la que lo provoca.
+    lotes y peticiones cuentan lo calculado, para ver cuánto se agrupa.
+    """
+
+    def __init__(self, ejecutor, ventana=0.002, max_articulos=50_000, en_vuelo=None):
+        self.ejecutor = ejecutor
+        self.ventana = ventana
+        self.max_articulos = max_articulos
+        self.lotes = 0
+        self.peticiones = 0
+        self._cola = asyncio.Queue()
+        self._huecos = asyncio.Semaphore(en_vuelo) if en_vuelo else None
+        self._pendientes = set()
+        self._recolector = None
+
+    async def planificar(self, peticion):
+        # Espera al lote de la petición y devuelve su parte del plan
+        if self._recolector is None:
+            self._recolector = asyncio.create_task(self._recoger())
+        peticion.futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put(peticion)
+        return await peticion.futuro
+
+    async def cerrar(self):
+        if self._recolector is not None:
+            self._recolector.cancel()
+        for tarea in list(self._pendientes):
+            await tarea
+
+    async def _recoger(self):
+        bucle = asyncio.get_running_loop()
+        while True:
+            lote = [await self._cola.get()]
+            articulos = len(lote[0].necesidades_brutas)
+            limite = bucle.time() + self.ventana
+            while articulos < self.max_articulos:
+                try:
+                    peticion = self._cola.get_nowait()
+                except asyncio.QueueEmpty:
+                    restante = limite - bucle.time()
+                    if restante <= 0:
+                        break
+                    try:
+                        peticion = await asyncio.wait_for(self._cola.get(), restante)
+                    except asyncio.TimeoutError:
+                        break
+                lote.append(peticion)
+                articulos += len(peticion.necesidades_brutas)
+
+            grupos = {}
+            for peticion in lote:
+                grupos.setdefault(peticion.clave, []).append(peticion)
+            for grupo in grupos.values():
+                if self._huecos is not None:
+                    await self._huecos.acquire()
+                tarea = asyncio.create_task(self._calcular(grupo))
+                self._pendientes.add(tarea)
+                tarea.add_done_callback(self._pendientes.discard)
+
+    async def _calcular(self, grupo):
+        try:
+            await self._resolver(grupo)
+        finally:
+            if self._huecos is not None:
+                self._huecos.release()
+
+    async def _resolver(self, grupo):
+        try:
+            necesidades_brutas = np.concatenate([peticion.necesidades_brutas for peticion in grupo])
+            recepciones_programadas = np.concatenate([peticion.recepciones_programadas for peticion in grupo])
+            parametros = {
+                nombre: np.concatenate([peticion.parametros[nombre] for peticion in grupo])
+                for nombre in PARAMETROS_POR_DEFECTO
+            }
+            plan = await asyncio.get_running_loop().run_in_executor(
+                self.ejecutor, plan_batch, necesidades_brutas, recepciones_programadas, parametros, grupo[0].metodo
+            )
+        except Exception as error:
+            if len(grupo) > 1:
+                # Se repite cada petición por separado: el error solo llega a la que lo provoca
+                await asyncio.gather(*(self._resolver([peticion]) for peticion in grupo))
+            elif not grupo[0].futuro.done():
+                grupo[0].futuro.set_exception(error)
+            return
+        self.lotes += 1
+        self.peticiones += len(grupo)
+
+        origen = plan["origen_lanzamientos"]
+        inicio = 0
+        for peticion in grupo:
+            fin = inicio + len(peticion.necesidades_brutas)
+            propio = int(peticion.parametros["tiempo_suministro"].max(initial=0))
+            resultado = {clave: plan[clave][inicio:fin] for clave in SERIES_RESPUESTA + COSTES_RESPUESTA}
+            resultado["lanzamiento_pedidos"] = resultado["lanzamiento_pedidos"][:, origen - propio:]
+            resultado["origen_lanzamientos"] = propio
+            if not peticion.futuro.done():
+                peticion.futuro.set_result(resultado)
+            inicio = fin
+
+
+# FORMATOS
+def leer_json(cuerpo, consulta):
+    datos = json.loads(cuerpo)
+    if not isinstance(datos, dict) or "necesidades_brutas" not in datos:
+        raise ValueError("El cuerpo debe ser un objeto JSON con necesidades_brutas")
+    return PeticionPlan(
+        datos["necesidades_brutas"], datos.get("recepciones_programadas"),
+        datos.get("parametros") or {}, datos.get("metodo", consulta.get("metodo")),
+    )
+
+
+def escribir_json(metodo, resultado):
+    respuesta = {"metodo": metodo, "origen_lanzamientos": resultado["origen_lanzamientos"]}
+    respuesta.update((clave, resultado[clave].tolist()) for clave in SERIES_RESPUESTA + COSTES_RESPUESTA)
+    return json.dumps(respuesta).encode()
+
+
+def _matriz_arrow(columna):
+    # Columna de listas de la misma longitud -> matriz artículos × periodos
+    import pyarrow as pa
+
+    columna = columna.combine_chunks()
+    if columna.null_count:
+        raise ValueError("Las columnas de periodos no admiten nulos")
+    valores = columna.flatten().to_numpy(zero_copy_only=False)
+    if pa.types.is_fixed_size_list(columna.type):
+        return valores.reshape(len(columna), columna.type.list_size)
+    longitudes = columna.value_lengths().to_numpy(zero_copy_only=False)
+    if (longitudes != longitudes[0]).any():
+        raise ValueError("Todas las filas deben tener el mismo número de periodos")
+    return valores.reshape(len(columna), longitudes[0])
+
+
+def leer_arrow(cuerpo, consulta):
+    import pyarrow as pa
+
+    tabla = pa.ipc.open_stream(cuerpo).read_all()
+    if "necesidades_brutas" not in tabla.column_names or not tabla.num_rows:
+        raise ValueError("La tabla Arrow debe tener filas y la columna necesidades_brutas")
+    recepciones_programadas = (
+        _matriz_arrow(tabla["recepciones_programadas"]) if "recepciones_programadas" in tabla.column_names else None
+    )
+    parametros = {
+        nombre: tabla[nombre].to_numpy() for nombre in PARAMETROS_POR_DEFECTO if nombre in tabla.column_names
+    }
+    return PeticionPlan(_matriz_arrow(tabla["necesidades_brutas"]), recepciones_programadas, parametros, consulta.get("metodo"))
+
+
+def escribir_arrow(metodo, resultado):
+    import pyarrow as pa
+
+    columnas = {
+        clave: pa.FixedSizeListArray.from_arrays(
+            pa.array(np.ascontiguousarray(resultado[clave]).ravel()), resultado[clave].shape[1]
+        )
+        for clave in SERIES_RESPUESTA
+    }
+    columnas.update((clave, pa.array(resultado[clave])) for clave in COSTES_RESPUESTA)
+    tabla = pa.table(columnas).replace_schema_metadata({
+        "metodo": metodo, "origen_lanzamientos": str(resultado["origen_lanzamientos"]),
+    })
+    destino = pa.BufferOutputStream()
+    with pa.ipc.new_stream(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return destino.getvalue().to_pybytes()
+
+
+FORMATOS = {TIPO_JSON: (leer_json, escribir_json), TIPO_ARROW: (leer_arrow, escribir_arrow)}
+
+
+# HTTP
+async def _leer_peticion(lector):
+    # Devuelve (método, ruta, cabeceras, cuerpo) o None si el cliente cerró la conexión; una
+    # petición mal formada lanza ValueError
+    try:
+        cabecera = await lector.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("Cabeceras demasiado largas")
+    linea, *resto = cabecera.decode("latin-1").split("\r\n")
+    partes = linea.split(" ")
+    if len(partes) != 3 or not partes[2].startswith("HTTP/"):
+        raise ValueError(f"Línea de petición no válida: {linea!r}")
+    cabeceras = {}
+    for campo in resto:
+        if ":" in campo:
+            nombre, valor = campo.split(":", 1)
+            cabeceras[nombre.strip().lower()] = valor.strip()
+    longitud = int(cabeceras.get("content-length", 0))
+    if longitud < 0:
+        raise ValueError("Content-Length negativo")
+    try:
+        cuerpo = await lector.readexactly(longitud)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return partes[0], partes[1], cabeceras, cuerpo
+
+
+def _respuesta(estado, cuerpo, tipo=TIPO_JSON, mantener=True):
+    estado = HTTPStatus(estado)
+    return (
+        f"HTTP/1.1 {estado.value} {estado.phrase}\r\nContent-Type: {tipo}\r\nContent-Length: {len(cuerpo)}\r\n"
+        f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n"
+    ).encode("latin-1") + cuerpo
+
+
+def _error(estado, mensaje, mantener=True):
+    return _respuesta(estado, json.dumps({"error": mensaje}).encode(), mantener=mantener)
+
+
+class ServicioPlanificacion:
+    """
+    Servidor HTTP/1.1 con conexiones persistentes sobre asyncio.start_server.
+    - agrupador: AgrupadorPlanes que calcula los planes
+    Cada conexión atiende sus peticiones en orden; la concurrencia viene de las conexiones, y las
+    de todas ellas se juntan en el agrupador.
+    """
+
+    def __init__(self, agrupador):
+        self.agrupador = agrupador
+
+    async def atender(self, lector, escritor):
+        try:
+            while True:
+                try:
+                    peticion = await _leer_peticion(lector)
+                except ValueError as error:
+                    escritor.write(_error(HTTPStatus.BAD_REQUEST, str(error), mantener=False))
+                    await escritor.drain()
+                    break
+                if peticion is None:
+                    break
+                verbo, ruta, cabeceras, cuerpo = peticion
+                mantener = cabeceras.get("connection", "keep-alive").lower() != "close"
+                escritor.write(await self._responder(verbo, ruta, cabeceras, cuerpo, mantener))
+                await escritor.drain()
+                if not mantener:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def _responder(self, verbo, ruta, cabeceras, cuerpo, mantener):
+        partes = urlsplit(ruta)
+        consulta = {nombre: valores[-1] for nombre, valores in parse_qs(partes.query).items()}
+        if partes.path == "/salud":
+            estado = {"estado": "ok", "lotes": self.agrupador.lotes, "peticiones": self.agrupador.peticiones}
+            return _respuesta(HTTPStatus.OK, json.dumps(estado).encode(), mantener=mantener)
+        if partes.path != "/plan":
+            return _error(HTTPStatus.NOT_FOUND, f"Ruta desconocida: {partes.path}", mantener)
+        if verbo != "POST":
+            return _error(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST en /plan", mantener)
+        tipo = cabeceras.get("content-type", TIPO_JSON).split(";")[0].strip().lower()
+        if tipo not in FORMATOS:
+            return _error(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"Formatos admitidos: {', '.join(FORMATOS)}", mantener)
+        leer, escribir = FORMATOS[tipo]
+        try:
+            peticion = leer(cuerpo, consulta)
+        except (ValueError, TypeError, KeyError) as error:
+            return _error(HTTPStatus.BAD_REQUEST, str(error), mantener)
+        try:
+            resultado = await self.agrupador.planificar(peticion)
+        except ValueError as error:
+            return _error(HTTPStatus.BAD_REQUEST, str(error), mantener)
+        except Exception:
+            # El detalle (con la traza) se queda en el registro del servidor; el cliente solo sabe que ha fallado
+            logger.exception("Error al calcular un plan")
+            return _error(HTTPStatus.INTERNAL_SERVER_ERROR, "Error interno al calcular el plan", mantener)
+        return _respuesta(HTTPStatus.OK, escribir(peticion.metodo, resultado), tipo, mantener)
+
+
+async def servir(host="127.0.0.1", puerto=8000, procesos=None, ventana=0.002, max_articulos=50_000, listo=None):
+    """
+    Arranca el servicio y atiende hasta que se cancela o recibe SIGTERM; al salir se cierra el
+    pool, sin dejar procesos de cálculo huérfanos.
+    - procesos: tamaño del pool de cálculo (por defecto, los núcleos de la máquina)
+    - ventana, max_articulos: como en AgrupadorPlanes
+    - listo: asyncio.Future opcional que recibe (host, puerto) cuando ya se aceptan conexiones
+      (útil con puerto=0, que elige un puerto libre)
+    """
+    procesos = procesos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        agrupador = AgrupadorPlanes(pool, ventana, max_articulos, en_vuelo=2 * procesos)
+        servidor = await asyncio.start_server(ServicioPlanificacion(agrupador).atender, host, puerto)
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass  # Windows: solo Ctrl+C
+        try:
+            if listo is not None:
+                listo.set_result(servidor.sockets[0].getsockname()[:2])
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            await agrupador.cerrar()
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog="python -m servicio", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--procesos", type=int, help="procesos de cálculo (por defecto, los núcleos)")
+    parser.add_argument("--ventana-ms", type=float, default=2.0, help="espera para juntar peticiones en un lote")
+    parser.add_argument("--max-articulos", type=int, default=50_000, help="artículos por lote como máximo")
+    args = parser.parse_args(argumentos)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    print(f"Sirviendo en http://{args.host}:{args.puerto}", file=sys.stderr)
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.procesos, args.ventana_ms / 1000, args.max_articulos))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,719 @@
+import importlib.util
+import json
+import random
+import threading
+from types import SimpleNamespace
 
+import numpy as np
+import pandas as pd
+import pytest
+
+from mrp import (
+    INSTRUMENTACION,
+    CacheLRU,
+    Instrumentacion,
+    PlanIncremental,
+    barrer_parametros,
+    calcular_coste_total,
+    calcular_dixon_silver,
+    calcular_eoq,
+    calcular_lote_a_lote,
+    calcular_minimo_coste_total,
+    calcular_minimo_coste_unitario,
+    calcular_neteo,
+    calcular_periodo_constante,
+    calcular_poq,
+    calcular_silver_meal,
+    calcular_wagner_whitin,
+    clave_planificacion,
+    comparar_estrategias,
+    en_segundo_plano,
+    evaluar_costes,
+    evaluar_incertidumbre,
+    explosionar_bom,
+    leer_demanda,
+    leer_demanda_por_bloques,
+    plan_batch,
+    plan_capacitado,
+    planificar_en_flujo,
+    planificar_mapeado,
+    simular_horizonte_rodante,
+)
+from mrp.batch import ESTRATEGIAS_COMPARACION
+from mrp.lotificacion import _wagner_whitin, _wagner_whitin_naive
+
+
+def _necesidades_aleatorias(rng, periodos):
+    return [rng.choice([0, 0, 100, rng.randint(1, 400)]) for _ in range(periodos)]
+
+
+def _neteo_referencia(necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial):
+    # La recursión periodo a periodo que resuelve calcular_neteo con sumas acumuladas
+    disponibilidades, necesidades_netas = [], []
+    for t, (nb, rp) in enumerate(zip(necesidades_brutas, recepciones_programadas)):
+        if t == 0:
+            disponible = max(disponibilidad_inicial, stock_seguridad)
+        else:
+            disponible = max(stock_seguridad, disponible + recepciones_programadas[t - 1] - necesidades_brutas[t - 1])
+        disponibilidades.append(disponible)
+        necesidades_netas.append(max(0, nb - disponible - rp + stock_seguridad))
+    return disponibilidades, necesidades_netas
+
+
+def test_neteo_coincide_con_la_recursion():
+    rng = np.random.default_rng(5)
+    for periodos in (1, 2, 7, 30):
+        necesidades_brutas = rng.integers(0, 300, (20, periodos)) * (rng.random((20, periodos)) < 0.6)
+        recepciones_programadas = rng.integers(0, 200, (20, periodos)) * (rng.random((20, periodos)) < 0.2)
+        stock_seguridad = rng.integers(0, 80, 20)
+        disponibilidad_inicial = rng.integers(0, 400, 20)
+        disponibilidades, necesidades_netas = calcular_neteo(
+            necesidades_brutas, recepciones_programadas, stock_seguridad, disponibilidad_inicial
+        )
+        for i in range(20):
+            referencia = _neteo_referencia(
+                necesidades_brutas[i].tolist(), recepciones_programadas[i].tolist(),
+                int(stock_seguridad[i]), int(disponibilidad_inicial[i])
+            )
+            assert (disponibilidades[i].tolist(), necesidades_netas[i].tolist()) == referencia
+            # Un método completo con tiempo de suministro igual o mayor que el horizonte
+            tiempo_suministro = periodos + int(rng.integers(0, 3))
+            resultado = calcular_lote_a_lote(
+                necesidades_brutas[i], recepciones_programadas[i], tiempo_suministro,
+                stock_seguridad[i], disponibilidad_inicial[i]
+            )
+            assert (resultado[0].tolist(), resultado[1].tolist()) == referencia
+            # Todos los lanzamientos quedan atrasados: el de la recepción en p va al periodo p - L
+            assert resultado[3].tolist() == referencia[1] + [0] * tiempo_suministro
+
+
+@pytest.mark.parametrize("semilla", range(25))
+def test_wagner_whitin_coincide_con_referencia(semilla):
+    rng = random.Random(semilla)
+    for _ in range(40):
+        necesidades_netas = _necesidades_aleatorias(rng, rng.randint(0, 30))
+        costo_pedido = rng.choice([0, 100, 500, 1000])
+        costo_mantenimiento = rng.choice([0, 0.5, 1.0, 1.7])
+        rapido = _wagner_whitin(necesidades_netas, costo_pedido, costo_mantenimiento)
+        referencia = _wagner_whitin_naive(necesidades_netas, costo_pedido, costo_mantenimiento)
+        assert sum(rapido) == sum(necesidades_netas)
+        assert calcular_coste_total(rapido, necesidades_netas, costo_pedido, costo_mantenimiento)[0] == pytest.approx(
+            calcular_coste_total(referencia, necesidades_netas, costo_pedido, costo_mantenimiento)[0]
+        )
+
+
+def test_wagner_whitin_no_empeora_las_heuristicas():
+    rng = random.Random(0)
+    for _ in range(200):
+        periodos = rng.randint(1, 20)
+        necesidades_brutas = _necesidades_aleatorias(rng, periodos)
+        recepciones_programadas = [rng.choice([0, 0, 0, 50]) for _ in range(periodos)]
+        args = (necesidades_brutas, recepciones_programadas, 1, 0, rng.choice([0, 150]), 1000, 1.0)
+        _, necesidades_netas, optimo, _, _ = calcular_wagner_whitin(*args)
+        coste_optimo = calcular_coste_total(optimo, necesidades_netas, 1000, 1.0)[0]
+        for heuristica in (calcular_minimo_coste_unitario, calcular_minimo_coste_total, calcular_silver_meal):
+            plan = heuristica(*args)["recepcion_pedidos"]
+            assert coste_optimo <= calcular_coste_total(plan, necesidades_netas, 1000, 1.0)[0] + 1e-9
+
+
+def test_eoq_y_poq_cubren_las_necesidades_netas():
+    necesidades_brutas = np.array([0, 80, 50, 0, 300, 20, 0, 80])
+    recepciones_programadas = np.zeros(8, dtype=int)
+    # D = 530, EOQ = ⌈√(2·530·500 / 8)⌉ = 258 y POQ = round(258 / (530/8)) = 4 periodos
+    _, _, eoq, _, _ = calcular_eoq(necesidades_brutas, recepciones_programadas, 1, 0, 0, 500, 1.0)
+    assert eoq.tolist() == [0, 258, 0, 0, 258, 0, 0, 258]
+    _, _, poq, _, _ = calcular_poq(necesidades_brutas, recepciones_programadas, 1, 0, 0, 500, 1.0)
+    assert poq.tolist() == [0, 430, 0, 0, 0, 100, 0, 0]
+    # Si una necesidad supera la EOQ se piden tantas EOQ como hagan falta
+    _, necesidades_netas, eoq, _, _ = calcular_eoq(necesidades_brutas, recepciones_programadas, 1, 0, 0, 20, 1.0)
+    assert (np.cumsum(eoq) >= np.cumsum(necesidades_netas)).all()
+    # En matriz, cada artículo con su coste de pedido da lo mismo que la versión de un artículo
+    for metodo, calcular in (("EOQ", calcular_eoq), ("POQ", calcular_poq)):
+        plan = plan_batch(np.tile(necesidades_brutas, (2, 1)), None, {"costo_pedido": [500, 20]}, metodo)
+        for fila, costo_pedido in enumerate((500, 20)):
+            esperado = calcular(necesidades_brutas, recepciones_programadas, 1, 0, 0, costo_pedido, 1.0)[2]
+            assert np.array_equal(plan["recepcion_pedidos"][fila], esperado)
+
+
+@pytest.mark.parametrize("calcular", [calcular_minimo_coste_unitario, calcular_minimo_coste_total, calcular_silver_meal])
+def test_traza_regenerada_coincide_con_la_registrada(calcular):
+    rng = random.Random(7)
+    for _ in range(20):
+        periodos = rng.randint(1, 15)
+        necesidades_brutas = _necesidades_aleatorias(rng, periodos)
+        argumentos = (necesidades_brutas, [0] * periodos, rng.randint(0, 3), 10, 0, rng.choice([300, 1000]), rng.choice([0.5, 1.0]))
+        completo = calcular(*argumentos)
+        rapido = calcular(*argumentos, traza=False)
+        assert rapido._traza is None
+        assert np.array_equal(rapido.traza, completo.traza)
+        assert rapido.to_dataframe().equals(completo.to_dataframe())
+        # Acceso con las claves del antiguo dict de resultados
+        for clave in ("disponibilidades", "necesidades_netas", "recepcion_pedidos", "lanzamiento_pedidos", "disponible_adicional"):
+            assert np.array_equal(rapido[clave], getattr(completo, clave))
+        for j, (clave, _) in enumerate(completo.columnas):
+            assert np.array_equal(rapido[clave], completo.traza[:, j])
+        with pytest.raises(KeyError):
+            rapido["_traza"]
+
+
+def test_costes_de_planes_apilados_coinciden_con_el_bucle_por_plan():
+    rng = np.random.default_rng(8)
+    planes = rng.integers(0, 300, (9, 7)) * (rng.random((9, 7)) < 0.5)
+    necesidades_netas = rng.integers(0, 150, 7)
+    por_plan = rng.choice([300.0, 1000.0], (9, 1)), rng.choice([0.5, 1.0, 2.0], (9, 1))
+    por_periodo = rng.choice([300.0, 1000.0], 7), rng.random(7)
+    # Escalares, un valor por plan (planes, 1), un vector por periodo y una matriz planes × periodos
+    formas = [(1000, 1.0), por_plan, por_periodo, (rng.random((9, 7)) * 1000, rng.random((9, 7)))]
+    for costo_pedido, costo_mantenimiento in formas:
+        resultado = evaluar_costes(planes, necesidades_netas, costo_pedido, costo_mantenimiento)
+        for i, plan in enumerate(planes):
+            fila = [np.broadcast_to(coste, (9, 7))[i] for coste in (costo_pedido, costo_mantenimiento)]
+            esperado = calcular_coste_total(plan, necesidades_netas, *fila)
+            assert [serie[i] for serie in resultado] == pytest.approx(esperado)
+    # Necesidades por plan y un eje más delante de los planes
+    necesidades_por_plan = rng.integers(0, 150, (9, 7))
+    apilado = evaluar_costes(np.stack([planes, planes]), necesidades_por_plan, *por_plan)
+    for i, plan in enumerate(planes):
+        esperado = calcular_coste_total(plan, necesidades_por_plan[i], por_plan[0][i, 0], por_plan[1][i, 0])
+        assert apilado[0][1, i] == pytest.approx(esperado[0])
+
+
+def test_costes_por_periodo_y_capacidad_limitada():
+    rng = random.Random(0)
+    for _ in range(100):
+        periodos = rng.randint(1, 20)
+        necesidades_netas = _necesidades_aleatorias(rng, periodos)
+        costo_pedido = [rng.choice([100, 500, 1000]) for _ in range(periodos)]
+        costo_mantenimiento = [rng.choice([0, 0.5, 1.0, 3.0]) for _ in range(periodos)]
+        rapido = _wagner_whitin(necesidades_netas, costo_pedido, costo_mantenimiento)
+        referencia = _wagner_whitin_naive(necesidades_netas, costo_pedido, costo_mantenimiento)
+        assert calcular_coste_total(rapido, necesidades_netas, costo_pedido, costo_mantenimiento)[0] == pytest.approx(
+            calcular_coste_total(referencia, necesidades_netas, costo_pedido, costo_mantenimiento)[0]
+        )
+
+    # La capacidad obliga a adelantar parte de los 300 del periodo 5
+    necesidades_brutas = np.array([0, 80, 50, 0, 300, 20, 0, 80])
+    _, necesidades_netas, plan, _, _ = calcular_dixon_silver(
+        necesidades_brutas, np.zeros(8, dtype=int), 1, 0, 0, 500, 1.0, capacidad=200
+    )
+    assert (plan <= 200).all()
+    assert (np.cumsum(plan) >= np.cumsum(necesidades_netas)).all() and plan.sum() == necesidades_netas.sum()
+    # Varios artículos comparten la capacidad; con capacidad de sobra es Silver Meal
+    matriz = np.array([[0, 80, 50, 0, 300, 20, 0, 80], [40, 0, 60, 60, 0, 90, 10, 0]])
+    capacitado = plan_capacitado(matriz, None, {"costo_pedido": 500}, 260, consumo=[1, 2])
+    assert (capacitado["carga"] <= 260).all()
+    assert (np.cumsum(capacitado["recepcion_pedidos"], axis=1) >= np.cumsum(matriz, axis=1)).all()
+    holgado = plan_capacitado(matriz, None, {"costo_pedido": 500}, 10_000)
+    assert np.array_equal(holgado["recepcion_pedidos"], plan_batch(matriz, None, {"costo_pedido": 500}, "Silver Meal")["recepcion_pedidos"])
+    with pytest.raises(ValueError, match="Capacidad insuficiente"):
+        plan_capacitado(matriz, None, None, 50)
+
+
+def _coste_minimo_por_enumeracion(necesidades_netas, costo_pedido, costo_mantenimiento):
+    # Todas las combinaciones de periodos de pedido; cada pedido cubre hasta el siguiente
+    periodos = len(necesidades_netas)
+    mejor = None
+    for mascara in range(1 << periodos):
+        pedidos = [t for t in range(periodos) if mascara >> t & 1]
+        if sum(necesidades_netas) and (not pedidos or sum(necesidades_netas[:pedidos[0]])):
+            continue
+        plan = [0] * periodos
+        for inicio, fin in zip(pedidos, pedidos[1:] + [periodos]):
+            plan[inicio] = sum(necesidades_netas[inicio:fin])
+        coste = calcular_coste_total(plan, necesidades_netas, costo_pedido, costo_mantenimiento)[0]
+        mejor = coste if mejor is None else min(mejor, coste)
+    return mejor
+
+
+def test_wagner_whitin_pide_en_periodos_sin_necesidad_si_emitir_es_mas_barato():
+    # Emitir en el periodo 0, sin necesidad, cuesta 1 y en el 1 cuesta 1000
+    assert _wagner_whitin([0, 5], [1, 1000], [0.0, 0.0]) == [5, 0]
+    assert _wagner_whitin_naive([0, 5], [1, 1000], [0.0, 0.0]) == [5, 0]
+    rng = random.Random(1)
+    for _ in range(150):
+        periodos = rng.randint(1, 9)
+        necesidades_netas = _necesidades_aleatorias(rng, periodos)
+        costo_pedido = [rng.choice([1, 50, 500, 1000]) for _ in range(periodos)]
+        costo_mantenimiento = [rng.choice([0, 0.1, 1.0, 3.0]) for _ in range(periodos)]
+        optimo = _coste_minimo_por_enumeracion(necesidades_netas, costo_pedido, costo_mantenimiento)
+        for calcular in (_wagner_whitin, _wagner_whitin_naive):
+            plan = calcular(necesidades_netas, costo_pedido, costo_mantenimiento)
+            assert sum(plan) == sum(necesidades_netas)
+            assert calcular_coste_total(plan, necesidades_netas, costo_pedido, costo_mantenimiento)[0] == pytest.approx(optimo)
+
+
+def test_incertidumbre_reproducible_entre_procesos():
+    necesidades_brutas = np.array([[0, 80, 50, 0, 300, 20, 0, 80], [40, 40, 40, 40, 40, 40, 40, 40]])
+    parametros = {"costo_pedido": 500, "disponibilidad_inicial": 50}
+    argumentos = dict(metodos=["Lote a Lote", "Silver Meal"], escenarios=300, semilla=7, escenarios_por_bloque=100)
+    serie = evaluar_incertidumbre(necesidades_brutas, None, parametros, **argumentos)
+    paralelo = evaluar_incertidumbre(necesidades_brutas, None, parametros, procesos=2, **argumentos)
+    assert serie.equals(paralelo)
+    assert serie.groupby(["articulo", "metodo"])["recomendado"].sum().eq(1).all()
+    # Cada artículo tiene su propia rejilla de stocks, a la escala de su error de previsión
+    rejillas = serie[serie["metodo"] == "Lote a Lote"].groupby("articulo")["stock_seguridad"].apply(list)
+    assert all(len(rejilla) == 13 and rejilla[0] == 0 for rejilla in rejillas)
+    assert rejillas[0][-1] > 2 * rejillas[1][-1]
+    # Con poca variación no se repiten stocks al redondear: saltos de una unidad
+    pequeno = evaluar_incertidumbre([[1, 0, 2, 1]], metodos=["Lote a Lote"], escenarios=50, semilla=7)
+    assert pequeno["stock_seguridad"].tolist() == list(range(13))
+    with pytest.raises(ValueError, match="repetir"):
+        evaluar_incertidumbre(necesidades_brutas, stocks_seguridad=[[0, 5, 5], [0, 10, 20]], escenarios=10)
+    # Sin dispersión la demanda es la prevista: nunca hay rotura y basta el menor stock
+    exacta = evaluar_incertidumbre(necesidades_brutas, None, parametros, dispersion=0.0, stocks_seguridad=[0, 20], **argumentos)
+    assert (exacta["probabilidad_rotura"] == 0).all()
+    assert (exacta.loc[exacta["recomendado"], "stock_seguridad"] == 0).all()
+
+
+def test_servicio_agrupa_peticiones_concurrentes():
+    import asyncio
+    import pyarrow as pa
+
+    from carga import ClienteHTTP
+    from servicio import TIPO_ARROW, servir
+
+    rng = np.random.default_rng(0)
+    peticiones = [
+        {"metodo": "Wagner-Whitin", "necesidades_brutas": rng.integers(0, 300, (3, 12)).tolist(),
+         "parametros": {"tiempo_suministro": plazo, "costo_pedido": [500, 800, 1000]}}
+        for plazo in (1, 3, 2, 1, 4)
+    ]
+    tabla = pa.table({"necesidades_brutas": pa.array(rng.integers(0, 300, (2, 12)).tolist())})
+    destino = pa.BufferOutputStream()
+    with pa.ipc.new_stream(destino, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+
+    async def probar():
+        listo = asyncio.get_running_loop().create_future()
+        servidor = asyncio.create_task(servir(puerto=0, procesos=1, ventana=0.05, listo=listo))
+        host, puerto = await listo
+        clientes = [ClienteHTTP(host, puerto) for _ in range(len(peticiones) + 2)]
+        try:
+            return await asyncio.gather(
+                *(cliente.enviar("POST", "/plan", json.dumps(peticion).encode())
+                  for cliente, peticion in zip(clientes, peticiones)),
+                clientes[-2].enviar("POST", "/plan?metodo=Silver%20Meal", destino.getvalue().to_pybytes(), TIPO_ARROW),
+                clientes[-1].enviar("POST", "/plan", b'{"metodo": "Otro", "necesidades_brutas": [1, 2]}'),
+            ), json.loads((await ClienteHTTP(host, puerto).enviar("GET", "/salud"))[1])
+        finally:
+            for cliente in clientes:
+                await cliente.cerrar()
+            servidor.cancel()
+            await asyncio.gather(servidor, return_exceptions=True)
+
+    respuestas, estado = asyncio.run(probar())
+    for peticion, (codigo, cuerpo) in zip(peticiones, respuestas):
+        assert codigo == 200
+        respuesta = json.loads(cuerpo)
+        esperado = plan_batch(peticion["necesidades_brutas"], None, peticion["parametros"], "Wagner-Whitin")
+        assert respuesta["origen_lanzamientos"] == peticion["parametros"]["tiempo_suministro"]
+        for clave in ("recepcion_pedidos", "lanzamiento_pedidos", "coste_total"):
+            assert np.array_equal(respuesta[clave], esperado[clave])
+    codigo, cuerpo = respuestas[-2]
+    arrow = pa.ipc.open_stream(cuerpo).read_all()
+    esperado = plan_batch(tabla["necesidades_brutas"].to_pylist(), None, None, "Silver Meal")
+    assert codigo == 200 and np.array_equal(arrow["coste_total"].to_numpy(), esperado["coste_total"])
+    assert respuestas[-1][0] == 400
+    # Las cinco peticiones de Wagner-Whitin llegan a la vez y se calculan juntas
+    assert estado["peticiones"] == 6 and estado["lotes"] < estado["peticiones"]
+
+
+def test_servicio_aisla_las_peticiones_erroneas():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from carga import ClienteHTTP
+    from servicio import AgrupadorPlanes, PeticionPlan, servir
+
+    buena = {"metodo": "Wagner-Whitin", "necesidades_brutas": [[0, 80, 50, 0, 300, 20]], "parametros": {"tiempo_suministro": 2}}
+    malas = [
+        {"tiempo_suministro": 1.5}, {"tiempo_suministro": -2}, {"periodo_constante": 0},
+        {"costo_pedido": float("inf")}, {"costo_mantenimiento": "1"},
+    ]
+    esperado = plan_batch(buena["necesidades_brutas"], None, buena["parametros"], "Wagner-Whitin")
+
+    async def por_http():
+        listo = asyncio.get_running_loop().create_future()
+        servidor = asyncio.create_task(servir(puerto=0, procesos=1, ventana=0.05, listo=listo))
+        host, puerto = await listo
+        clientes = [ClienteHTTP(host, puerto) for _ in range(len(malas) + 1)]
+        cuerpos = [buena] + [{**buena, "parametros": parametros} for parametros in malas]
+        try:
+            return await asyncio.gather(*(
+                cliente.enviar("POST", "/plan", json.dumps(cuerpo).encode()) for cliente, cuerpo in zip(clientes, cuerpos)
+            ))
+        finally:
+            for cliente in clientes:
+                await cliente.cerrar()
+            servidor.cancel()
+            await asyncio.gather(servidor, return_exceptions=True)
+
+    (codigo, cuerpo), *errores = asyncio.run(por_http())
+    assert codigo == 200 and json.loads(cuerpo)["coste_total"] == esperado["coste_total"].tolist()
+    assert [codigo for codigo, _ in errores] == [400] * len(malas)
+
+    # Si algo que ha pasado la validación hace fallar el lote, las demás peticiones se calculan igual
+    async def en_lote():
+        with ThreadPoolExecutor(1) as ejecutor:
+            agrupador = AgrupadorPlanes(ejecutor, ventana=0.05)
+            peticiones = [PeticionPlan(buena["necesidades_brutas"], None, buena["parametros"], "Wagner-Whitin") for _ in range(3)]
+            peticiones[1].parametros["tiempo_suministro"] = np.array([1.5])
+            try:
+                return await asyncio.gather(*(agrupador.planificar(p) for p in peticiones), return_exceptions=True), agrupador.lotes
+            finally:
+                await agrupador.cerrar()
+
+    (primera, fallida, tercera), lotes = asyncio.run(en_lote())
+    assert isinstance(fallida, Exception) and lotes == 2
+    for resultado in (primera, tercera):
+        assert np.array_equal(resultado["lanzamiento_pedidos"], esperado["lanzamiento_pedidos"])
+
+
+def test_explosion_bom_propaga_lanzamientos_a_componentes_compartidos():
+    # A -> 2 B, A -> 1 C, B -> 3 C: C es compartido y tiene código de nivel 2
+    necesidades_brutas = np.zeros((3, 6), dtype=int)
+    necesidades_brutas[0] = [0, 0, 10, 0, 5, 0]
+    necesidades_brutas[2] = [1, 0, 0, 0, 0, 0]
+    plan = explosionar_bom(
+        necesidades_brutas, None, {"tiempo_suministro": [1, 1, 2]},
+        padres=[0, 0, 1], componentes=[1, 2, 2], cantidades=[2, 1, 3]
+    )
+    assert plan["nivel"].tolist() == [0, 1, 2]
+    assert plan["necesidades_dependientes"].tolist() == [
+        [0, 0, 0, 0, 0, 0],
+        [0, 20, 0, 10, 0, 0],
+        [60, 10, 30, 5, 0, 0],
+    ]
+    # Los lanzamientos atrasados de C quedan en los periodos -1 y 0, delante del origen
+    assert plan["origen_lanzamientos"] == 2
+    assert plan["lanzamiento_pedidos"][2].tolist() == [61, 10, 30, 5, 0, 0, 0, 0]
+
+
+@pytest.mark.parametrize("metodo", ["Lote a Lote", "Periodo Constante", "Silver Meal", "Wagner-Whitin"])
+def test_replanificacion_incremental_coincide_con_regeneracion(metodo):
+    rng = np.random.default_rng(0)
+    necesidades_brutas = rng.integers(0, 300, (20, 24)) * (rng.random((20, 24)) < 0.5)
+    parametros = {"tiempo_suministro": 2, "stock_seguridad": 10, "periodo_constante": 3}
+    plan = PlanIncremental(necesidades_brutas, None, parametros, metodo)
+    for _ in range(30):
+        plan.modificar(rng.integers(0, 20), rng.integers(0, 24), necesidades_brutas=rng.integers(0, 300))
+        assert len(plan.replanificar()) == 1
+        completo = plan_batch(plan.necesidades_brutas, None, parametros, metodo)
+        for clave in ("disponibilidades", "necesidades_netas", "recepcion_pedidos", "lanzamiento_pedidos", "coste_total"):
+            assert np.array_equal(plan.plan[clave], completo[clave])
+
+
+@pytest.mark.parametrize("metodo", ["Lote a Lote", "Silver Meal", "Wagner-Whitin"])
+def test_replanificacion_incremental_multinivel_coincide_con_explosion(metodo):
+    # 0 -> 2·2, 0 -> 1·3, 1 -> 2·4, 2 -> 3·1: el 2 es compartido y el 3 está dos niveles por debajo
+    rng = np.random.default_rng(9)
+    bom = ([0, 0, 1, 2], [2, 3, 2, 4], [2, 1, 4, 1])
+    necesidades_brutas = np.zeros((5, 16), dtype=int)
+    necesidades_brutas[:2] = rng.integers(0, 200, (2, 16)) * (rng.random((2, 16)) < 0.6)
+    parametros = {"tiempo_suministro": [1, 2, 1, 3, 2], "stock_seguridad": 5}
+    plan = PlanIncremental(necesidades_brutas, None, parametros, metodo, bom=bom)
+    tocados = set()
+    for _ in range(15):
+        padre, periodo = int(rng.integers(0, 2)), int(rng.integers(0, 16))
+        plan.modificar(padre, periodo, necesidades_brutas=rng.integers(0, 300))
+        replanificados = plan.replanificar()
+        assert padre in replanificados
+        tocados.update(replanificados.tolist())
+        completo = explosionar_bom(plan.necesidades_brutas, None, parametros, *bom, metodo)
+        for clave in ("necesidades_dependientes", "recepcion_pedidos", "lanzamiento_pedidos", "coste_total"):
+            assert np.array_equal(plan.plan[clave], completo[clave])
+    # Los cambios de los padres llegan hasta el componente de dos niveles por debajo
+    assert {2, 3, 4} <= tocados
+
+
+def test_horizonte_rodante_sin_faltas_con_prevision_perfecta():
+    rng = np.random.default_rng(1)
+    necesidades_brutas = rng.integers(0, 300, (15, 30)) * (rng.random((15, 30)) < 0.5)
+    parametros = {"tiempo_suministro": rng.integers(1, 4, 15), "stock_seguridad": 20, "disponibilidad_inicial": 5}
+    metodos = ["Lote a Lote", "Periodo Constante", "Silver Meal", "Wagner-Whitin"]
+    resultado = simular_horizonte_rodante(necesidades_brutas, parametros, metodos, horizonte=8, congelados=2)
+    assert (resultado["no_servidas"] == 0).all()
+    # Lote a Lote con previsión perfecta no cambia nunca un pedido ya planificado
+    assert resultado.loc["Lote a Lote", "nerviosismo"] == 0
+    assert resultado.equals(simular_horizonte_rodante(
+        necesidades_brutas, parametros, metodos, horizonte=8, congelados=2, procesos=2, articulos_por_bloque=4
+    ))
+
+
+def test_instrumentacion_por_sesion_no_toca_la_del_proceso():
+    # Dos sesiones en hilos distintos: cada una mide solo su neteo y la del proceso no cambia
+    antes = INSTRUMENTACION.resumen()
+    sesiones = [Instrumentacion(activa=True), Instrumentacion(activa=False)]
+    barrera = threading.Barrier(2)
+
+    def sesion(instrumentacion, articulos):
+        with instrumentacion.medir():
+            barrera.wait()
+            plan_batch(np.ones((articulos, 4), dtype=int), None, None, "Lote a Lote")
+            barrera.wait()
+
+    hilos = [threading.Thread(target=sesion, args=(s, n)) for s, n in zip(sesiones, (3, 5))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert sesiones[0].resumen()["contadores"]["articulos_planificados"] == 3
+    assert sesiones[1].resumen() == {"etapas": {}, "contadores": {}}
+    assert INSTRUMENTACION.resumen() == antes
+
+
+def test_cache_caduca_descarta_el_menos_usado_y_cuenta(monkeypatch):
+    reloj = [0.0]
+    monkeypatch.setattr("mrp.cache.time", SimpleNamespace(monotonic=lambda: reloj[0]))
+    cache = CacheLRU(max_entradas=2, ttl=10)
+    assert cache.obtener("a", lambda: 1) == 1
+    assert cache.obtener("b", lambda: 2) == 2
+    assert cache.obtener("a", lambda: -1) == 1
+    # "b" es el menos usado: sale al entrar "c"
+    assert cache.obtener("c", lambda: 3) == 3
+    assert list(cache._entradas) == ["a", "c"]
+    assert (cache.aciertos, cache.fallos) == (1, 3)
+    # Los caducados se descartan al consultarlos y al guardar otro resultado, sin esperar a llenarse
+    reloj[0] = 10.5
+    assert cache.obtener("a", lambda: 4) == 4
+    assert list(cache._entradas) == ["a"]
+    reloj[0] = 15
+    assert cache.obtener("a", lambda: -1) == 4
+    assert (cache.aciertos, cache.fallos, len(cache)) == (2, 4, 1)
+    # Parámetros con arrays largos que solo difieren en un valor del medio
+    costo_pedido = np.full(2000, 1000.0)
+    otro = costo_pedido.copy()
+    otro[1000] = 999
+    claves = {clave_planificacion("Silver Meal", [1, 2], [0, 0], costo_pedido=coste) for coste in (costo_pedido, otro)}
+    assert len(claves) == 2
+
+
+def test_instrumentacion_solo_mide_si_esta_activa():
+    instrumentacion = Instrumentacion()
+    with instrumentacion.etapa("neteo"):
+        instrumentacion.contar("articulos", 3)
+    assert instrumentacion.resumen() == {"etapas": {}, "contadores": {}}
+    instrumentacion.activa = True
+    for _ in range(2):
+        with instrumentacion.etapa("neteo"):
+            instrumentacion.contar("articulos", 3)
+    resumen = json.loads(instrumentacion.to_json())
+    assert resumen["etapas"]["neteo"]["llamadas"] == 2
+    assert resumen["contadores"] == {"articulos": 6}
+
+
+@pytest.mark.parametrize("filas_por_bloque", [1, 2, 5, 100])
+def test_lectura_por_bloques_coincide_con_lectura_completa(tmp_path, filas_por_bloque):
+    fichero = tmp_path / "demanda.csv"
+    fichero.write_text(
+        "articulo,tipo,1,2,3\n"
+        "A,NB,10,0,5\nA,RP,0,3,\nB,NB,1,2,3\nC,RP,4,0,0\nC,NB,0,0,7\nD,NB,8,8,8\n"
+    )
+    articulos, necesidades_brutas, recepciones_programadas = leer_demanda(fichero)
+    bloques = list(leer_demanda_por_bloques(fichero, filas_por_bloque=filas_por_bloque))
+    assert sum((bloque[0] for bloque in bloques), []) == articulos
+    assert np.array_equal(np.concatenate([bloque[1] for bloque in bloques]), necesidades_brutas)
+    assert np.array_equal(np.concatenate([bloque[2] for bloque in bloques]), recepciones_programadas)
+
+
+def test_planificacion_en_flujo_conserva_orden_y_resultados():
+    rng = np.random.default_rng(2)
+    necesidades_brutas = rng.integers(0, 300, (23, 10))
+    parametros = {"tiempo_suministro": 2, "stock_seguridad": 10}
+    bloques = [
+        (list(range(i, i + 5)), necesidades_brutas[i:i + 5], np.zeros_like(necesidades_brutas[i:i + 5]))
+        for i in range(0, 23, 5)
+    ]
+    metodos = ["Lote a Lote", "Wagner-Whitin"]
+    serie = list(planificar_en_flujo(en_segundo_plano(bloques, maximo=1), metodos, parametros))
+    paralelo = list(planificar_en_flujo(bloques, metodos, parametros, procesos=2, en_vuelo=1, claves=("coste_total",)))
+    assert [bloque[0] for bloque in serie] == [bloque[0] for bloque in paralelo] == [bloque[0] for bloque in bloques]
+    for metodo in metodos:
+        completo = plan_batch(necesidades_brutas, None, parametros, metodo)
+        for resultado, clave in ((serie, "recepcion_pedidos"), (paralelo, "coste_total")):
+            assert np.array_equal(np.concatenate([dict(planes)[metodo][clave] for *_, planes in resultado]), completo[clave])
+
+    def falla():
+        yield bloques[0]
+        raise ValueError("fichero roto")
+
+    with pytest.raises(ValueError, match="fichero roto"):
+        list(planificar_en_flujo(en_segundo_plano(falla()), metodos, parametros))
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_planificar_fichero_coincide_con_plan_batch(tmp_path, formato):
+    from planificar import SERIES_PLAN, planificar_fichero
+
+    demanda = tmp_path / "demanda.csv"
+    demanda.write_text(
+        "articulo,tipo,1,2,3,4,5\n"
+        "A,NB,10,0,50,0,5\nA,RP,0,3,0,0,0\nB,NB,0,0,0,0,80\nC,NB,100,20,0,40,0\nC,RP,5,0,0,0,0\n"
+    )
+    articulos, necesidades_brutas, recepciones_programadas = leer_demanda(demanda)
+    parametros = {"tiempo_suministro": 2, "stock_seguridad": 5, "costo_pedido": 300}
+    metodos = ["Lote a Lote", "Silver Meal"]
+    salida_plan, salida_costes = tmp_path / f"plan.{formato}", tmp_path / f"costes.{formato}"
+    assert planificar_fichero(demanda, metodos, parametros, salida_plan, salida_costes, filas_por_bloque=2) == 3
+    leer = pd.read_parquet if formato == "parquet" else pd.read_csv
+    tabla_plan, tabla_costes = leer(salida_plan), leer(salida_costes)
+
+    # Columnas en la escala de los lanzamientos: desde el periodo 1 - origen hasta el último
+    assert list(tabla_plan.columns) == ["articulo", "metodo", "serie", "-1", "0", "1", "2", "3", "4", "5"]
+    for metodo in metodos:
+        esperado = plan_batch(necesidades_brutas, recepciones_programadas, parametros, metodo)
+        costes = tabla_costes[tabla_costes["metodo"] == metodo]
+        assert costes["articulo"].tolist() == articulos
+        assert np.array_equal(costes["coste_total"], esperado["coste_total"])
+        series = {"necesidades_brutas": necesidades_brutas, "recepciones_programadas": recepciones_programadas, **esperado}
+        filas = tabla_plan[tabla_plan["metodo"] == metodo]
+        for nombre in SERIES_PLAN:
+            valores = filas[filas["serie"] == nombre].iloc[:, 3:].to_numpy()
+            if nombre == "lanzamiento_pedidos":
+                assert np.array_equal(valores, esperado["lanzamiento_pedidos"])
+            else:
+                assert (valores[:, :2] == 0).all() and np.array_equal(valores[:, 2:], series[nombre])
+
+
+def test_barrido_de_parametros_coincide_con_plan_batch():
+    rng = np.random.default_rng(4)
+    necesidades_brutas = rng.integers(0, 300, (12, 10)) * (rng.random((12, 10)) < 0.6)
+    parametros = {"disponibilidad_inicial": rng.integers(0, 100, 12), "periodo_constante": 3}
+    metodos = ["Periodo Constante", "POQ", "Silver Meal"]
+    barrido = barrer_parametros(necesidades_brutas, None, parametros, [300, 1000], [0, 1.5], [0, 20], [1, 4], metodos)
+    assert len(barrido) == 3 * 2 * 2 * 2 * 2
+    for _, fila in barrido.iterrows():
+        plan = plan_batch(necesidades_brutas, None, {
+            **parametros, "costo_pedido": fila["costo_pedido"], "costo_mantenimiento": fila["costo_mantenimiento"],
+            "stock_seguridad": fila["stock_seguridad"], "tiempo_suministro": fila["tiempo_suministro"],
+        }, fila["metodo"])
+        assert fila["coste_total"] == pytest.approx(plan["coste_total"].sum())
+        assert fila["lanzamientos_atrasados"] == plan["lanzamiento_pedidos"][:, :plan["origen_lanzamientos"]].sum()
+
+
+@pytest.mark.parametrize("procesos", [None, 2])
+def test_planificacion_mapeada_coincide_con_plan_batch(tmp_path, procesos):
+    rng = np.random.default_rng(3)
+    necesidades_brutas = rng.integers(0, 300, (40, 12)) * (rng.random((40, 12)) < 0.6)
+    np.save(tmp_path / "nb.npy", necesidades_brutas)
+    parametros = {"tiempo_suministro": np.r_[np.ones(20, dtype=int), rng.integers(1, 4, 20)], "stock_seguridad": 5}
+    # Los bloques de las primeras filas tienen un origen menor que el de toda la matriz
+    entrada = tmp_path / "nb.npy" if procesos else memoryview(necesidades_brutas)
+    plan = planificar_mapeado(entrada, None, parametros, "Silver Meal", tmp_path / "plan", articulos_por_bloque=7, procesos=procesos)
+    completo = plan_batch(necesidades_brutas, None, parametros, "Silver Meal")
+    assert plan["origen_lanzamientos"] == completo["origen_lanzamientos"]
+    for clave in ("disponibilidades", "recepcion_pedidos", "lanzamiento_pedidos", "coste_total"):
+        assert np.array_equal(plan[clave], completo[clave])
+    assert np.array_equal(np.load(tmp_path / "plan" / "lanzamiento_pedidos.npy"), completo["lanzamiento_pedidos"])
+
+
+# Cálculo de un artículo con cada método, con los argumentos del antiguo bucle por artículo
+CALCULOS_POR_ARTICULO = {
+    "Lote a Lote": lambda nb, rp, p: calcular_lote_a_lote(nb, rp, p["L"], p["SS"], p["DI"]),
+    "EOQ": lambda nb, rp, p: calcular_eoq(nb, rp, p["L"], p["SS"], p["DI"], p["S"], p["H"]),
+    "POQ": lambda nb, rp, p: calcular_poq(nb, rp, p["L"], p["SS"], p["DI"], p["S"], p["H"]),
+    "Periodo Constante": lambda nb, rp, p: calcular_periodo_constante(nb, rp, p["L"], p["SS"], p["DI"], p["PC"]),
+    "Minimo Coste Unitario": lambda nb, rp, p: calcular_minimo_coste_unitario(nb, rp, p["L"], p["SS"], p["DI"], p["S"], p["H"]),
+    "Minimo Coste Total": lambda nb, rp, p: calcular_minimo_coste_total(nb, rp, p["L"], p["SS"], p["DI"], p["S"], p["H"]),
+    "Silver Meal": lambda nb, rp, p: calcular_silver_meal(nb, rp, p["L"], p["SS"], p["DI"], p["S"], p["H"]),
+    "Wagner-Whitin": lambda nb, rp, p: calcular_wagner_whitin(nb, rp, p["L"], p["SS"], p["DI"], p["S"], p["H"]),
+}
+
+
+def test_comparacion_en_paralelo_coincide_con_el_bucle_por_articulo():
+    rng = np.random.default_rng(6)
+    necesidades_brutas = rng.integers(0, 300, (13, 12)) * (rng.random((13, 12)) < 0.6)
+    recepciones_programadas = rng.integers(0, 100, (13, 12)) * (rng.random((13, 12)) < 0.1)
+    parametros = {
+        "tiempo_suministro": rng.integers(0, 4, 13), "stock_seguridad": rng.integers(0, 30, 13),
+        "disponibilidad_inicial": rng.integers(0, 200, 13), "costo_pedido": rng.choice([300, 1000], 13),
+        "costo_mantenimiento": rng.choice([0.5, 1.0, 2.0], 13),
+    }
+    articulos = [f"A{i}" for i in range(13)]
+    esperado = pd.DataFrame(
+        index=articulos, columns=[etiqueta for etiqueta, _, _ in ESTRATEGIAS_COMPARACION], dtype=np.float64
+    )
+    for i, articulo in enumerate(articulos):
+        for etiqueta, metodo, extra in ESTRATEGIAS_COMPARACION:
+            p = {
+                "L": parametros["tiempo_suministro"][i], "SS": parametros["stock_seguridad"][i],
+                "DI": parametros["disponibilidad_inicial"][i], "S": parametros["costo_pedido"][i],
+                "H": parametros["costo_mantenimiento"][i], "PC": extra.get("periodo_constante"),
+            }
+            resultado = CALCULOS_POR_ARTICULO[metodo](necesidades_brutas[i], recepciones_programadas[i], p)
+            # Tupla de los métodos directos o ResultadoHeuristica, con las claves del antiguo dict
+            if isinstance(resultado, tuple):
+                necesidades_netas, recepcion_pedidos = resultado[1], resultado[2]
+            else:
+                necesidades_netas, recepcion_pedidos = resultado["necesidades_netas"], resultado["recepcion_pedidos"]
+            esperado.loc[articulo, etiqueta] = calcular_coste_total(recepcion_pedidos, necesidades_netas, p["S"], p["H"])[0]
+    for procesos, articulos_por_bloque in ((None, None), (2, 1), (2, 4), (3, None), (2, 13)):
+        resultado = comparar_estrategias(
+            necesidades_brutas, recepciones_programadas, parametros,
+            procesos=procesos, articulos_por_bloque=articulos_por_bloque, articulos=articulos
+        )
+        pd.testing.assert_frame_equal(resultado, esperado, check_exact=True)
+
+
+# BENCHMARKS
+# Necesitan pytest-benchmark y solo se ejecutan con --benchmark-only, para que `pytest test.py`
+# se quede en los tests de corrección. Para guardar una ejecución y comparar las siguientes con ella:
+#   python -m pytest test.py --benchmark-only --benchmark-autosave
+#   python -m pytest test.py --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:10%
+# Las ejecuciones se guardan en .benchmarks/.
+HORIZONTES_BENCHMARK = (10, 100, 1_000, 10_000, 100_000)
+PATRONES_BENCHMARK = ("aleatoria", "irregular", "dispersa")
+sin_pytest_benchmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None, reason="pytest-benchmark no está instalado"
+)
+solo_con_benchmark_only = pytest.mark.skipif(
+    "not config.getoption('benchmark_only', False)", reason="los benchmarks solo se ejecutan con --benchmark-only"
+)
+
+
+def _demanda_benchmark(patron, periodos, semilla=0):
+    # Necesidades brutas reproducibles: aleatoria (demanda en todos los periodos), irregular (pocos
+    # periodos con picos grandes) y dispersa (un periodo de cada veinte)
+    rng = np.random.default_rng(semilla)
+    if patron == "aleatoria":
+        return rng.integers(1, 500, periodos)
+    if patron == "irregular":
+        return (rng.random(periodos) < 0.3) * rng.lognormal(5, 1, periodos).astype(np.int64)
+    return rng.integers(1, 500, periodos) * (np.arange(periodos) % 20 == 0)
+
+
+METODOS_BENCHMARK = {
+    "lote_a_lote": lambda nb, rp: calcular_lote_a_lote(nb, rp, 1, 0, 0),
+    "eoq": lambda nb, rp: calcular_eoq(nb, rp, 1, 0, 0, 1000, 1.0),
+    "poq": lambda nb, rp: calcular_poq(nb, rp, 1, 0, 0, 1000, 1.0),
+    "periodo_constante": lambda nb, rp: calcular_periodo_constante(nb, rp, 1, 0, 0, 3),
+    "minimo_coste_unitario": lambda nb, rp: calcular_minimo_coste_unitario(nb, rp, 1, 0, 0, 1000, 1.0),
+    "minimo_coste_total": lambda nb, rp: calcular_minimo_coste_total(nb, rp, 1, 0, 0, 1000, 1.0),
+    "silver_meal": lambda nb, rp: calcular_silver_meal(nb, rp, 1, 0, 0, 1000, 1.0),
+    "wagner_whitin": lambda nb, rp: calcular_wagner_whitin(nb, rp, 1, 0, 0, 1000, 1.0),
+}
+
+
+@sin_pytest_benchmark
+@solo_con_benchmark_only
+@pytest.mark.parametrize("periodos", HORIZONTES_BENCHMARK)
+@pytest.mark.parametrize("patron", PATRONES_BENCHMARK)
+@pytest.mark.parametrize("metodo", list(METODOS_BENCHMARK))
+def test_benchmark_metodo(benchmark, metodo, patron, periodos):
+    necesidades_brutas = _demanda_benchmark(patron, periodos)
+    recepciones_programadas = np.zeros_like(necesidades_brutas)
+    benchmark.group = metodo
+    benchmark.extra_info.update(patron=patron, periodos=periodos)
+    benchmark(METODOS_BENCHMARK[metodo], necesidades_brutas, recepciones_programadas)
+
+
+@sin_pytest_benchmark
+@solo_con_benchmark_only
+@pytest.mark.parametrize("periodos", HORIZONTES_BENCHMARK)
+@pytest.mark.parametrize("patron", PATRONES_BENCHMARK)
+def test_benchmark_coste_total(benchmark, patron, periodos):
+    necesidades_brutas = _demanda_benchmark(patron, periodos)
+    resultado = calcular_silver_meal(necesidades_brutas, np.zeros_like(necesidades_brutas), 1, 0, 0, 1000, 1.0, traza=False)
+    benchmark.group = "coste_total"
+    benchmark.extra_info.update(patron=patron, periodos=periodos)
+    benchmark(calcular_coste_total, resultado.recepcion_pedidos, resultado.necesidades_netas, 1000, 1.0)